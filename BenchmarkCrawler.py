@@ -0,0 +1,50 @@
+import argparse
+from datetime import datetime
+from crawl_benchmark import build_synthetic_fixtures, run_benchmark, save_results, SYNTHETIC_NOW, BENCH_RATE
+from replay_server import FixtureSet, record_fixtures, FIXTURE_DIR
+from site_adapters import SITE_ADAPTERS, vn_timezone
+
+# 🏁 Đo tốc độ crawler không cần mạng: phát lại trang đã ghi (hoặc tự sinh) từ server cục bộ
+# Cách dùng:
+#   python BenchmarkCrawler.py [tuoitre] [znews] [vnexpress] --latency 0.05 --error-rate 0.02
+#   python BenchmarkCrawler.py --fixtures bench_fixtures     (phát lại fixture đã ghi)
+#   python BenchmarkCrawler.py --record bench_fixtures       (ghi fixture từ archive + http_cache của lần crawl vừa chạy)
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark crawler trên trang phát lại từ server cục bộ")
+    parser.add_argument('sites', nargs='*', help=f"Trong số: {', '.join(SITE_ADAPTERS)} (mặc định: tất cả)")
+    parser.add_argument('--fixtures', help="Thư mục fixture đã ghi (mặc định: tự sinh trang giả lập)")
+    parser.add_argument('--record', metavar='DIR', nargs='?', const=FIXTURE_DIR,
+                        help="Ghi fixture từ html_archive và http_cache rồi thoát")
+    parser.add_argument('--now', help="Thời điểm của lần crawl được ghi (ISO, mặc định: bây giờ)")
+    parser.add_argument('--latency', type=float, default=0.0, help="Độ trễ mỗi phản hồi (giây)")
+    parser.add_argument('--jitter', type=float, default=0.0, help="Độ lệch ngẫu nhiên của độ trễ (± giây)")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Tỉ lệ phản hồi 503 ngẫu nhiên (0-1)")
+    parser.add_argument('--discovery', choices=['categories', 'feeds'], default='categories')
+    parser.add_argument('--rate', type=float, default=BENCH_RATE, help="Tốc độ request/giây cho mỗi host")
+    parser.add_argument('--categories', type=int, default=6, help="Số danh mục mỗi trang (fixture tự sinh)")
+    parser.add_argument('--articles', type=int, default=40, help="Số bài trong khung giờ mỗi danh mục (fixture tự sinh)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help="Lưu kết quả ra file JSON")
+    parser.add_argument('--verbose', action='store_true', help="In log của crawler")
+    args = parser.parse_args()
+    unknown = [site for site in args.sites if site not in SITE_ADAPTERS]
+    if unknown:
+        parser.error(f"Không có trang báo: {', '.join(unknown)}")
+    sites = args.sites or list(SITE_ADAPTERS)
+
+    if args.record:
+        now = datetime.fromisoformat(args.now) if args.now else datetime.now(vn_timezone)
+        record_fixtures(args.record, [SITE_ADAPTERS[site]() for site in sites], now)
+    else:
+        if args.fixtures:
+            fixtures = FixtureSet.load(args.fixtures)
+        else:
+            fixtures = build_synthetic_fixtures(
+                sites, datetime.fromisoformat(args.now) if args.now else SYNTHETIC_NOW,
+                categories=args.categories, articles_per_category=args.articles, seed=args.seed,
+            )
+        print(f"Phát lại {len(fixtures)} trang, khung giờ theo thời điểm {fixtures.now.isoformat()}")
+        results = run_benchmark(sites, fixtures, args.latency, args.jitter, args.error_rate,
+                                args.discovery, args.rate, args.verbose, args.seed)
+        if args.json:
+            save_results(results, args.json)
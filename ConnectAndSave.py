@@ -1,17 +1,22 @@
 import psycopg2
-from psycopg2 import Error
+from psycopg2 import Error, errors
 import csv
+import io
 import os
 import re
+import sys
 import pandas as pd
-from pyvi import ViTokenizer
-from sklearn.feature_extraction.text import CountVectorizer
-from sklearn.decomposition import LatentDirichletAllocation
-from collections import Counter
-from datetime import datetime, timedelta
+from collections import Counter, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from datetime import date, datetime, timedelta
 import pytz
 import time
-import hashlib
+from output_sink import partitioned_format, read_new_partitions, mark_partitions_consumed
+from near_duplicates import DuplicateIndex, drop_near_duplicates
+from vn_time import parse_vn_time_series
+from vi_tokenizer import tokenize_series
+from topic_models import TopicModel, DocumentTermMatrix
 
 db_params = {
     "dbname": os.getenv("DB_NAME"),
@@ -22,95 +27,175 @@ db_params = {
     "sslmode": "require"
 }
 
+# Cột của bảng paper theo thứ tự các cột trong DataFrame đã tiền xử lý
+PAPER_COLUMNS = {
+    'source': 'Source', 'url': 'URL', 'category': 'Category', 'keyword': 'Keyword',
+    'time': 'Time', 'title': 'Title', 'content': 'Content', 'tokens': 'Tokens',
+}
+# Bài đã có trong DB (cùng URL): 'update' ghi đè khi nội dung đổi, 'nothing' giữ bản cũ
+PAPER_ON_CONFLICT = os.getenv('PAPER_ON_CONFLICT', 'update')
+
 def clean_text(text):
     if not isinstance(text, str):
         return ''
     text = re.sub(r'\s+', ' ', text.strip())
     return text
 
-def preprocess_and_save(csv_file_path, paper):
-    if not os.path.exists(csv_file_path) or os.path.getsize(csv_file_path) == 0:
-        print(f"File {csv_file_path} không tồn tại hoặc rỗng. Bỏ qua.")
-        return
 
+# 🛠 Hàm kiểm tra paper.url đã có unique index dùng được cho ON CONFLICT chưa (chỉ đọc catalog, không khóa bảng)
+def has_paper_url_key(cursor):
+    cursor.execute("""
+        SELECT 1 FROM pg_index i
+        JOIN pg_class c ON c.oid = i.indexrelid
+        WHERE i.indrelid = 'paper'::regclass AND c.relname = 'paper_url_key' AND i.indisvalid
+    """)
+    return cursor.fetchone() is not None
+
+
+# 🛠 Hàm tạo unique index trên paper.url (chạy một lần: python ConnectAndSave.py migrate), trả về True nếu tạo được
+def migrate_paper_url_key():
+    connection = None
     try:
-        df = pd.read_csv(csv_file_path)
-    except pd.errors.EmptyDataError:
-        print(f"File {csv_file_path} không chứa dữ liệu hợp lệ (EmptyDataError). Bỏ qua.")
-        return
-    except Exception as e:
-        print(f"Lỗi không xác định khi đọc file {csv_file_path}: {e}")
-        return
+        connection = psycopg2.connect(**db_params)
+        # CONCURRENTLY không chặn ghi vào paper khi tạo index nhưng không chạy được trong transaction
+        connection.autocommit = True
+        cursor = connection.cursor()
+        if has_paper_url_key(cursor):
+            print("paper.url đã có unique index paper_url_key.")
+            return True
+        # Lần tạo trước bị lỗi giữa chừng để lại index không hợp lệ
+        cursor.execute("DROP INDEX CONCURRENTLY IF EXISTS paper_url_key")
+        try:
+            cursor.execute("CREATE UNIQUE INDEX CONCURRENTLY paper_url_key ON paper (url)")
+        except errors.UniqueViolation:
+            cursor.execute("DROP INDEX CONCURRENTLY IF EXISTS paper_url_key")
+            print("Không tạo được unique index: bảng paper đã có URL trùng, cần dọn các bản trùng rồi chạy lại.")
+            return False
+        print("Đã tạo unique index paper_url_key trên paper.url.")
+        return True
+    except (Exception, Error) as error:
+        print("Lỗi khi tạo index:", error)
+        return False
+    finally:
+        if connection:
+            connection.close()
+
+
+# 🛠 Hàm nạp DataFrame vào paper: COPY vào bảng tạm rồi upsert theo URL bằng một câu lệnh, trả về
+# (số bài thêm mới, số bài cập nhật, số bài đã có trong DB nên bỏ qua, số dòng trùng URL trong chính lần nạp)
+def bulk_upsert_papers(cursor, df):
+    # Cùng URL xuất hiện nhiều lần trong lần nạp: chỉ giữ bản cuối trước khi COPY
+    rows = df[list(PAPER_COLUMNS.values())].drop_duplicates(subset='URL', keep='last')
+    batch_duplicates = len(df) - len(rows)
+    columns = ', '.join(PAPER_COLUMNS)
+
+    cursor.execute(f"CREATE TEMP TABLE paper_staging ON COMMIT DROP AS SELECT {columns} FROM paper WITH NO DATA")
+    buffer = io.StringIO()
+    rows.to_csv(buffer, header=False, index=False, date_format='%Y-%m-%d %H:%M:%S')
+    buffer.seek(0)
+    # Ô trống ghi thành chuỗi rỗng (không thành NULL) để các bước đọc tokens sau không gặp None;
+    # cách nạp cũ lưu ô trống thành 'NaN', analyze_category_keyword bỏ qua cả hai
+    text_columns = ', '.join(column for column in PAPER_COLUMNS if column != 'time')
+    cursor.copy_expert(
+        f"COPY paper_staging ({columns}) FROM STDIN WITH (FORMAT csv, FORCE_NOT_NULL ({text_columns}))", buffer
+    )
+
+    if not has_paper_url_key(cursor):
+        print("Cảnh báo: paper.url chưa có unique index (chạy: python ConnectAndSave.py migrate), "
+              "chỉ thêm bài mới, không cập nhật bài đã có.")
+        cursor.execute(f"""
+            INSERT INTO paper ({columns})
+            SELECT {columns} FROM paper_staging s
+            WHERE NOT EXISTS (SELECT 1 FROM paper p WHERE p.url = s.url)
+            RETURNING true
+        """)
+    elif PAPER_ON_CONFLICT == 'nothing':
+        cursor.execute(f"""
+            INSERT INTO paper ({columns}) SELECT {columns} FROM paper_staging
+            ON CONFLICT (url) DO NOTHING
+            RETURNING true
+        """)
+    else:
+        updated_columns = [column for column in PAPER_COLUMNS if column != 'url']
+        cursor.execute(f"""
+            INSERT INTO paper ({columns}) SELECT {columns} FROM paper_staging
+            ON CONFLICT (url) DO UPDATE SET {', '.join(f'{c} = EXCLUDED.{c}' for c in updated_columns)}
+            WHERE ({', '.join(f'paper.{c}' for c in updated_columns)})
+                IS DISTINCT FROM ({', '.join(f'EXCLUDED.{c}' for c in updated_columns)})
+            RETURNING (xmax = 0)
+        """)
+    # xmax = 0 chỉ đúng với dòng vừa thêm mới; dòng không được trả về là bài đã có và không đổi
+    results = [inserted for (inserted,) in cursor.fetchall()]
+    inserted = sum(results)
+    updated = len(results) - inserted
+    return inserted, updated, len(rows) - inserted - updated, batch_duplicates
+
+
+def preprocess_and_save(csv_file_path, paper, df=None, dup_index=None):
+    """df: dữ liệu đã đọc sẵn (vd. các part mới của dataset phân vùng); None thì đọc từ csv_file_path.
+    dup_index: chỉ mục bài đã nhập (DuplicateIndex) để lọc bài trùng nội dung trước khi tách từ và lưu DB.
+    Trả về True khi đã lưu vào DB thành công."""
+    if df is None:
+        if not os.path.exists(csv_file_path) or os.path.getsize(csv_file_path) == 0:
+            print(f"File {csv_file_path} không tồn tại hoặc rỗng. Bỏ qua.")
+            return False
+
+        try:
+            df = pd.read_csv(csv_file_path)
+        except pd.errors.EmptyDataError:
+            print(f"File {csv_file_path} không chứa dữ liệu hợp lệ (EmptyDataError). Bỏ qua.")
+            return False
+        except Exception as e:
+            print(f"Lỗi không xác định khi đọc file {csv_file_path}: {e}")
+            return False
     
     # Làm sạch khoảng trắng trong cột Title và Content
     df['Title'] = df['Title'].apply(clean_text)
     df['Content'] = df['Content'].apply(clean_text)
     
-    if paper == 'tuoitre':
-        df['Time'] = pd.to_datetime(df['Time'], format='%d/%m/%Y %H:%M GMT+7', errors='coerce')
-    else:
-        # Loại bỏ tên ngày và dấu phẩy đầu tiên
-        df['Time'] = df['Time'].str.replace(r'^.*?,\s*', '', regex=True)
-        # Loại bỏ (GMT+7) và dấu phẩy trước giờ
-        df['Time'] = df['Time'].str.replace(r',\s*(?=\d{1,2}:\d{2}\s*\(GMT\+7\))', ' ', regex=True)
-        df['Time'] = df['Time'].str.replace(r'\s*\(GMT\+7\)', '', regex=True)
-        # Chuẩn hóa ngày: 13/4/2025 -> 13/04/2025
-        df['Time'] = df['Time'].str.replace(r'(?<=\b)(\d{1})(?=/)(?=\d{1,2}/\d{4}\b)', r'0\1', regex=True)
-        df['Time'] = df['Time'].str.replace(r'(?<=/)(\d{1})(?=/\d{4}\b)', r'0\1', regex=True)
-        df['Time'] = pd.to_datetime(df['Time'], format='%d/%m/%Y %H:%M', errors='coerce')
-    
+    # Chuẩn hóa thời gian của mọi trang báo (xem vn_time.py)
+    df['Time'] = parse_vn_time_series(df['Time'])
+
     invalid_rows = df['Time'].isna().sum()
     if invalid_rows > 0:
         print(f"Cảnh báo: {invalid_rows} bản ghi trong {csv_file_path} có thời gian không hợp lệ, sẽ bị bỏ qua.")
         df = df.dropna(subset=['Time'])
 
+    if dup_index is not None:
+        df = drop_near_duplicates(df, dup_index, csv_file_path)
+        if df.empty:
+            dup_index.commit()
+            print(f"Không còn bài mới trong {csv_file_path} sau khi lọc bài trùng.")
+            return True
+
     df['Year'] = df['Time'].dt.year
     df['Month'] = df['Time'].dt.month
     df['Day'] = df['Time'].dt.day
 
     df['Text'] = df['Title'] + ' ' + df['Content']
-    try:
-        with open('vietnamese_stopwords.txt', mode='r', encoding='utf-8') as file:
-            stop_words = set(line.strip() for line in file)
-    except FileNotFoundError:
-        print("Không tìm thấy file stopword.")
-        stop_words = set()
-
-    def preprocess_text(text):
-        text = re.sub(r'[^\w\s]', '', str(text).lower())
-        tokens = ViTokenizer.tokenize(text)
-        return ' '.join([word for word in tokens.split() if word not in stop_words])
-
-    df['Tokens'] = df['Text'].apply(preprocess_text)
+    # Tách từ song song nhiều tiến trình, bài đã tách ở lần trước lấy từ cache (xem vi_tokenizer.py)
+    df['Tokens'] = tokenize_series(df['Text'])
 
+    connection = cursor = None
     try:
         connection = psycopg2.connect(**db_params)
         cursor = connection.cursor()
 
-        insert_query = """
-        INSERT INTO paper (source, url, category, keyword, time, title, content, tokens)
-        VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-        """
-
-        records = list(zip(
-            df['Source'],
-            df['URL'],
-            df['Category'],
-            df['Keyword'],
-            df['Time'],
-            df['Title'],
-            df['Content'],
-            df['Tokens']
-        ))
-
-        cursor.executemany(insert_query, records)
+        inserted, updated, existing, batch_duplicates = bulk_upsert_papers(cursor, df)
         connection.commit()
-        print(f"Lưu {cursor.rowcount} bản ghi từ {csv_file_path} thành công!")
+        if dup_index is not None:
+            dup_index.commit()
+        print(f"Lưu bài từ {csv_file_path} thành công: {inserted} mới, {updated} cập nhật, "
+              f"{existing} bỏ qua (đã có), {batch_duplicates} dòng trùng URL trong lần nạp.")
+        return True
 
     except (Exception, Error) as error:
         print("Lỗi khi lưu dữ liệu:", error)
         if connection:
             connection.rollback()
+        if dup_index is not None:
+            dup_index.rollback()
+        return False
 
     finally:
         if cursor:
@@ -119,10 +204,6 @@ def preprocess_and_save(csv_file_path, paper):
             connection.close()
 
 
-def get_data_hash(df):
-    return hashlib.md5(df['tokens'].to_string().encode()).hexdigest()
-
-
 # Hàm để lấy category và keyword phổ biến nhất trong mỗi chủ đề
 def analyze_category_keyword(df):
     topic_info = {}
@@ -130,15 +211,17 @@ def analyze_category_keyword(df):
         # Lấy các bài báo thuộc chủ đề hiện tại
         topic_df = df[df['Topic'] == topic_idx]
         
-        # Tìm category phổ biến nhất
-        category_counts = topic_df['category'].value_counts()
+        # Tìm category phổ biến nhất (ô trống không tính)
+        categories = topic_df['category'].dropna().astype(str).str.strip()
+        category_counts = categories[categories != ''].value_counts()
         top_category = category_counts.index[0] if not category_counts.empty else "Unknown"
         
         # Tìm keyword phổ biến nhất
         all_keywords = []
         for keywords in topic_df['keyword']:
             if isinstance(keywords, str):
-                all_keywords.extend([kw.strip().lower() for kw in keywords.split(',')])
+                # Keyword trống (ô trống lưu thành '' khi nạp bằng COPY) không được tính
+                all_keywords.extend([kw.strip().lower() for kw in keywords.split(',') if kw.strip()])
         keyword_counts = Counter(all_keywords)
         # Lấy top 3 keyword phổ biến
         top_keywords = [kw for kw, count in keyword_counts.most_common(3)]
@@ -157,603 +240,332 @@ def analyze_category_keyword(df):
     return topic_info
 
 
-def run_lda_model():
-    try:
-        connection = psycopg2.connect(**db_params)
-        cursor = connection.cursor()
-
-        timezone = pytz.timezone("Asia/Ho_Chi_Minh")
-        yesterday = datetime.now(timezone) - timedelta(days=1)
-        # formatted_date = yesterday.strftime("%Y-%m-%d")  # Định dạng thành 'YYYY-MM-DD'
-        month = yesterday.month
-        year = yesterday.year
-        day = yesterday.day
-        formatted_date = f"{year}-{month:02d}"  # Định dạng thành 'YYYY-MM'
-        print(formatted_date)
-
-        # Câu truy vấn SQL với parameterized query
-        sql_query = """
-            SELECT * FROM paper WHERE time LIKE %s
-        """
-
-        # Tạo pattern cho LIKE
-        date_pattern = f"{formatted_date}%"
-
-        df = pd.read_sql(sql_query, connection, params=(date_pattern,))
-        
-        #=======================
-        # df = pd.read_sql(sql_query, connection, params=(date_pattern,), dtype={'tokens': str, 'content': str, 'title': str})
-        #=======================
-        
-        df['time'] = pd.to_datetime(df['time'], format='%Y-%m-%d %H:%M:%S')
-        df['year'] = df['time'].dt.year
-        df['month'] = df['time'].dt.month
-        df['day'] = df['time'].dt.day
-        # df.loc[df['keyword'].isin(['NaN', 'Null']), 'keyword'] = df['category']
-
-        data_hash = get_data_hash(df)
-        hash_key = f"hash_{year}_{month}"
-
-        # Vector hóa văn bản
-        vectorizer = CountVectorizer(max_features=2000)
-        X = vectorizer.fit_transform(df['tokens'])
-
-        # Mô hình LDA
-        if day <= 5:
-            num_topics = 10
-        elif 5 < day <= 15:
-            num_topics = 15
-        else:
-            num_topics = 20
-        lda = LatentDirichletAllocation(n_components=num_topics, random_state=42)
-        lda_output = lda.fit_transform(X)
-
-        # Gán chủ đề cho mỗi bài báo
-        df['Topic'] = lda_output.argmax(axis=1)
-
-        # Phân tích category và keyword
-        topic_info = analyze_category_keyword(df)
-        
-        # Tạo từ điển nhãn mới
-        topic_names_manual = {}
-        for topic_idx in topic_info.keys():
-            # Lấy thông tin category và keyword
-            top_category = topic_info[topic_idx]['top_category']
-            top_keywords = topic_info[topic_idx]['top_keywords']
-            
-            # Tạo nhãn mới dựa trên category và keyword
-            # Ví dụ: lấy category và 1-2 keyword phổ biến
-            # if top_keywords:
-            label = f"{'_'.join(top_keywords[:2]).lower()}"
-            # else:
-            #     label = top_category.lower()
-                
-            topic_names_manual[topic_idx] = label.replace(' ', '_')
-        
-        # Gán nhãn mới vào DataFrame
-        df['Topic_Name'] = df['Topic'].map(topic_names_manual)
+# Một kỳ phân tích chủ đề: mô hình lưu theo model_key, bài có time trong [start, end] (ngày),
+# keyword_period là các cột xác định kỳ trong bảng từ khóa, cache_key là khóa dấu vân tay của kỳ trong bảng cache
+TopicPeriod = namedtuple('TopicPeriod', ['granularity', 'model_key', 'num_topics', 'start', 'end',
+                                         'keyword_period', 'cache_key'])
 
-        delete_sql = """
-            DELETE FROM topic_month WHERE paper_id = %s
-        """
-        delete_data = list(zip(df['id']))
-
-        cursor.executemany(delete_sql, delete_data)
-        connection.commit()
-        
-        update_query = """
-            INSERT INTO topic_month (paper_id, topic_name, topic)
-            VALUES (%s, %s, %s)
-        """
-
-        records = list(zip(
-            df['id'],
-            df['Topic_Name'],
-            df['Topic']
-        ))
-
-        cursor.executemany(update_query, records)
-        connection.commit()
-        print("Cập nhật topic name thành công")
-
-        delete_query = """
-            DELETE FROM topic_keywords 
-            WHERE year = %s AND month = %s
-        """
-        cursor.execute(delete_query, (year, month))
-
-        feature_names = vectorizer.get_feature_names_out()
-        keywords_data = {}
-        for topic_idx, topic in enumerate(lda.components_):
-            topic_name = topic_names_manual.get(topic_idx, f"topic_{topic_idx}")
-            top_category = topic_info[topic_idx]['top_category'] if topic_idx in topic_info else "Unknown"
-            top_words = [
-                {
-                    "text": feature_names[i],
-                    "value": round(topic[i] * 100 / topic.sum(), 1),
-                    "category": top_category
-                }
-                for i in topic.argsort()[:-11:-1]
-            ]
-            keywords_data[topic_name] = top_words
-
-            for word in top_words:
-                print(f'{word["text"]} - {word["category"]}: {word["value"]}')
-
-            # Thêm từ khóa mới
-            insert_query = """
-                INSERT INTO topic_keywords (year, month, topic_name, keyword, value, category)
-                VALUES (%s, %s, %s, %s, %s, %s)
-            """
-            insert_data = [
-                (year, month, topic_name, word["text"], float(word["value"]), word["category"])
-                for word in top_words
-            ]
-            cursor.executemany(insert_query, insert_data)
-        
-        # Cập nhật cache
-        cache_query = """
-            INSERT INTO cache (key, value)
-            VALUES (%s, %s)
-            ON CONFLICT (key) DO UPDATE SET value = EXCLUDED.value
-        """
-        cursor.execute(cache_query, (hash_key, data_hash))
-
-        # Commit thay đổi
-        connection.commit()
-        print("Cập nhật keywords thành công")
-
-    except (Exception, Error) as error:
-        print("Lỗi khi lưu dữ liệu:", error)
-        if connection:
-            connection.rollback()
-    
+# Bảng chủ đề của bài và bảng từ khóa của chủ đề theo từng loại kỳ
+TOPIC_TABLES = {
+    'week': ('topic_week', 'topic_keywords_week'),
+    'month': ('topic_month', 'topic_keywords'),
+    'quarter': ('topic_quarter', 'topic_keywords_quarter'),
+    'year': ('topic_year', 'topic_keywords_year'),
+}
+TOPIC_PERIOD_SQL = "CAST(p.time AS TIMESTAMP) BETWEEN %s AND %s"
+
+
+# 🛠 Hàm tính kỳ (tuần / tháng / quý / năm) chứa ngày day
+def topic_period(granularity, day):
+    if granularity == 'week':
+        start = day - timedelta(days=day.weekday())  # Thứ hai
+        end = start + timedelta(days=6)  # Chủ nhật
+        return TopicPeriod('week', f"week_{start:%Y-%m-%d}", 10, start, end,
+                           {'start_date': f"{start:%Y-%m-%d}", 'end_date': f"{end:%Y-%m-%d}"},
+                           f"hash_week_{start:%Y-%m-%d}")
+    if granularity == 'month':
+        start = day.replace(day=1)
+        end = (start + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+        # Số chủ đề tăng dần theo số ngày đã qua trong tháng (đổi số chủ đề thì mô hình được fit lại)
+        num_topics = 10 if day.day <= 5 else 15 if day.day <= 15 else 20
+        return TopicPeriod('month', f"month_{start:%Y-%m}", num_topics, start, end,
+                           {'year': day.year, 'month': day.month}, f"hash_{day.year}_{day.month}")
+    if granularity == 'quarter':
+        quarter = (day.month - 1) // 3 + 1
+        start = date(day.year, 3 * quarter - 2, 1)
+        end = (date(day.year, 3 * quarter, 28) + timedelta(days=4)).replace(day=1) - timedelta(days=1)
+        return TopicPeriod('quarter', f"quarter_{day.year}-Q{quarter}", 35, start, end,
+                           {'year': day.year, 'quarter': quarter}, f"hash_{day.year}_q{quarter}")
+    return TopicPeriod('year', f"year_{day.year}", 40, date(day.year, 1, 1), date(day.year, 12, 31),
+                       {'year': day.year}, f"hash_{day.year}")
+
+
+# 🛠 Hàm chọn các kỳ cần phân tích vào ngày day: tháng mỗi ngày, tuần vào chủ nhật, quý / năm vào ngày cuối kỳ
+def due_topic_granularities(day):
+    due = ['month']
+    if day.weekday() == 6:
+        due.append('week')
+    last_day_of_month = (day + timedelta(days=1)).month != day.month
+    if last_day_of_month and day.month % 3 == 0:
+        due.append('quarter')
+    if day.month == 12 and day.day == 31:
+        due.append('year')
+    return due
+
+
+def period_params(period):
+    return (f"{period.start:%Y-%m-%d} 00:00:00", f"{period.end:%Y-%m-%d} 23:59:59")
+
+
+# 🛠 Hàm tính dấu vân tay dữ liệu của kỳ ngay trong Postgres (chỉ trả về một dòng): số bài, id lớn nhất
+# và md5 của các md5(tokens) theo thứ tự id, đổi khi kỳ có thêm / bớt bài hoặc tokens của bài thay đổi.
+# max_id: chỉ tính các bài có id <= max_id (các bài mô hình đã học)
+def period_fingerprint(connection, period, max_id=None):
+    cursor = connection.cursor()
+    try:
+        id_filter = "" if max_id is None else "AND p.id <= %s"
+        cursor.execute(f"""
+            SELECT count(*), COALESCE(max(p.id), 0),
+                   md5(COALESCE(string_agg(md5(COALESCE(p.tokens, '')), '' ORDER BY p.id), ''))
+            FROM paper p WHERE {TOPIC_PERIOD_SQL} {id_filter}
+        """, period_params(period) + (() if max_id is None else (max_id,)))
+        count, max_id, digest = cursor.fetchone()
+        return count, f"{count}:{max_id}:{digest}"
     finally:
         cursor.close()
-        connection.close()
 
 
-def run_lda_model_week():
+# 🛠 Hàm đọc dấu vân tay đã lưu của các kỳ trong bảng cache: {cache_key: value}
+def cached_fingerprints(connection, cache_keys):
+    cursor = connection.cursor()
     try:
-        print("Run LDA model for week")
-        connection = psycopg2.connect(**db_params)
-        cursor = connection.cursor()
-
-        timezone = pytz.timezone("Asia/Ho_Chi_Minh")
-        yesterday = datetime.now(timezone) - timedelta(days=1)
-
-        # Calculate week boundaries (Monday to Sunday)
-        week_start = yesterday - timedelta(days=yesterday.weekday())  # Monday
-        week_end = week_start + timedelta(days=6)  # Sunday
-        week_start_str = week_start.strftime("%Y-%m-%d")
-        week_end_str = week_end.strftime("%Y-%m-%d")
-        print(f"Processing week: {week_start_str} to {week_end_str}")
-
-        # Câu truy vấn SQL với parameterized query
-        sql_query = """
-            SELECT * FROM paper WHERE CAST(time AS TIMESTAMP) BETWEEN %s AND %s
-        """
+        cursor.execute("SELECT key, value FROM cache WHERE key = ANY(%s)", (list(cache_keys),))
+        return dict(cursor.fetchall())
+    finally:
+        cursor.close()
 
-        df = pd.read_sql(sql_query, connection, params=(f"{week_start_str} 00:00:00", f"{week_end_str} 23:59:59"))
-        if df.empty:
-            print("No data for this week, skipping...")
-            return
 
-        df['time'] = pd.to_datetime(df['time'], format='%Y-%m-%d %H:%M:%S')
-        df['year'] = df['time'].dt.year
-        df['month'] = df['time'].dt.month
-        df['day'] = df['time'].dt.day
-        # df.loc[df['keyword'].isin(['NaN', 'Null']), 'keyword'] = df['category']
+# 🛠 Hàm đọc bài (id, time, tokens) trong khoảng ngày [start, end] có id > after_id, sắp theo time
+def load_topic_window(connection, start, end, after_id=0):
+    df = pd.read_sql(
+        f"SELECT p.id, p.time, p.tokens FROM paper p WHERE {TOPIC_PERIOD_SQL} AND p.id > %s",
+        connection, params=(f"{start:%Y-%m-%d} 00:00:00", f"{end:%Y-%m-%d} 23:59:59", after_id),
+    )
+    df['time'] = pd.to_datetime(df['time'], format='%Y-%m-%d %H:%M:%S', errors='coerce')
+    df['tokens'] = df['tokens'].fillna('')
+    return df.dropna(subset=['time']).sort_values('time', kind='stable').reset_index(drop=True)
 
-        # Vector hóa văn bản
-        vectorizer = CountVectorizer(max_features=2000)
-        X = vectorizer.fit_transform(df['tokens'])
 
-        # Mô hình LDA
-        num_topics = 10
-        lda = LatentDirichletAllocation(n_components=num_topics, random_state=42)
-        lda_output = lda.fit_transform(X)
+# 🛠 Hàm lấy chỉ số các dòng (df đã sắp theo time) thuộc kỳ period và có id > after_id
+def period_rows(df, period, after_id=0):
+    times = df['time'].to_numpy()
+    start = np.searchsorted(times, np.datetime64(period.start), side='left')
+    end = np.searchsorted(times, np.datetime64(period.end + timedelta(days=1)), side='left')
+    rows = np.arange(start, end)
+    return rows[df['id'].to_numpy()[rows] > after_id]
 
-        # Gán chủ đề cho mỗi bài báo
-        df['Topic'] = lda_output.argmax(axis=1)
 
-        # Phân tích category và keyword
-        topic_info = analyze_category_keyword(df)
-        
-        # Tạo từ điển nhãn mới
-        topic_names_manual = {}
-        for topic_idx in topic_info.keys():
-            # Lấy thông tin category và keyword
-            top_category = topic_info[topic_idx]['top_category']
-            top_keywords = topic_info[topic_idx]['top_keywords']
-            
-            # Tạo nhãn mới dựa trên keyword
-            label = f"{'_'.join(top_keywords[:2]).lower()}"
-            
-            topic_names_manual[topic_idx] = label.replace(' ', '_')
-        
-        # Gán nhãn mới vào DataFrame
-        df['Topic_Name'] = df['Topic'].map(topic_names_manual)
+# 🛠 Hàm fit một mô hình (chạy trong tiến trình con): vocabulary khác None thì fit lại, None thì partial_fit
+def fit_topic_model(model, X, vocabulary, last_paper_id):
+    if vocabulary is None:
+        doc_topics = model.partial_fit(X, last_paper_id)
+    else:
+        doc_topics = model.fit(X, vocabulary, last_paper_id)
+    return model, doc_topics
 
-        delete_sql = """
-            DELETE FROM topic_week WHERE paper_id = %s
-        """
-        delete_data = list(zip(df['id']))
 
-        cursor.executemany(delete_sql, delete_data)
-        connection.commit()
-        
-        update_query = """
-            INSERT INTO topic_week (paper_id, topic_name, topic)
-            VALUES (%s, %s, %s)
-        """
-
-        records = list(zip(
-            df['id'],
-            df['Topic_Name'],
-            df['Topic']
-        ))
-
-        cursor.executemany(update_query, records)
-        connection.commit()
-        print("Cập nhật topic name thành công")
-
-        delete_query = """
-            DELETE FROM topic_keywords_week 
-            WHERE start_date = %s AND end_date = %s
-        """
-        cursor.execute(delete_query, (week_start_str, week_end_str))
-
-        feature_names = vectorizer.get_feature_names_out()
-        keywords_data = {}
-        for topic_idx, topic in enumerate(lda.components_):
-            topic_name = topic_names_manual.get(topic_idx, f"topic_{topic_idx}")
+# 🛠 Hàm ghi chủ đề của các bài vừa xử lý vào bảng chủ đề của kỳ, đặt lại tên chủ đề và từ khóa của kỳ
+def write_topic_results(connection, period, model, paper_ids, doc_topics, fingerprint):
+    topic_table, keyword_table = TOPIC_TABLES[period.granularity]
+    params = period_params(period)
+    cursor = connection.cursor()
+    try:
+        # Chủ đề của bài cũ giữ nguyên (partial_fit không đổi thứ tự chủ đề), chỉ ghi lại các bài vừa xử lý
+        paper_ids = [int(paper_id) for paper_id in paper_ids]
+        cursor.execute(f"DELETE FROM {topic_table} WHERE paper_id = ANY(%s)", (paper_ids,))
+        cursor.executemany(
+            f"INSERT INTO {topic_table} (paper_id, topic_name, topic) VALUES (%s, %s, %s)",
+            list(zip(paper_ids, [''] * len(paper_ids), doc_topics.argmax(axis=1).tolist())),
+        )
+
+        # Đặt tên chủ đề theo category / keyword phổ biến của mọi bài trong chủ đề (cả bài của các lần trước)
+        labeled = pd.read_sql(
+            f'SELECT p.category, p.keyword, t.topic AS "Topic" FROM {topic_table} t '
+            f'JOIN paper p ON p.id = t.paper_id WHERE {TOPIC_PERIOD_SQL}',
+            connection, params=params,
+        )
+        topic_info = analyze_category_keyword(labeled)
+        topic_names = {
+            topic_idx: '_'.join(info['top_keywords'][:2]).lower().replace(' ', '_')
+            for topic_idx, info in topic_info.items()
+        }
+        cursor.executemany(
+            f"UPDATE {topic_table} t SET topic_name = %s FROM paper p "
+            f"WHERE p.id = t.paper_id AND t.topic = %s AND {TOPIC_PERIOD_SQL}",
+            [(name, int(topic_idx), *params) for topic_idx, name in topic_names.items()],
+        )
+
+        columns = list(period.keyword_period)
+        cursor.execute(
+            f"DELETE FROM {keyword_table} WHERE {' AND '.join(f'{column} = %s' for column in columns)}",
+            tuple(period.keyword_period.values()),
+        )
+        keyword_rows = []
+        for topic_idx, words in model.top_words():
+            topic_name = topic_names.get(topic_idx, f"topic_{topic_idx}")
             top_category = topic_info[topic_idx]['top_category'] if topic_idx in topic_info else "Unknown"
-            top_words = [
-                {
-                    "text": feature_names[i],
-                    "value": round(topic[i] * 100 / topic.sum(), 1),
-                    "category": top_category
-                }
-                for i in topic.argsort()[:-11:-1]
-            ]
-            keywords_data[topic_name] = top_words
-            # print("topic_name:", topic_name)
-
-            # for word in top_words:
-            #     print(f'{word["text"]} - {word["category"]}: {word["value"]}')
-
-            # Thêm từ khóa mới
-            insert_query = """
-                INSERT INTO topic_keywords_week (start_date, end_date, topic_name, keyword, value, category)
-                VALUES (%s, %s, %s, %s, %s, %s)
-            """
-            insert_data = [
-                (week_start_str, week_end_str, topic_name, word["text"], float(word["value"]), word["category"])
-                for word in top_words
-            ]
-            cursor.executemany(insert_query, insert_data)
-        
-        # Commit thay đổi
-        connection.commit()
-        print("Cập nhật keywords thành công")
-
-    except (Exception, Error) as error:
-        print("Lỗi khi lưu dữ liệu:", error)
-        if connection:
-            connection.rollback()
-    
+            keyword_rows.extend(
+                (*period.keyword_period.values(), topic_name, word, float(value), top_category) for word, value in words
+            )
+        cursor.executemany(
+            f"INSERT INTO {keyword_table} ({', '.join(columns)}, topic_name, keyword, value, category) "
+            f"VALUES ({', '.join(['%s'] * (len(columns) + 4))})",
+            keyword_rows,
+        )
+
+        # Lần sau kỳ có cùng dấu vân tay thì bỏ qua cả fit lẫn ghi DB
+        cursor.execute("""
+            INSERT INTO cache (key, value)
+            VALUES (%s, %s)
+            ON CONFLICT (key) DO UPDATE SET value = EXCLUDED.value
+        """, (period.cache_key, fingerprint))
     finally:
         cursor.close()
-        connection.close()
 
 
-def run_lda_model_quarter():
+# 🛠 Hàm phân tích chủ đề của nhiều kỳ trong một lần: đọc bài của cửa sổ lớn nhất một lần, vectorize một lần
+# thành ma trận bài x từ dùng chung, mỗi kỳ lấy các dòng của mình theo thời gian, các mô hình fit song song
+def run_topic_analysis(granularities, day=None):
+    timezone = pytz.timezone("Asia/Ho_Chi_Minh")
+    day = day or (datetime.now(timezone) - timedelta(days=1)).date()
+    periods = [topic_period(granularity, day) for granularity in granularities]
+    models = {period.model_key: TopicModel.load(period.model_key, period.num_topics) for period in periods}
+
+    connection = None
     try:
-        print("Run LDA model for quarter")
         connection = psycopg2.connect(**db_params)
-        cursor = connection.cursor()
-
-        timezone = pytz.timezone("Asia/Ho_Chi_Minh")
-        yesterday = datetime.now(timezone) - timedelta(days=1)
-
-        month = yesterday.month
-        if 1 <= month <= 3:
-            quarter = 1
-            start_month, end_month = 1, 3
-        elif 4 <= month <= 6:
-            quarter = 2
-            start_month, end_month = 4, 6
-        elif 7 <= month <= 9:
-            quarter = 3
-            start_month, end_month = 7, 9
-        else:
-            quarter = 4
-            start_month, end_month = 10, 12
-        
-        # Ngày bắt đầu và kết thúc của quý
-        quarter_start = datetime(yesterday.year, start_month, 1)
-        if end_month == 12:
-            quarter_end = datetime(yesterday.year, end_month, 31)
-        else:
-            # Lấy ngày cuối cùng của tháng kết thúc
-            quarter_end = datetime(yesterday.year, end_month + 1, 1) - timedelta(days=1)
-        
-        year = quarter_start.year
-        quarter_start_str = quarter_start.strftime("%Y-%m-%d")
-        quarter_end_str = quarter_end.strftime("%Y-%m-%d")
-        print(f"Processing quarter {quarter} of {year}: {quarter_start_str} to {quarter_end_str}")
 
-        # Câu truy vấn SQL với parameterized query
-        sql_query = """
-            SELECT * FROM paper WHERE CAST(time AS TIMESTAMP) BETWEEN %s AND %s
-        """
-
-        df = pd.read_sql(sql_query, connection, params=(f"{quarter_start_str} 00:00:00", f"{quarter_end_str} 23:59:59"))
-        if df.empty:
-            print("No data for this quarter, skipping...")
+        # Kỳ có dấu vân tay trùng lần chạy trước (và mô hình vẫn dùng được) thì không cần làm gì
+        fingerprints = {period.model_key: period_fingerprint(connection, period) for period in periods}
+        stored = cached_fingerprints(connection, [period.cache_key for period in periods])
+        changed = []
+        for period in periods:
+            count, fingerprint = fingerprints[period.model_key]
+            if count == 0:
+                print(f"{period.model_key}: chưa có bài nào, bỏ qua.")
+            elif models[period.model_key].usable and stored.get(period.cache_key) == fingerprint:
+                print(f"{period.model_key}: dữ liệu không đổi từ lần trước, bỏ qua.")
+            else:
+                changed.append(period)
+        if not changed:
+            return
+        periods = changed
+        models = {period.model_key: models[period.model_key] for period in periods}
+
+        window_start = min(period.start for period in periods)
+        window_end = max(period.end for period in periods)
+        print(f"Phân tích chủ đề {', '.join(period.granularity for period in periods)}: "
+              f"{window_start} đến {window_end}")
+
+        # Bài mô hình đã học (id <= last_paper_id) bị sửa tokens / xóa thì dấu vân tay của phần đó khác
+        # lúc fit: gộp thêm bài mới không sửa được nên phải fit lại, kể cả khi kỳ cũng có bài mới
+        stale = {}
+        for period in periods:
+            model = models[period.model_key]
+            stale[period.model_key] = model.usable and (
+                model.seen_fingerprint != period_fingerprint(connection, period, model.last_paper_id)[1])
+
+        # Mọi mô hình đều dùng tiếp được: chỉ cần đọc bài mới hơn bài cũ nhất trong số các bài cuối chúng đã học
+        after_id = min(model.last_paper_id if model.usable else 0 for model in models.values())
+        df = load_topic_window(connection, window_start, window_end, after_id)
+        dtm = DocumentTermMatrix(df['tokens'])
+
+        refit = {}
+        for period in periods:
+            model = models[period.model_key]
+            new_rows = period_rows(df, period, model.last_paper_id)
+            if stale[period.model_key] or len(new_rows) == 0:
+                print(f"{period.model_key}: bài trong kỳ đã thay đổi (không chỉ thêm bài mới), fit lại.")
+                refit[period.model_key] = True
+            else:
+                refit[period.model_key] = model.needs_refit(dtm, new_rows)
+        if after_id and any(refit.values()):
+            # Có mô hình phải fit lại trên toàn bộ kỳ: đọc lại cả cửa sổ (vẫn chỉ một lần cho mọi kỳ)
+            df = load_topic_window(connection, window_start, window_end)
+            dtm = DocumentTermMatrix(df['tokens'])
+
+        tasks = {}
+        for period in periods:
+            model = models[period.model_key]
+            rows = period_rows(df, period) if refit[period.model_key] else period_rows(df, period, model.last_paper_id)
+            if len(rows) == 0:
+                # Vd. mọi thời gian trong kỳ đều không đọc được: không fit trên ma trận rỗng,
+                # không ghi dấu vân tay / last_paper_id để lần sau xét lại kỳ này
+                print(f"{period.model_key}: không có bài nào đọc được thời gian trong kỳ, bỏ qua.")
+                continue
+            if refit[period.model_key]:
+                vocabulary = dtm.top_terms(rows)
+                if not vocabulary:
+                    print(f"{period.model_key}: các bài trong kỳ không có từ nào sau khi tách từ, bỏ qua.")
+                    continue
+                X = dtm.project(rows, vocabulary)
+                print(f"{period.model_key}: fit lại {period.num_topics} chủ đề trên {len(rows)} bài của kỳ")
+            else:
+                vocabulary = None
+                X = dtm.project(rows, model.vocabulary)
+                print(f"{period.model_key}: gộp {len(rows)} bài mới vào mô hình ({model.n_docs} bài)")
+            last_paper_id = int(df['id'].to_numpy()[rows].max())
+            # Dấu vân tay các bài mô hình sẽ học (đọc ngay sau khi tải bài), lần sau so lại để biết bài cũ có đổi
+            seen_fingerprint = period_fingerprint(connection, period, last_paper_id)[1]
+            tasks[period.model_key] = (period, rows, seen_fingerprint, (model, X, vocabulary, last_paper_id))
+        if not tasks:
             return
 
-        df['time'] = pd.to_datetime(df['time'], format='%Y-%m-%d %H:%M:%S')
-        df['year'] = df['time'].dt.year
-        df['month'] = df['time'].dt.month
-        df['day'] = df['time'].dt.day
-        # df.loc[df['keyword'].isin(['NaN', 'Null']), 'keyword'] = df['category']
-
-        # Vector hóa văn bản
-        vectorizer = CountVectorizer(max_features=2000)
-        X = vectorizer.fit_transform(df['tokens'])
-
-        # Mô hình LDA
-        num_topics = 35
-        lda = LatentDirichletAllocation(n_components=num_topics, random_state=42)
-        lda_output = lda.fit_transform(X)
-
-        # Gán chủ đề cho mỗi bài báo
-        df['Topic'] = lda_output.argmax(axis=1)
-
-        # Phân tích category và keyword
-        topic_info = analyze_category_keyword(df)
-        
-        # Tạo từ điển nhãn mới
-        topic_names_manual = {}
-        for topic_idx in topic_info.keys():
-            # Lấy thông tin category và keyword
-            top_category = topic_info[topic_idx]['top_category']
-            top_keywords = topic_info[topic_idx]['top_keywords']
-            
-            # Tạo nhãn mới dựa trên keyword
-            label = f"{'_'.join(top_keywords[:2]).lower()}"
-            
-            topic_names_manual[topic_idx] = label.replace(' ', '_')
-        
-        # Gán nhãn mới vào DataFrame
-        df['Topic_Name'] = df['Topic'].map(topic_names_manual)
-
-        delete_sql = """
-            DELETE FROM topic_quarter WHERE paper_id = %s
-        """
-        delete_data = list(zip(df['id']))
-
-        cursor.executemany(delete_sql, delete_data)
-        connection.commit()
-        
-        update_query = """
-            INSERT INTO topic_quarter (paper_id, topic_name, topic)
-            VALUES (%s, %s, %s)
-        """
-
-        records = list(zip(
-            df['id'],
-            df['Topic_Name'],
-            df['Topic']
-        ))
-
-        cursor.executemany(update_query, records)
-        connection.commit()
-        print("Cập nhật topic name thành công")
-
-        delete_query = """
-            DELETE FROM topic_keywords_quarter 
-            WHERE year = %s AND quarter = %s
-        """
-        cursor.execute(delete_query, (year, quarter))
-
-        feature_names = vectorizer.get_feature_names_out()
-        keywords_data = {}
-        for topic_idx, topic in enumerate(lda.components_):
-            topic_name = topic_names_manual.get(topic_idx, f"topic_{topic_idx}")
-            top_category = topic_info[topic_idx]['top_category'] if topic_idx in topic_info else "Unknown"
-            top_words = [
-                {
-                    "text": feature_names[i],
-                    "value": round(topic[i] * 100 / topic.sum(), 1),
-                    "category": top_category
-                }
-                for i in topic.argsort()[:-11:-1]
-            ]
-            keywords_data[topic_name] = top_words
-            # print("topic_name:", topic_name)
-
-            # for word in top_words:
-            #     print(f'{word["text"]} - {word["category"]}: {word["value"]}')
-
-            # Thêm từ khóa mới
-            insert_query = """
-                INSERT INTO topic_keywords_quarter (year, quarter, topic_name, keyword, value, category)
-                VALUES (%s, %s, %s, %s, %s, %s)
-            """
-            insert_data = [
-                (year, quarter, topic_name, word["text"], float(word["value"]), word["category"])
-                for word in top_words
-            ]
-            cursor.executemany(insert_query, insert_data)
-        
-        # Commit thay đổi
-        connection.commit()
-        print("Cập nhật keywords thành công")
+        if len(tasks) > 1:
+            with ProcessPoolExecutor(max_workers=min(len(tasks), os.cpu_count() or 1)) as executor:
+                futures = {key: executor.submit(fit_topic_model, *args) for key, (*_, args) in tasks.items()}
+                results = {key: future.result() for key, future in futures.items()}
+        else:
+            results = {key: fit_topic_model(*args) for key, (*_, args) in tasks.items()}
+
+        # Mỗi kỳ commit riêng, mô hình chỉ được lưu sau khi DB commit thành công
+        for key, (model, doc_topics) in results.items():
+            period, rows, seen_fingerprint, _ = tasks[key]
+            write_topic_results(connection, period, model, df['id'].to_numpy()[rows], doc_topics,
+                                fingerprints[key][1])
+            connection.commit()
+            model.seen_fingerprint = seen_fingerprint
+            model.save()
+            print(f"Cập nhật chủ đề và keywords {period.model_key} thành công")
 
     except (Exception, Error) as error:
         print("Lỗi khi lưu dữ liệu:", error)
         if connection:
             connection.rollback()
-    
     finally:
-        cursor.close()
-        connection.close()
-
-
-def run_lda_model_year():
-    try:
-        print("Run LDA model for year")
-        connection = psycopg2.connect(**db_params)
-        cursor = connection.cursor()
-
-        timezone = pytz.timezone("Asia/Ho_Chi_Minh")
-        yesterday = datetime.now(timezone) - timedelta(days=1)
-        year = yesterday.year
-        formatted_date = f"{year}"
-        print(f"Processing year {year}:")
-
-        # Câu truy vấn SQL với parameterized query
-        sql_query = """
-            SELECT * FROM paper WHERE time LIKE %s
-        """
-
-        # Tạo pattern cho LIKE
-        date_pattern = f"{formatted_date}%"
-
-        df = pd.read_sql(sql_query, connection, params=(date_pattern,))
-        if df.empty:
-            print("No data for this year, skipping...")
-            return
+        if connection:
+            connection.close()
 
-        df['time'] = pd.to_datetime(df['time'], format='%Y-%m-%d %H:%M:%S')
-        df['year'] = df['time'].dt.year
-        df['month'] = df['time'].dt.month
-        df['day'] = df['time'].dt.day
-        # df.loc[df['keyword'].isin(['NaN', 'Null']), 'keyword'] = df['category']
 
-        # Vector hóa văn bản
-        vectorizer = CountVectorizer(max_features=2000)
-        X = vectorizer.fit_transform(df['tokens'])
+def run_lda_model():
+    run_topic_analysis(['month'])
 
-        # Mô hình LDA
-        num_topics = 40
-        lda = LatentDirichletAllocation(n_components=num_topics, random_state=42)
-        lda_output = lda.fit_transform(X)
 
-        # Gán chủ đề cho mỗi bài báo
-        df['Topic'] = lda_output.argmax(axis=1)
+def run_lda_model_week():
+    run_topic_analysis(['week'])
 
-        # Phân tích category và keyword
-        topic_info = analyze_category_keyword(df)
-        
-        # Tạo từ điển nhãn mới
-        topic_names_manual = {}
-        for topic_idx in topic_info.keys():
-            # Lấy thông tin category và keyword
-            top_category = topic_info[topic_idx]['top_category']
-            top_keywords = topic_info[topic_idx]['top_keywords']
-            
-            # Tạo nhãn mới dựa trên keyword
-            label = f"{'_'.join(top_keywords[:2]).lower()}"
-            
-            topic_names_manual[topic_idx] = label.replace(' ', '_')
-        
-        # Gán nhãn mới vào DataFrame
-        df['Topic_Name'] = df['Topic'].map(topic_names_manual)
 
-        delete_sql = """
-            DELETE FROM topic_year WHERE paper_id = %s
-        """
-        delete_data = list(zip(df['id']))
+def run_lda_model_quarter():
+    run_topic_analysis(['quarter'])
 
-        cursor.executemany(delete_sql, delete_data)
-        connection.commit()
-        
-        update_query = """
-            INSERT INTO topic_year (paper_id, topic_name, topic)
-            VALUES (%s, %s, %s)
-        """
-
-        records = list(zip(
-            df['id'],
-            df['Topic_Name'],
-            df['Topic']
-        ))
-
-        cursor.executemany(update_query, records)
-        connection.commit()
-        print("Cập nhật topic name thành công")
-
-        delete_query = """
-            DELETE FROM topic_keywords_year 
-            WHERE year = %s
-        """
-        cursor.execute(delete_query, (year,))
-
-        feature_names = vectorizer.get_feature_names_out()
-        keywords_data = {}
-        for topic_idx, topic in enumerate(lda.components_):
-            topic_name = topic_names_manual.get(topic_idx, f"topic_{topic_idx}")
-            top_category = topic_info[topic_idx]['top_category'] if topic_idx in topic_info else "Unknown"
-            top_words = [
-                {
-                    "text": feature_names[i],
-                    "value": round(topic[i] * 100 / topic.sum(), 1),
-                    "category": top_category
-                }
-                for i in topic.argsort()[:-11:-1]
-            ]
-            keywords_data[topic_name] = top_words
-            # print("topic_name:", topic_name)
-
-            # for word in top_words:
-            #     print(f'{word["text"]} - {word["category"]}: {word["value"]}')
-
-            # Thêm từ khóa mới
-            insert_query = """
-                INSERT INTO topic_keywords_year (year, topic_name, keyword, value, category)
-                VALUES (%s, %s, %s, %s, %s)
-            """
-            insert_data = [
-                (year, topic_name, word["text"], float(word["value"]), word["category"])
-                for word in top_words
-            ]
-            cursor.executemany(insert_query, insert_data)
-        
-        # Commit thay đổi
-        connection.commit()
-        print("Cập nhật keywords thành công")
 
-    except (Exception, Error) as error:
-        print("Lỗi khi lưu dữ liệu:", error)
-        if connection:
-            connection.rollback()
-    
-    finally:
-        cursor.close()
-        connection.close()
+def run_lda_model_year():
+    run_topic_analysis(['year'])
 
 
 if __name__ == "__main__":
+    # python ConnectAndSave.py migrate: tạo unique index trên paper.url (chạy một lần trước các lần nạp)
+    if sys.argv[1:] == ['migrate']:
+        sys.exit(0 if migrate_paper_url_key() else 1)
+
     paper_dataset = ['tuoitre', 'znews']
+    # Chỉ mục dùng chung cho mọi trang: cùng một tin đăng lại ở trang khác chỉ được lưu một lần
+    dup_index = DuplicateIndex()
     for paper in paper_dataset:
-        csv_file_path = f"dataset_paper_{paper}.csv"
-        preprocess_and_save(csv_file_path, paper)
+        if partitioned_format():
+            # Chỉ đọc các part crawler ghi ra từ lần lưu trước
+            df, parts = read_new_partitions(paper, 'connect_and_save')
+            if df.empty:
+                print(f"Không có dữ liệu mới của {paper}. Bỏ qua.")
+                continue
+            if preprocess_and_save(f"{len(parts)} part mới của {paper}", paper, df, dup_index):
+                mark_partitions_consumed('connect_and_save', parts)
+        else:
+            csv_file_path = f"dataset_paper_{paper}.csv"
+            preprocess_and_save(csv_file_path, paper, dup_index=dup_index)
+    dup_index.close()
     
-    # time.sleep(5)
-    # run_lda_model()
-
+    # Các kỳ đến hạn (tháng mỗi ngày, tuần / quý / năm vào ngày cuối kỳ) chạy chung một lần đọc bài
     # timezone = pytz.timezone("Asia/Ho_Chi_Minh")
-    # yesterday = datetime.now(timezone) - timedelta(days=1)
-    # if yesterday.weekday() == 6:
-    #     time.sleep(5)
-    #     run_lda_model_week()
-    # if (yesterday.month == 3 and yesterday.day == 31) or (yesterday.month == 6 and yesterday.day == 30) or (yesterday.month == 9 and yesterday.day == 30) or (yesterday.month == 12 and yesterday.day == 31):
-    #     time.sleep(5)
-    #     run_lda_model_quarter()
-    #     if yesterday.month == 12:
-    #         time.sleep(5)
-    #         run_lda_model_year()
+    # yesterday = (datetime.now(timezone) - timedelta(days=1)).date()
+    # run_topic_analysis(due_topic_granularities(yesterday), yesterday)
@@ -0,0 +1,74 @@
+import argparse
+from multiprocessing import Process
+from crawler_engine import CrawlEngine, CrawlJob, time_slot_window, WORKER_BATCH_SIZE
+from output_sink import partitioned_format
+from site_adapters import SITE_ADAPTERS
+from work_queue import open_work_queue, SharedSeenStore, CRAWL_QUEUE
+
+
+# 🛠 Hàm chạy một worker trong tiến trình riêng (engine, kho URL và hàng đợi riêng của tiến trình)
+def run_worker_process(queue_url, batch_size, idle_timeout, worker_id=None):
+    work_queue = open_work_queue(queue_url)
+    # Kho URL đã crawl nằm trên chính backend của hàng đợi (dùng chung mọi máy), không phải
+    # seen_urls.db riêng của máy này; bài giao lại trong lúc đang chạy thì được chặn bởi lease.
+    # Kết quả ghi ra thư mục phân vùng (mỗi worker file part riêng) thay vì CSV dùng chung.
+    engine = CrawlEngine(seen_store=SharedSeenStore(work_queue),
+                         output_formats=[partitioned_format() or 'jsonl'])
+    try:
+        engine.run_worker(work_queue, worker_id, batch_size, idle_timeout)
+    finally:
+        engine.close()
+        work_queue.close()
+
+
+# 🏁 Crawl phân tán: một tiến trình tìm bài và đưa vào hàng đợi, nhiều worker (nhiều máy) nhận bài để tải
+# Cách dùng:
+#   python CrawlDistributed.py discover [tuoitre] [znews] [vnexpress]
+#   python CrawlDistributed.py work [--processes 4] [--idle-timeout 120]
+#   python CrawlDistributed.py status
+# Hàng đợi chọn bằng --queue hoặc CRAWL_QUEUE: sqlite:///crawl_queue.db (một máy) hoặc redis://host:6379/0
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Crawl phân tán qua hàng đợi bài viết dùng chung")
+    parser.add_argument('command', choices=['discover', 'work', 'status'])
+    parser.add_argument('sites', nargs='*', help=f"(discover) Trong số: {', '.join(SITE_ADAPTERS)} (mặc định: tất cả)")
+    parser.add_argument('--queue', default=CRAWL_QUEUE)
+    parser.add_argument('--processes', type=int, default=1, help="(work) Số worker chạy trên máy này")
+    parser.add_argument('--batch', type=int, default=WORKER_BATCH_SIZE, help="(work) Số bài mỗi lần nhận")
+    parser.add_argument('--idle-timeout', type=float, default=None,
+                        help="(work) Dừng khi hàng đợi rỗng quá số giây này (mặc định: chạy mãi)")
+    parser.add_argument('--worker-id', help="(work) Tên worker (mặc định: tên máy-pid)")
+    args = parser.parse_args()
+
+    if args.command == 'discover':
+        unknown = [site for site in args.sites if site not in SITE_ADAPTERS]
+        if unknown:
+            parser.error(f"Không có trang báo: {', '.join(unknown)}")
+        window = time_slot_window()
+        work_queue = open_work_queue(args.queue)
+        engine = CrawlEngine(seen_store=SharedSeenStore(work_queue))
+        try:
+            engine.run([CrawlJob(SITE_ADAPTERS[site](), window) for site in args.sites or SITE_ADAPTERS], work_queue)
+        finally:
+            engine.close()
+            print(f"Xóa {work_queue.prune()} bài đã xong / dead từ lâu khỏi hàng đợi")
+            print(f"Hàng đợi: {work_queue.stats()}")
+            work_queue.close()
+
+    elif args.command == 'work':
+        if args.processes <= 1:
+            run_worker_process(args.queue, args.batch, args.idle_timeout, args.worker_id)
+        else:
+            workers = [
+                Process(target=run_worker_process, args=(args.queue, args.batch, args.idle_timeout,
+                                                        f"{args.worker_id}-{i}" if args.worker_id else None))
+                for i in range(args.processes)
+            ]
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+
+    else:
+        work_queue = open_work_queue(args.queue)
+        print(f"Hàng đợi {args.queue}: {work_queue.stats()}")
+        work_queue.close()
@@ -0,0 +1,14 @@
+import sys
+from crawler_engine import CrawlJob, run_crawl, time_slot_window
+from site_adapters import SITE_ADAPTERS
+
+# 🏁 Crawl nhiều trang báo song song trong một tiến trình, cùng khung giờ 3 tiếng hiện tại
+# Cách dùng: python CrawlPaperAll.py [tuoitre] [znews] [vnexpress]  (mặc định: tất cả)
+if __name__ == '__main__':
+    names = sys.argv[1:] or list(SITE_ADAPTERS)
+    unknown = [name for name in names if name not in SITE_ADAPTERS]
+    if unknown:
+        sys.exit(f"Không có trang báo: {', '.join(unknown)} (chọn trong: {', '.join(SITE_ADAPTERS)})")
+
+    window = time_slot_window()
+    run_crawl([CrawlJob(SITE_ADAPTERS[name](), window) for name in names])
@@ -0,0 +1,18 @@
+import argparse
+from crawler_engine import reparse_archive
+from html_archive import HTML_ARCHIVE_DIR
+from site_adapters import SITE_ADAPTERS
+
+# 🏁 Parse lại HTML đã lưu trong archive (sau khi sửa selector / parser) mà không crawl lại
+# Cách dùng: python ReparseArchive.py [tuoitre] [znews] [vnexpress] [--workers 8]
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Chạy lại các site adapter trên HTML đã lưu")
+    parser.add_argument('sites', nargs='*', help=f"Trong số: {', '.join(SITE_ADAPTERS)} (mặc định: tất cả)")
+    parser.add_argument('--workers', type=int, default=None, help="Số tiến trình (mặc định: số CPU)")
+    parser.add_argument('--archive-dir', default=HTML_ARCHIVE_DIR)
+    args = parser.parse_args()
+    unknown = [site for site in args.sites if site not in SITE_ADAPTERS]
+    if unknown:
+        parser.error(f"Không có trang báo: {', '.join(unknown)}")
+
+    reparse_archive(args.sites or None, args.workers, args.archive_dir)
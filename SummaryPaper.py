@@ -1,31 +1,6 @@
 import pandas as pd
-from datetime import datetime
-
-def normalize_time(text):
-    if pd.isna(text):
-        return None
-
-    text = str(text).strip()
-
-    try:
-        dt = datetime.strptime(text.replace(" GMT+7", ""), "%d/%m/%Y %H:%M")
-        return dt.strftime("%Y-%m-%d %H:%M:%S")
-    except:
-        pass
-
-    try:
-        parts = text.split(",")
-        if len(parts) >= 3:
-            date_part = parts[1].strip()
-            time_part = parts[2].split("(")[0].strip()
-            merged = f"{date_part} {time_part}"
-            dt = datetime.strptime(merged, "%d/%m/%Y %H:%M")
-            return dt.strftime("%Y-%m-%d %H:%M:%S")
-    except:
-        pass
-
-    return None
-
+from vn_time import parse_vn_time_series
+from output_sink import partitioned_format, read_new_partitions, mark_partitions_consumed
 
 files = {
     "tuoitre": "dataset_paper_tuoitre.csv",
@@ -34,15 +9,22 @@ files = {
 }
 
 all_rows = []
+consumed_parts = []
 
 for source, file in files.items():
-    df = pd.read_csv(file, engine="python", on_bad_lines="skip")
+    if partitioned_format():
+        # Chỉ đọc các part mới kể từ lần tạo summary trước
+        df, parts = read_new_partitions(source, "summary")
+        consumed_parts.extend(parts)
+    else:
+        df = pd.read_csv(file, on_bad_lines="skip")
     df["Source"] = source
-    df["Time"] = df["Time"].apply(normalize_time)
+    df["Time"] = parse_vn_time_series(df["Time"]).dt.strftime("%Y-%m-%d %H:%M:%S")
     all_rows.append(df)
 
 df_all = pd.concat(all_rows, ignore_index=True)
 
 df_all.to_csv("summary_paper.csv", index=False)
+mark_partitions_consumed("summary", consumed_parts)
 
 print("Đã tạo file summary_paper.csv thành công!")
\ No newline at end of file
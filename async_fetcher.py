@@ -0,0 +1,178 @@
+import asyncio
+import contextlib
+import queue
+import threading
+
+import requests
+
+from http_fetcher import fetch_html
+from rate_limiter import get_host, get_limiter, OVERLOAD_STATUSES
+from metrics import inc
+
+# Số request đồng thời tối đa cho mỗi host
+HOST_CONCURRENCY = {
+    'tuoitre.vn': 8,
+    'znews.vn': 6,
+    'vnexpress.net': 6,
+    'vietnamnet.vn': 6,
+}
+DEFAULT_CONCURRENCY = 4
+MAX_ATTEMPTS = 3
+# Số URL chờ tải mỗi host và số kết quả chờ bên gọi lấy: bộ nhớ không tăng theo số URL
+FETCH_QUEUE_SIZE = 32
+
+_DONE = object()
+
+
+# 🛠 Hàm tải một URL, chờ lượt theo bộ giới hạn tốc độ của host tương ứng
+async def _fetch_one(url):
+    """
+    Trả về (url, html) hoặc (url, None) nếu thất bại sau MAX_ATTEMPTS lần.
+    Timeout và 429/5xx được thử lại; khoảng chờ giữa các lần do rate_limiter quyết định.
+    """
+    limiter = get_limiter(url)
+    host = get_host(url)
+    for attempt in range(MAX_ATTEMPTS):
+        try:
+            await asyncio.sleep(limiter.reserve())
+            html = await asyncio.to_thread(fetch_html, url, throttle=False)
+            return url, html
+        except requests.Timeout:
+            print(f"Timeout khi tải {url}, thử lại {attempt+1}/{MAX_ATTEMPTS}")
+            inc('fetch_retries_total', host=host, reason='timeout')
+        except requests.HTTPError as e:
+            if e.response is None or e.response.status_code not in OVERLOAD_STATUSES:
+                print(f"Lỗi HTTP khi tải {url}: {e}")
+                inc('fetch_failures_total', host=host)
+                return url, None
+            print(f"Server quá tải ({e.response.status_code}) khi tải {url}, thử lại {attempt+1}/{MAX_ATTEMPTS}")
+            inc('fetch_retries_total', host=host, reason=f"http_{e.response.status_code}")
+        except requests.RequestException as e:
+            print(f"Lỗi HTTP khi tải {url}: {e}")
+            inc('fetch_failures_total', host=host)
+            return url, None
+    inc('fetch_failures_total', host=host)
+    return url, None
+
+
+# 🛠 Hàm tải song song nhiều URL, trả kết quả theo thứ tự hoàn thành
+async def fetch_all_async(urls, host_concurrency=None, queue_size=FETCH_QUEUE_SIZE):
+    """
+    Async generator trả về (url, html) ngay khi từng trang tải xong.
+    Mỗi host có một hàng đợi giới hạn queue_size URL và số worker bằng giới hạn đồng thời của host;
+    URL được đọc dần từ urls nên số task không tăng theo số URL. Bên gọi dừng sớm thì mọi worker bị hủy.
+    """
+    limits = dict(HOST_CONCURRENCY)
+    if host_concurrency:
+        limits.update(host_concurrency)
+
+    results = asyncio.Queue(queue_size)
+    host_queues = {}
+    workers = []
+
+    async def work(host_queue):
+        while True:
+            url = await host_queue.get()
+            try:
+                item = await _fetch_one(url)
+            except Exception as e:
+                # Lỗi ngoài dự kiến chỉ làm hỏng URL này, worker vẫn nhận URL tiếp theo
+                print(f"Lỗi khi tải {url}: {e}")
+                inc('fetch_failures_total', host=get_host(url))
+                item = url, None
+            try:
+                await results.put(item)
+            finally:
+                host_queue.task_done()
+
+    async def feed():
+        try:
+            for url in urls:
+                host = get_host(url)
+                host_queue = host_queues.get(host)
+                if host_queue is None:
+                    host_queue = host_queues[host] = asyncio.Queue(queue_size)
+                    workers.extend(asyncio.create_task(work(host_queue))
+                                   for _ in range(limits.get(host, DEFAULT_CONCURRENCY)))
+                await host_queue.put(url)
+            for host_queue in host_queues.values():
+                await host_queue.join()
+        except Exception:
+            # Bên đọc nhận _DONE rồi await feeder để lấy lại lỗi (khi bị hủy thì không còn ai đọc)
+            await results.put(_DONE)
+            raise
+        await results.put(_DONE)
+
+    feeder = asyncio.create_task(feed())
+    try:
+        while True:
+            item = await results.get()
+            if item is _DONE:
+                break
+            yield item
+        # Ném lại lỗi của feeder (vd. urls lỗi khi đọc) thay vì kết thúc im lặng
+        await feeder
+    finally:
+        feeder.cancel()
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(feeder, *workers, return_exceptions=True)
+
+
+# 🛠 Hàm tải song song dùng được từ code đồng bộ (các script crawl)
+def fetch_all(urls, host_concurrency=None):
+    """
+    Generator đồng bộ: event loop chạy trong thread riêng, kết quả được đẩy
+    qua queue (có giới hạn) nên bên gọi có thể ghi từng dòng CSV ngay khi bài viết tải xong.
+    Bên gọi dừng sớm (break, lỗi, đóng generator) thì vòng lặp tải bị hủy và thread được join.
+    """
+    urls = list(urls)
+    if not urls:
+        return
+
+    results = queue.Queue(FETCH_QUEUE_SIZE)
+
+    async def _produce():
+        async with contextlib.aclosing(fetch_all_async(urls, host_concurrency)) as items:
+            async for item in items:
+                # put chặn khi queue đầy: chạy trong thread để event loop vẫn nhận được lệnh hủy
+                await asyncio.to_thread(results.put, item)
+
+    loop = asyncio.new_event_loop()
+    producer = loop.create_task(_produce())
+
+    def _run():
+        try:
+            loop.run_until_complete(producer)
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            print(f"Lỗi trong vòng lặp tải song song: {e}")
+        finally:
+            try:
+                loop.run_until_complete(loop.shutdown_asyncgens())
+                loop.run_until_complete(loop.shutdown_default_executor())
+            finally:
+                loop.close()
+                results.put(_DONE)
+
+    worker = threading.Thread(target=_run, daemon=True)
+    worker.start()
+    finished = False
+    try:
+        while True:
+            item = results.get()
+            if item is _DONE:
+                finished = True
+                break
+            yield item
+    finally:
+        if not finished:
+            try:
+                loop.call_soon_threadsafe(producer.cancel)
+            except RuntimeError:
+                pass  # Vòng lặp vừa đóng, _DONE đang trên đường tới
+            # Lấy hết kết quả còn lại để put đang chờ trong producer không bị chặn mãi
+            while results.get() is not _DONE:
+                pass
+        worker.join()
@@ -0,0 +1,385 @@
+import io
+import os
+import time
+import json
+import random
+import multiprocessing
+import shutil
+import resource
+import tempfile
+import threading
+import contextlib
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from email.utils import format_datetime
+from crawler_engine import CrawlEngine, CrawlJob, time_slot_window
+from rate_limiter import get_limiter
+from metrics import REGISTRY
+from replay_server import FixtureSet, ReplayServer, install_replay, XML_CONTENT_TYPE
+from site_adapters import SiteAdapter, SITE_ADAPTERS, vn_timezone
+
+# Thời điểm giả lập của fixture tự sinh: khung giờ crawl là 12:00 - 14:59 ngày 23/11/2024
+SYNTHETIC_NOW = vn_timezone.localize(datetime(2024, 11, 23, 13, 30))
+# Tốc độ request/giây đặt cho rate_limiter khi benchmark (đo code, không đo khoảng nghỉ lịch sự)
+BENCH_RATE = 1000.0
+
+_WEEKDAYS = ['Thứ hai', 'Thứ ba', 'Thứ tư', 'Thứ năm', 'Thứ sáu', 'Thứ bảy', 'Chủ nhật']
+_WORDS = (
+    'người dân thành phố chính phủ kinh tế phát triển năm nay tăng trưởng doanh nghiệp thị trường '
+    'giáo dục học sinh bệnh viện sức khỏe giao thông dự án đầu tư quốc hội chính sách xã hội '
+    'thể thao bóng đá đội tuyển văn hóa du lịch công nghệ điện thoại trí tuệ nhân tạo khoa học'
+).split()
+
+
+# ============================================
+# FIXTURE TỰ SINH (khi chưa có fixture ghi lại từ lần crawl thật)
+# ============================================
+def _sentence(rng, words):
+    return ' '.join(rng.choice(_WORDS) for _ in range(words)).capitalize()
+
+
+# 🛠 Hàm tạo phần khung trang (menu, footer...) để trang có kích thước gần với trang thật
+def _boilerplate(rng, size_kb):
+    links = []
+    size = 0
+    while size < size_kb * 1024:
+        link = f'<li><a href="/chuyen-muc-{len(links)}.htm" title="{_sentence(rng, 4)}">{_sentence(rng, 2)}</a></li>'
+        links.append(link)
+        size += len(link.encode('utf-8'))
+    return f'<div class="footer"><ul>{"".join(links)}</ul></div>'
+
+
+def _page(title, body, boilerplate):
+    return (f'<!DOCTYPE html><html lang="vi"><head><meta charset="utf-8"><title>{title}</title></head>'
+            f'<body>{body}{boilerplate}</body></html>')
+
+
+def _rss(items):
+    entries = ''.join(
+        f'<item><title>{title}</title><link>{url}</link><pubDate>{format_datetime(published)}</pubDate></item>'
+        for url, title, published in items
+    )
+    return f'<?xml version="1.0" encoding="UTF-8"?><rss version="2.0"><channel>{entries}</channel></rss>'
+
+
+def _vn_datetime(published):
+    return f"{_WEEKDAYS[published.weekday()]}, {published:%d/%m/%Y}"
+
+
+class SyntheticSite:
+    """
+    Sinh trang giả lập cho một trang báo theo đúng selector của adapter: trang chủ có menu,
+    trang danh sách có phân trang (hoặc endpoint "xem thêm"), trang bài và RSS/sitemap.
+    Mỗi danh mục có articles_per_category bài trong khung giờ, tiếp theo là một trang bài cũ hơn
+    để crawler phải tự dừng duyệt. Lớp con chỉ viết phần HTML khác nhau giữa các trang.
+    """
+
+    def __init__(self, adapter, window, categories=6, articles_per_category=40, page_size=20,
+                 paragraphs=12, boilerplate_kb=40, seed=0):
+        self.adapter = adapter
+        self.window = window
+        self.categories = categories
+        self.articles_per_category = articles_per_category
+        self.page_size = page_size
+        self.paragraphs = paragraphs
+        self.rng = random.Random(f"{adapter.name}-{seed}")
+        self.boilerplate = _boilerplate(self.rng, boilerplate_kb)
+
+    # 🛠 Hàm tạo thời gian xuất bản (mới nhất trước): các bài trong khung giờ rồi một trang bài cũ hơn
+    def _times(self):
+        span = (self.window.end - self.window.start).total_seconds()
+        in_window = sorted((self.window.start + timedelta(seconds=self.rng.uniform(0, span))
+                            for _ in range(self.articles_per_category)), reverse=True)
+        older = [self.window.start - timedelta(hours=1, minutes=7 * i) for i in range(self.page_size)]
+        return [t.replace(microsecond=0) for t in in_window + older]
+
+    def article_body(self, title):
+        return ''.join(f'<p>{_sentence(self.rng, 45)}.</p>' for _ in range(self.paragraphs))
+
+    # 🛠 Hàm sinh toàn bộ fixture của trang báo, trả về số bài trong khung giờ
+    def build(self, fixtures):
+        categories = []
+        for c in range(self.categories):
+            category_name = f"Danh mục {c + 1}"
+            articles = []
+            for j, published in enumerate(self._times()):
+                url = self.article_url(c, j, published)
+                title = _sentence(self.rng, 10)
+                articles.append((url, title, published))
+                if self.window.contains(published):
+                    fixtures.add(url, _page(title, self.article_html(category_name, title, published), self.boilerplate))
+            categories.append((category_name, self.category_url(c), articles))
+
+        fixtures.add(self.adapter.base_url, _page('Trang chủ', self.menu_html(categories), self.boilerplate))
+        for c, (category_name, category_url, articles) in enumerate(categories):
+            self.add_listing(fixtures, c, category_url, articles)
+        self.add_feeds(fixtures, categories)
+        return self.categories * self.articles_per_category
+
+    # 🛠 Hàm chia danh sách bài thành các trang, thêm một trang rỗng ở cuối
+    def _listing_pages(self, articles):
+        pages = [articles[i:i + self.page_size] for i in range(0, len(articles), self.page_size)]
+        return pages + [[]]
+
+    # Mỗi feed của adapter liệt kê bài của một danh mục (feed thừa lặp lại danh mục, bị discovery bỏ trùng)
+    def add_feeds(self, fixtures, categories):
+        for k, (_, feed_url) in enumerate(self.adapter.feeds):
+            fixtures.add(feed_url, _rss(categories[k % len(categories)][2]), XML_CONTENT_TYPE)
+
+
+class SyntheticTuoiTre(SyntheticSite):
+    def category_url(self, c):
+        return f"{self.adapter.base_url}/danh-muc-{c + 1}.htm"
+
+    def article_url(self, c, j, published):
+        return f"{self.adapter.base_url}/bai-viet-{c + 1}-{j + 1}-{published:%Y%m%d%H%M%S}{j % 1000:03d}.htm"
+
+    def menu_html(self, categories):
+        links = ''.join(f'<li><a href="{url[len(self.adapter.base_url):]}">{name}</a></li>' for name, url, _ in categories)
+        return f'<ul class="menu-nav">{links}</ul>'
+
+    def article_html(self, category_name, title, published):
+        return (f'<div class="detail-time"><div>{published:%d/%m/%Y %H:%M} GMT+7</div></div>'
+                f'<h1 class="detail-title">{title}</h1>'
+                f'<div class="detail-content">{self.article_body(title)}</div>'
+                f'<div class="detail-tab"><a href="/tag-1.htm">{category_name}</a><a href="/tag-2.htm">Tin mới</a></div>')
+
+    # Trang danh mục chỉ cần zone id; bài được lấy qua endpoint timeline
+    def add_listing(self, fixtures, c, category_url, articles):
+        zone_id = 1000 + c
+        fixtures.add(category_url, _page('Danh mục', f'<input type="hidden" id="hdZoneId" value="{zone_id}">', self.boilerplate))
+        for page, page_articles in enumerate(self._listing_pages(articles), start=1):
+            items = ''.join(
+                f'<div class="box-category-item"><a href="{url[len(self.adapter.base_url):]}" title="{title}">{title}</a></div>'
+                for url, title, _ in page_articles
+            )
+            fixtures.add(f"{self.adapter.base_url}/timeline/{zone_id}/trang-{page}.htm", items)
+
+
+class SyntheticZNews(SyntheticSite):
+    def category_url(self, c):
+        return f"{self.adapter.base_url}/danh-muc-{c + 1}.html"
+
+    def article_url(self, c, j, published):
+        return f"{self.adapter.base_url}/bai-viet-{c + 1}-{j + 1}-post{c * 10000 + j}.html"
+
+    def menu_html(self, categories):
+        links = ''.join(f'<li><a href="{url}">{name}</a></li>' for name, url, _ in categories)
+        return f'<div class="page-wrapper"><ul class="normal-category">{links}</ul></div>'
+
+    def article_html(self, category_name, title, published):
+        return (f'<header class="the-article-header">'
+                f'<p class="the-article-category"><a href="#">{category_name}</a></p>'
+                f'<h1 class="the-article-title">{title}</h1>'
+                f'<ul class="the-article-meta"><li class="the-article-publish">{_vn_datetime(published)} {published:%H:%M} (GMT+7)</li></ul>'
+                f'</header><div class="the-article-body">{self.article_body(title)}</div>')
+
+    def add_listing(self, fixtures, c, category_url, articles):
+        base = category_url[:-len('.html')]
+        for page, page_articles in enumerate(self._listing_pages(articles), start=1):
+            items = ''.join(
+                f'<article class="article-item"><p class="article-thumbnail"><a href="{url}"></a></p>'
+                f'<p class="article-title"><a href="{url}">{title}</a></p>'
+                f'<span class="article-publish"><span class="time">{published:%H:%M}</span>'
+                f'<span class="date">{published:%d/%m/%Y}</span></span></article>'
+                for url, title, published in page_articles
+            )
+            page_url = category_url if page == 1 else f"{base}/trang{page}.html"
+            fixtures.add(page_url, _page('Danh mục', f'<div class="article-list">{items}</div>', self.boilerplate))
+
+    # ZNews dùng một news sitemap cho mọi danh mục
+    def add_feeds(self, fixtures, categories):
+        urls = ''.join(
+            f'<url><loc>{url}</loc><news:news><news:publication_date>{published.isoformat()}</news:publication_date>'
+            f'<news:title>{title}</news:title></news:news></url>'
+            for _, _, articles in categories for url, title, published in articles
+        )
+        sitemap = ('<?xml version="1.0" encoding="UTF-8"?>'
+                   '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9" '
+                   f'xmlns:news="http://www.google.com/schemas/sitemap-news/0.9">{urls}</urlset>')
+        for _, feed_url in self.adapter.feeds:
+            fixtures.add(feed_url, sitemap, XML_CONTENT_TYPE)
+
+
+class SyntheticVNExpress(SyntheticSite):
+    def category_url(self, c):
+        return f"{self.adapter.base_url}/danh-muc-{c + 1}"
+
+    def article_url(self, c, j, published):
+        return f"{self.adapter.base_url}/bai-viet-{c + 1}-{j + 1}-{4800000 + c * 10000 + j}.html"
+
+    def menu_html(self, categories):
+        links = ''.join(f'<li><a href="{url[len(self.adapter.base_url):]}">{name}</a></li>' for name, url, _ in categories)
+        return f'<ul class="parent"><li><a href="/">Tin tức</a><ul class="sub">{links}</ul></li></ul>'
+
+    def article_body(self, title):
+        return ''.join(f'<p class="Normal">{_sentence(self.rng, 45)}.</p>' for _ in range(self.paragraphs))
+
+    def article_html(self, category_name, title, published):
+        return (f'<div class="sidebar-1"><div class="header-content">'
+                f'<span class="date">{_vn_datetime(published)}, {published:%H:%M} (GMT+7)</span></div>'
+                f'<h1 class="title-detail">{title}</h1><p class="description">{_sentence(self.rng, 30)}.</p>'
+                f'<article class="fck_detail">{self.article_body(title)}</article>'
+                f'<div class="tags"><a class="item-tag" href="#">{category_name}</a></div></div>')
+
+    # Danh sách -p{n} của VNExpress chỉ được duyệt trong Chrome, benchmark dùng RSS cho trang này
+    def add_listing(self, fixtures, c, category_url, articles):
+        for page, page_articles in enumerate(self._listing_pages(articles), start=1):
+            items = ''.join(
+                f'<article class="item-news" data-publishtime="{int(published.timestamp())}">'
+                f'<h3 class="title-news"><a href="{url}">{title}</a></h3></article>'
+                for url, title, published in page_articles
+            )
+            page_url = category_url if page == 1 else f"{category_url}-p{page}"
+            fixtures.add(page_url, _page('Danh mục', f'<div class="list-news-subfolder">{items}</div>', self.boilerplate))
+
+
+SYNTHETIC_SITES = {
+    'tuoitre': SyntheticTuoiTre,
+    'znews': SyntheticZNews,
+    'vnexpress': SyntheticVNExpress,
+}
+
+
+# 🛠 Hàm sinh fixture giả lập cho các trang báo (không cần mạng, không cần lần crawl trước)
+def build_synthetic_fixtures(sites, now=SYNTHETIC_NOW, **options):
+    window = time_slot_window(now)
+    fixtures = FixtureSet(now)
+    for site in sites:
+        generator = SYNTHETIC_SITES[site](SITE_ADAPTERS[site](), window, **options)
+        fixtures.expected[site] = generator.build(fixtures)
+    return fixtures
+
+
+# ============================================
+# CHẠY BENCHMARK
+# ============================================
+# 🛠 Hàm bọc một hàm để cộng dồn thời gian chạy và số lần gọi vào totals[key]
+def _timed(func, totals, key, lock):
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            with lock:
+                seconds, calls = totals.get(key, (0.0, 0))
+                totals[key] = (seconds + elapsed, calls + 1)
+    return wrapper
+
+
+# 🛠 Hàm kiểm tra adapter có duyệt danh sách bằng HTTP được không (không thì cần Chrome)
+def supports_http_listing(adapter):
+    return type(adapter).listing_page_url is not SiteAdapter.listing_page_url
+
+
+# 🛠 Hàm lấy RSS đỉnh (MB) của riêng tiến trình hiện tại
+def _peak_rss_mb():
+    # VmHWM thuộc bộ nhớ của tiến trình nên tiến trình spawn mới bắt đầu từ 0; ru_maxrss thì được giữ
+    # qua fork/exec (mang theo đỉnh của tiến trình cha), chỉ dùng khi không có /proc
+    try:
+        with open('/proc/self/status', encoding='ascii') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # ru_maxrss trên Linux tính bằng KB
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+# 🛠 Hàm crawl một trang báo qua server phát lại (chạy trong tiến trình con để đo RSS riêng)
+def _bench_site(site, address, now, discovery_mode, rate, workdir, verbose):
+    os.chdir(workdir)
+    install_replay(address)
+    adapter = SITE_ADAPTERS[site]()
+    limiter = get_limiter(adapter.base_url)
+    limiter.rate = limiter.max_rate = rate
+    limiter.burst = max(limiter.burst, int(rate))
+
+    totals = {}
+    lock = threading.Lock()
+    adapter.parse_article = _timed(adapter.parse_article, totals, 'parse_article', lock)
+    adapter.parse_time = _timed(adapter.parse_time, totals, 'parse_time', lock)
+
+    log = io.StringIO()
+    with contextlib.nullcontext() if verbose else contextlib.redirect_stdout(log):
+        engine = CrawlEngine()
+        start = time.perf_counter()
+        try:
+            written = engine.run([CrawlJob(adapter, time_slot_window(now), discovery_mode)]).get(adapter.source, 0)
+        finally:
+            engine.close()
+        elapsed = time.perf_counter() - start
+
+    return {
+        'site': site,
+        'discovery': discovery_mode,
+        'articles': written,
+        'seconds': elapsed,
+        'parse_article': totals.get('parse_article', (0.0, 0)),
+        'parse_time': totals.get('parse_time', (0.0, 0)),
+        'peak_rss_mb': _peak_rss_mb(),
+        # Số liệu theo giai đoạn của crawler (xem metrics.py) để so sánh chi tiết trong file JSON
+        'metrics': REGISTRY.snapshot(),
+    }
+
+
+# 🛠 Hàm chạy benchmark lần lượt từng trang báo trên cùng một server phát lại
+def run_benchmark(sites, fixtures, latency=0.0, jitter=0.0, error_rate=0.0, discovery_mode='categories',
+                  rate=BENCH_RATE, verbose=False, seed=0):
+    """
+    Mỗi trang báo chạy trong một tiến trình con mới (spawn, không fork: không mang theo bộ nhớ
+    fixture của tiến trình cha) với thư mục làm việc tạm (CSV, kho URL, cache, archive, frontier
+    đều trống) nên các lần chạy độc lập và đo được RSS của riêng nó.
+    Trả về danh sách kết quả (dict) theo từng trang.
+    """
+    server = ReplayServer(fixtures, latency, jitter, error_rate, seed).start()
+    results = []
+    try:
+        for site in sites:
+            mode = discovery_mode
+            if mode == 'categories' and not supports_http_listing(SITE_ADAPTERS[site]()):
+                print(f"[{site}] Danh sách bài chỉ duyệt được bằng Chrome, benchmark dùng RSS/sitemap.")
+                mode = 'feeds'
+
+            before = server.stats()
+            workdir = tempfile.mkdtemp(prefix=f"bench-{site}-")
+            try:
+                with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as executor:
+                    result = executor.submit(
+                        _bench_site, site, server.address, fixtures.now, mode, rate, workdir, verbose
+                    ).result()
+            finally:
+                shutil.rmtree(workdir, ignore_errors=True)
+
+            after = server.stats()
+            for key in ('served', 'not_modified', 'errors', 'not_found', 'bytes'):
+                result[key] = after[key] - before[key]
+            result['expected'] = fixtures.expected.get(site)
+            results.append(result)
+            print_result(result)
+    finally:
+        server.close()
+    return results
+
+
+# 🛠 Hàm in kết quả của một trang báo
+def print_result(result):
+    seconds = max(result['seconds'], 1e-9)
+    pages = result['served'] + result['not_modified']
+    article_seconds, article_calls = result['parse_article']
+    time_seconds, time_calls = result['parse_time']
+    expected = f"/{result['expected']}" if result['expected'] else ''
+    print(f"[{result['site']}] ({result['discovery']}) {result['seconds']:.2f}s | "
+          f"{pages} trang ({pages / seconds:.1f} trang/s, {result['bytes'] / seconds / 1024 / 1024:.1f} MB/s) | "
+          f"{result['articles']}{expected} bài ({result['articles'] / seconds:.1f} bài/s) | "
+          f"parse bài {article_seconds * 1000:.0f}ms ({article_seconds / max(article_calls, 1) * 1000:.2f}ms/bài) | "
+          f"parse thời gian {time_seconds / max(time_calls, 1) * 1e6:.1f}µs/lần | "
+          f"lỗi giả lập {result['errors']}, 404 {result['not_found']} | RSS đỉnh {result['peak_rss_mb']:.0f}MB")
+
+
+# 🛠 Hàm lưu kết quả ra JSON để so sánh giữa các lần tối ưu
+def save_results(results, path):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
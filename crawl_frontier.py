@@ -0,0 +1,165 @@
+import os
+import json
+import threading
+from datetime import datetime
+
+# Mỗi trang báo có một file log frontier trong thư mục này
+FRONTIER_DIR = os.getenv('CRAWL_FRONTIER_DIR', 'crawl_frontier')
+# Bài đã bắt đầu tải quá số lần này (qua nhiều lần chạy bị ngắt) thì bỏ, tránh kẹt mãi ở một URL hỏng
+MAX_FRONTIER_ATTEMPTS = 3
+
+# Độ ưu tiên khi tiếp tục: bài từ RSS/sitemap trước, bài từ duyệt danh mục sau
+FEED_PRIORITY = 0
+CATEGORY_PRIORITY = 1
+
+
+class CrawlFrontier:
+    """
+    Frontier của một lần crawl (một trang báo, một khung giờ), ghi dạng log chỉ nối thêm
+    (JSON lines, mỗi thao tác một dòng) thay vì ghi lại cả file như crawler_state.pkl:
+      window     – header: khung giờ của lần chạy
+      queue      – URL được tìm thấy (kèm danh mục, độ ưu tiên)
+      start      – bắt đầu tải URL (đang xử lý)
+      done       – URL đã xử lý xong (bỏ qua, lỗi parse, hoặc dòng kết quả đã ghi xuống đĩa)
+      category   – đã tìm xong bài của một danh mục
+      discovered – đã tìm xong toàn bộ danh mục
+    Khi khởi động lại, log được đọc lại để biết URL nào còn đang chờ / đang dở.
+    File log chỉ bị xóa khi lần chạy kết thúc bình thường và không còn bài chờ thử lại.
+    """
+
+    def __init__(self, site, frontier_dir=FRONTIER_DIR):
+        self.site = site
+        self.path = os.path.join(frontier_dir, f"{site}.log")
+        os.makedirs(frontier_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._file = None
+        self._clear_state()
+        if os.path.exists(self.path):
+            self._replay()
+            self._file = open(self.path, 'a', encoding='utf-8')
+
+    def _clear_state(self):
+        self.window = None              # (start, end, now) của lần chạy ghi trong log
+        self.queued = {}                # url -> (danh mục, độ ưu tiên, thứ tự) của các URL chưa xong
+        self.attempts = {}              # url -> số lần đã bắt đầu tải
+        self.done = set()
+        self.buffered = set()           # URL đã ghi vào bộ đệm output nhưng chưa xuống đĩa (không ghi log)
+        self.categories_done = set()
+        self.discovery_done = False
+        self._seq = 0
+
+    # 🛠 Hàm áp dụng một dòng log vào trạng thái trong bộ nhớ
+    def _apply(self, entry):
+        op = entry.get('op')
+        url = entry.get('url')
+        if op == 'window':
+            self.window = tuple(datetime.fromisoformat(entry[key]) for key in ('start', 'end', 'now'))
+        elif op == 'queue':
+            if url not in self.done and url not in self.queued:
+                self.queued[url] = (entry.get('category'), entry.get('priority', CATEGORY_PRIORITY), self._seq)
+                self._seq += 1
+        elif op == 'start':
+            self.attempts[url] = self.attempts.get(url, 0) + 1
+        elif op == 'done':
+            self.done.add(url)
+            self.queued.pop(url, None)
+        elif op == 'category':
+            self.categories_done.add(entry.get('name'))
+        elif op == 'discovered':
+            self.discovery_done = True
+
+    # 🛠 Hàm đọc lại log; dòng cuối bị ghi dở (do crash) được bỏ qua
+    def _replay(self):
+        with open(self.path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    self._apply(json.loads(line))
+                except (ValueError, KeyError):
+                    continue
+        print(f"[{self.site}] Đọc lại frontier: {len(self.queued)} URL còn chờ, "
+              f"{len(self.done)} URL đã xong, {len(self.categories_done)} danh mục đã duyệt")
+
+    def _append(self, entries, sync=False):
+        with self._lock:
+            for entry in entries:
+                self._apply(entry)
+                self._file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            self._file.flush()
+            if sync:
+                os.fsync(self._file.fileno())
+
+    # 🛠 Hàm bắt đầu log mới cho khung giờ window (ghi file tạm rồi rename)
+    def reset(self, window):
+        with self._lock:
+            if self._file:
+                self._file.close()
+            self._clear_state()
+            header = {'op': 'window', **{key: value.isoformat() for key, value in zip(('start', 'end', 'now'), window)}}
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(json.dumps(header) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+            self._apply(header)
+            self._file = open(self.path, 'a', encoding='utf-8')
+
+    # 🛠 Hàm kiểm tra log có thuộc đúng khung giờ window không
+    def matches(self, window):
+        return self.window is not None and self.window[:2] == tuple(window[:2])
+
+    def enqueue(self, urls, category_name, priority=CATEGORY_PRIORITY):
+        self._append([
+            {'op': 'queue', 'url': url, 'category': category_name, 'priority': priority}
+            for url in urls if url not in self.done and url not in self.queued
+        ])
+
+    def mark_started(self, urls):
+        self._append([{'op': 'start', 'url': url} for url in urls])
+
+    def mark_done(self, url):
+        self._append([{'op': 'done', 'url': url}])
+
+    # 🛠 Hàm ghi nhận URL đang nằm trong bộ đệm output: không tải lại trong lần chạy này,
+    # nhưng chưa log "done" để crash trước khi ghi xuống đĩa thì lần sau vẫn crawl lại
+    def mark_buffered(self, url):
+        with self._lock:
+            self.buffered.add(url)
+
+    # 🛠 Hàm đánh dấu xong các URL vừa được ghi xuống đĩa (bỏ qua URL không thuộc frontier này)
+    def mark_written(self, urls):
+        entries = [{'op': 'done', 'url': url} for url in urls if url in self.queued]
+        if entries:
+            self._append(entries)
+
+    def is_done(self, url):
+        return url in self.done or url in self.buffered
+
+    def finish_category(self, category_name):
+        self._append([{'op': 'category', 'name': category_name}], sync=True)
+
+    def finish_discovery(self):
+        self._append([{'op': 'discovered'}], sync=True)
+
+    # 🛠 Hàm lấy các URL còn chờ (kể cả đang dở khi bị ngắt), nhóm theo danh mục và theo độ ưu tiên
+    def pending(self):
+        by_category = {}
+        items = sorted(self.queued.items(), key=lambda item: (item[1][1], item[1][2]))
+        for url, (category_name, _, _) in items:
+            if self.attempts.get(url, 0) >= MAX_FRONTIER_ATTEMPTS:
+                print(f"Bỏ bài {url}: đã thử {self.attempts[url]} lần qua các lần chạy bị ngắt.")
+                continue
+            by_category.setdefault(category_name, []).append(url)
+        return list(by_category.items())
+
+    def has_pending(self):
+        return any(self.attempts.get(url, 0) < MAX_FRONTIER_ATTEMPTS for url in self.queued)
+
+    # 🛠 Hàm đóng log; lần chạy hoàn tất và không còn bài chờ thử lại thì xóa file
+    def close(self, completed=False):
+        with self._lock:
+            if self._file:
+                self._file.close()
+                self._file = None
+            if completed and not self.has_pending() and os.path.exists(self.path):
+                os.remove(self.path)
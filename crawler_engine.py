@@ -0,0 +1,477 @@
+import os
+import time
+import socket
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from http_fetcher import close_session
+from driver_pool import DriverPool, DEFAULT_POOL_SIZE
+from async_fetcher import fetch_all
+from seen_store import SeenUrlStore
+from output_sink import OutputSink
+from rate_limiter import print_rate_stats
+from metrics import inc, timer, start_metrics_server, write_metrics
+from crawl_frontier import CrawlFrontier, FEED_PRIORITY, CATEGORY_PRIORITY
+from work_queue import CrawlTask
+from html_archive import HtmlArchive, open_archive, read_record, HTML_ARCHIVE_DIR
+from discovery import discover_feed_articles
+from site_adapters import vn_timezone, SITE_ADAPTERS
+
+# 'categories' (mặc định): luôn duyệt danh mục trên menu;
+# 'feeds' (bật bằng CRAWL_DISCOVERY=feeds): tìm bài qua RSS/sitemap, chỉ duyệt danh mục khi feed không trả về gì.
+# Cột Category của bài lấy từ feed là tên feed (hoặc danh mục trên trang bài với sitemap ZNews),
+# không phải tên danh mục trên menu, nên không bật mặc định.
+DISCOVERY_MODE = os.getenv('CRAWL_DISCOVERY', 'categories')
+
+# Số bản ghi mỗi tiến trình con parse một lần khi chạy lại trên archive
+REPARSE_CHUNK_SIZE = 200
+
+# Chế độ phân tán: số bài mỗi lần worker nhận từ hàng đợi (kết quả được ghi xuống đĩa trước khi ack cả nhóm)
+WORKER_BATCH_SIZE = 50
+# Số giây worker chờ trước khi hỏi lại khi hàng đợi rỗng
+WORKER_POLL_INTERVAL = 5
+
+
+class CrawlWindow(namedtuple('CrawlWindow', ['start', 'end', 'now'])):
+    """Khung giờ [start, end] cần crawl; now là thời điểm chạy (dùng cho thời gian tương đối)."""
+
+    __slots__ = ()
+
+    def contains(self, article_time):
+        return article_time is not None and self.start <= article_time <= self.end
+
+    def __str__(self):
+        return f"{self.start.strftime('%Y-%m-%d %H:%M:%S')} đến {self.end.strftime('%Y-%m-%d %H:%M:%S')}"
+
+
+# 🛠 Hàm tính khung giờ 3 tiếng chứa thời điểm hiện tại
+def time_slot_window(now=None):
+    # Chia ngày thành các khung 3 tiếng: 0-2, 3-5, 6-8, 9-11, 12-14, 15-17, 18-20, 21-23
+    now = now or datetime.now(vn_timezone)
+    time_slot_start_hour = (now.hour // 3) * 3  # Làm tròn xuống bội số của 3
+
+    # Tạo khung giờ: từ X:00:00 đến X+2:59:59
+    time_start = now.replace(hour=time_slot_start_hour, minute=0, second=0, microsecond=0)
+    time_end = time_start.replace(hour=time_slot_start_hour + 2, minute=59, second=59, microsecond=999999)
+    return CrawlWindow(time_start, time_end, now)
+
+
+# 🛠 Hàm tính khung giờ của cả ngày hôm qua
+def yesterday_window(now=None):
+    now = now or datetime.now(vn_timezone)
+    yesterday = now - timedelta(days=1)
+    time_start = yesterday.replace(hour=0, minute=0, second=0, microsecond=0)
+    time_end = yesterday.replace(hour=23, minute=59, second=59, microsecond=999999)
+    return CrawlWindow(time_start, time_end, now)
+
+
+class CrawlJob:
+    """Một trang báo cần crawl trong một khung giờ."""
+
+    def __init__(self, adapter, window, discovery_mode=DISCOVERY_MODE):
+        self.adapter = adapter
+        self.window = window
+        self.discovery_mode = discovery_mode
+
+
+class CrawlEngine:
+    """
+    Chạy song song nhiều trang báo trong cùng một tiến trình. Các trang dùng chung
+    session HTTP, pool Chrome (chỉ mở khi có danh mục không duyệt được bằng HTTP), kho URL đã crawl
+    và file kết quả; phần riêng của từng trang nằm trong site_adapters.
+    """
+
+    def __init__(self, pool_size=DEFAULT_POOL_SIZE, seen_store=None, output_formats=None):
+        self.pool_size = pool_size
+        self.output_formats = output_formats
+        self.page_load_timeout = 120
+        self.crawled_urls = seen_store if seen_store is not None else SeenUrlStore()
+        self.archive = open_archive()
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        self._outputs = {}
+        self._outputs_lock = threading.Lock()
+        self._adapters = {}
+
+    # 🛠 Hàm lấy pool Chrome dùng chung, chỉ khởi tạo ở lần đầu có trang cần đến
+    def get_pool(self):
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = DriverPool(self.pool_size, page_load_timeout=self.page_load_timeout)
+            return self._pool
+
+    # 🛠 Hàm mượn một driver Chrome (pool chỉ được mở khi có danh mục thật sự cần trình duyệt)
+    def acquire_driver(self):
+        return self.get_pool().acquire()
+
+    # 🛠 Hàm lấy bộ ghi kết quả của trang báo (các job cùng file CSV dùng chung một đối tượng)
+    def get_output(self, adapter):
+        with self._outputs_lock:
+            output = self._outputs.get(adapter.csv_file)
+            if output is None:
+                output = OutputSink(adapter.name, adapter.csv_file, adapter.append_output, self.output_formats)
+                # Chỉ đánh dấu đã crawl khi dòng đã được ghi xuống đĩa
+                output.on_flush(lambda rows: self.crawled_urls.add_many([row[1] for row in rows], adapter.source))
+                self._outputs[adapter.csv_file] = output
+            return output
+
+    # 🛠 Hàm tìm bài mới, trả về lần lượt (tên danh mục, danh sách URL, độ ưu tiên)
+    def discover(self, job, skip_categories=()):
+        adapter, window = job.adapter, job.window
+
+        # Ưu tiên RSS/sitemap: vài request HTTP là biết các bài mới trong khung giờ
+        if job.discovery_mode == 'feeds' and adapter.feeds:
+            with timer('discovery_seconds', site=adapter.name, method='feeds'):
+                feed_articles = discover_feed_articles(adapter.feeds, window.start, window.end, vn_timezone)
+            if feed_articles:
+                for category_name, article_urls in feed_articles.items():
+                    if category_name not in skip_categories:
+                        yield category_name, article_urls, FEED_PRIORITY
+                return
+
+        # Menu đọc qua HTTP (có cache); chỉ mở Chrome khi HTML tĩnh không có menu
+        with timer('discovery_seconds', site=adapter.name, method='menu'):
+            categories = adapter.list_categories_http()
+            if not categories:
+                with self.acquire_driver() as pooled:
+                    categories = adapter.list_categories(pooled)
+        if not categories:
+            print(f"Không tìm thấy menu của {adapter.source}")
+            return
+
+        # Danh mục đã duyệt xong trước khi lần chạy trước bị ngắt thì không duyệt lại
+        categories = [category for category in categories if category[0] not in skip_categories]
+
+        # Các danh mục được duyệt song song; bài viết được tải ngay khi danh mục xong
+        def worker(category):
+            with timer('discovery_seconds', site=adapter.name, method='category'):
+                return adapter.discover_category(self.acquire_driver, category, window)
+
+        with ThreadPoolExecutor(max_workers=self.pool_size) as executor:
+            futures = {executor.submit(worker, category): category for category in categories}
+            for future in as_completed(futures):
+                category_name = futures[future][0]
+                try:
+                    article_urls = future.result()
+                except Exception as e:
+                    print(f"Lỗi khi xử lý danh mục {category_name}: {e}")
+                    continue
+                yield category_name, article_urls, CATEGORY_PRIORITY
+
+    # 🛠 Hàm lưu HTML gốc, parse và ghi một bài đã tải; trả về True nếu bài được ghi
+    def process_article(self, job, category_name, article_url, html, output):
+        adapter, window = job.adapter, job.window
+        # Lưu HTML gốc trước khi parse để sửa selector xong có thể parse lại mà không crawl lại
+        if self.archive:
+            with timer('archive_write_seconds', site=adapter.name):
+                self.archive.write(article_url, html, adapter.name, category_name)
+        try:
+            with timer('article_parse_seconds', site=adapter.name):
+                row = adapter.parse_article(html, article_url, category_name)
+        except Exception as e:
+            print(f"Lỗi khi xử lý {article_url}: {e}")
+            inc('articles_total', site=adapter.name, result='parse_error')
+            return False
+        if row is None:
+            inc('articles_total', site=adapter.name, result='empty')
+            return False
+
+        # Kiểm tra thời gian bài viết
+        with timer('time_parse_seconds', site=adapter.name):
+            article_time = adapter.parse_time(row[4], window.now)
+        if not window.contains(article_time):
+            print(f"Bài viết {article_url} không trong khung giờ, bỏ qua.")
+            inc('articles_total', site=adapter.name, result='outside_window')
+            return False
+
+        output.write(row)
+        inc('articles_total', site=adapter.name, result='written')
+        print(f"Đã crawl bài {article_url} - Thời gian: {row[4]}")
+        return True
+
+    # 🛠 Hàm crawl song song các bài báo của một danh mục (tải bằng HTTP), trả về số bài đã ghi
+    def crawl_articles(self, job, category_name, article_urls, output, frontier):
+        pending = []
+        for article_url in article_urls:
+            if article_url in self.crawled_urls:
+                print(f"Bài {article_url} đã được crawl, bỏ qua.")
+                inc('articles_total', site=job.adapter.name, result='seen')
+                frontier.mark_done(article_url)
+            elif not frontier.is_done(article_url):
+                pending.append(article_url)
+
+        frontier.mark_started(pending)
+        written = 0
+        for article_url, html in fetch_all(pending):
+            if html is None:
+                # Giữ trong frontier để lần chạy sau thử lại
+                print(f"Không crawl được bài {article_url}, bỏ qua.")
+                inc('articles_total', site=job.adapter.name, result='fetch_failed')
+                continue
+            if self.process_article(job, category_name, article_url, html, output):
+                # Bài nằm trong bộ đệm của output: chỉ đánh dấu xong khi batch được ghi xuống đĩa (on_flush)
+                frontier.mark_buffered(article_url)
+                written += 1
+            else:
+                frontier.mark_done(article_url)
+        return written
+
+    # 🛠 Hàm crawl một trang báo, trả về số bài đã ghi
+    def run_job(self, job):
+        with timer('job_seconds', site=job.adapter.name):
+            return self._run_job(job)
+
+    def _run_job(self, job):
+        adapter = job.adapter
+        print(f"[{adapter.source}] Khung giờ crawl: {job.window}")
+        output = self.get_output(adapter)
+        frontier = CrawlFrontier(adapter.name)
+        # Bài đã ghi chỉ được log "done" sau khi nằm trên đĩa: crash giữa chừng thì lần sau crawl lại
+        mark_written = lambda rows: frontier.mark_written([row[1] for row in rows])
+        output.on_flush(mark_written)
+        written = 0
+        completed = False
+        try:
+            # Lần chạy trước của khung giờ khác bị ngắt: crawl nốt các bài còn chờ theo khung giờ cũ
+            if frontier.window is not None and not frontier.matches(job.window):
+                old_job = CrawlJob(adapter, CrawlWindow(*frontier.window), job.discovery_mode)
+                for category_name, article_urls in frontier.pending():
+                    print(f"[{adapter.source}] Crawl nốt {len(article_urls)} bài còn chờ của khung giờ {old_job.window}")
+                    written += self.crawl_articles(old_job, category_name, article_urls, output, frontier)
+            if not frontier.matches(job.window):
+                # Bài của khung giờ cũ phải nằm trên đĩa trước khi log cũ bị thay
+                output.flush()
+                frontier.reset(job.window)
+
+            # Các bài đã tìm thấy nhưng chưa xử lý xong trước khi bị ngắt
+            for category_name, article_urls in frontier.pending():
+                written += self.crawl_articles(job, category_name, article_urls, output, frontier)
+
+            if not frontier.discovery_done:
+                for category_name, article_urls, priority in self.discover(job, frontier.categories_done):
+                    frontier.enqueue(article_urls, category_name, priority)
+                    written += self.crawl_articles(job, category_name, article_urls, output, frontier)
+                    frontier.finish_category(category_name)
+                frontier.finish_discovery()
+            completed = True
+        except Exception as e:
+            print(f"Lỗi chính ({adapter.source}): {e}")
+        finally:
+            try:
+                output.flush()
+            except Exception as e:
+                print(f"Lỗi khi ghi batch kết quả: {e}")
+                completed = False
+            output.remove_listener(mark_written)
+            frontier.close(completed)
+        print(f"[{adapter.source}] Đã ghi {written} bài mới.")
+        return written
+
+    # 🛠 Hàm tìm bài của một job và đưa vào hàng đợi dùng chung (chế độ phân tán), trả về số bài mới
+    def enqueue_job(self, job, work_queue):
+        adapter = job.adapter
+        window = tuple(value.isoformat() for value in job.window)
+        print(f"[{adapter.source}] Khung giờ crawl: {job.window}")
+        added = 0
+        for category_name, article_urls, priority in self.discover(job):
+            tasks = [CrawlTask(url, adapter.name, category_name, window, priority)
+                     for url in article_urls if url not in self.crawled_urls]
+            added += work_queue.enqueue(tasks)
+        print(f"[{adapter.source}] Đã đưa {added} bài mới vào hàng đợi.")
+        return added
+
+    # 🛠 Hàm lấy adapter của trang báo (mỗi engine một đối tượng cho mỗi trang)
+    def get_adapter(self, site):
+        adapter = self._adapters.get(site)
+        if adapter is None:
+            adapter = self._adapters[site] = SITE_ADAPTERS[site]()
+        return adapter
+
+    # 🛠 Hàm tải và xử lý một nhóm bài nhận từ hàng đợi, trả về ([(url, kết quả)], [url tải lỗi])
+    def crawl_tasks(self, tasks, work_queue=None, worker_id=None):
+        """work_queue: chỉ ghi các bài worker còn giữ lease (bài đã xong hoặc đã giao cho worker khác thì bỏ)."""
+        results = []
+        failed = []
+        pending = {}
+        for task in tasks:
+            if task.site not in SITE_ADAPTERS:
+                print(f"Không có trang báo {task.site} cho bài {task.url}, bỏ qua.")
+                results.append((task.url, 'unknown_site'))
+            elif task.url in self.crawled_urls:
+                # Bài được giao lại sau khi worker khác đã ghi xong
+                inc('articles_total', site=task.site, result='seen')
+                results.append((task.url, 'seen'))
+            else:
+                pending[task.url] = task
+
+        fetched = []
+        for article_url, html in fetch_all(pending):
+            if html is None:
+                inc('articles_total', site=pending[article_url].site, result='fetch_failed')
+                failed.append(article_url)
+            else:
+                fetched.append((article_url, html))
+
+        # Hỏi lại hàng đợi dùng chung (mọi máy) ngay trước khi ghi: lease hết hạn trong lúc tải
+        # thì bài đã thuộc về worker khác, không ghi và không ack
+        if work_queue is not None and fetched:
+            owned = work_queue.owned(worker_id, [article_url for article_url, _ in fetched])
+            for article_url, _ in fetched:
+                if article_url not in owned:
+                    print(f"Bài {article_url} đã hết lease (đã xong hoặc giao cho worker khác), bỏ qua.")
+                    inc('articles_total', site=pending[article_url].site, result='lease_lost')
+            fetched = [(article_url, html) for article_url, html in fetched if article_url in owned]
+
+        jobs = {}
+        for article_url, html in fetched:
+            task = pending[article_url]
+            job = jobs.get((task.site, task.window))
+            if job is None:
+                window = CrawlWindow(*(datetime.fromisoformat(value) for value in task.window))
+                job = jobs[(task.site, task.window)] = CrawlJob(self.get_adapter(task.site), window)
+            written = self.process_article(job, task.category, article_url, html, self.get_output(job.adapter))
+            results.append((article_url, 'written' if written else 'skipped'))
+        return results, failed
+
+    # 🛠 Hàm chạy worker: nhận bài từ hàng đợi, tải, parse, ghi kết quả rồi ack; trả về số bài đã ghi
+    def run_worker(self, work_queue, worker_id=None, batch_size=WORKER_BATCH_SIZE, idle_timeout=None):
+        """idle_timeout: dừng khi hàng đợi rỗng quá số giây này (None: chạy cho tới khi bị dừng)."""
+        worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        start_metrics_server()
+        print(f"Worker {worker_id} bắt đầu nhận bài")
+        written = 0
+        idle_since = time.monotonic()
+        while True:
+            tasks = work_queue.claim(worker_id, batch_size)
+            if not tasks:
+                idle = time.monotonic() - idle_since
+                if idle_timeout is not None and idle >= idle_timeout:
+                    break
+                time.sleep(WORKER_POLL_INTERVAL if idle_timeout is None else min(WORKER_POLL_INTERVAL, idle_timeout - idle))
+                continue
+
+            results, failed = self.crawl_tasks(tasks, work_queue, worker_id)
+            # Chỉ ack khi kết quả đã nằm trên đĩa: worker chết trước đó thì bài được giao lại khi hết lease
+            with self._outputs_lock:
+                outputs = list(self._outputs.values())
+            for output in outputs:
+                output.flush()
+            work_queue.ack(worker_id, results)
+            work_queue.release(worker_id, failed)
+            written += sum(1 for _, result in results if result == 'written')
+            idle_since = time.monotonic()
+        print(f"Worker {worker_id} dừng (hàng đợi rỗng), đã ghi {written} bài.")
+        return written
+
+    # 🛠 Hàm chạy đồng thời các job, mỗi trang báo một luồng
+    def run(self, jobs, work_queue=None):
+        """work_queue: chỉ tìm bài và đưa vào hàng đợi cho các worker (chế độ phân tán)."""
+        if not jobs:
+            return {}
+        self.page_load_timeout = max(job.adapter.page_load_timeout for job in jobs)
+        start_metrics_server()
+
+        # Nhập lịch sử từ CSV trước khi file kết quả có thể bị ghi lại từ đầu
+        for job in jobs:
+            self.crawled_urls.seed_from_csv(job.adapter.csv_file, job.adapter.source)
+
+        results = {}
+        with ThreadPoolExecutor(max_workers=len(jobs)) as executor:
+            if work_queue is not None:
+                futures = {executor.submit(self.enqueue_job, job, work_queue): job for job in jobs}
+            else:
+                futures = {executor.submit(self.run_job, job): job for job in jobs}
+            for future in as_completed(futures):
+                job = futures[future]
+                try:
+                    results[job.adapter.source] = future.result()
+                except Exception as e:
+                    print(f"Lỗi khi crawl {job.adapter.source}: {e}")
+        return results
+
+    def close(self):
+        if self._pool:
+            self._pool.close()
+        for output in self._outputs.values():
+            output.close()
+        print_rate_stats()
+        write_metrics()
+        close_session()
+        if self.archive:
+            self.archive.close()
+        self.crawled_urls.close()
+
+
+# 🛠 Hàm chạy các job trên một engine rồi giải phóng tài nguyên
+def run_crawl(jobs):
+    engine = CrawlEngine()
+    try:
+        results = engine.run(jobs)
+    finally:
+        engine.close()
+    print("Hoàn tất quá trình thu thập dữ liệu.")
+    return results
+
+
+# 🛠 Hàm parse lại một nhóm bản ghi trong archive (chạy trong tiến trình con)
+def _reparse_chunk(archive_dir, site, locations):
+    adapter = SITE_ADAPTERS[site]()
+    rows = []
+    for url, category_name, segment, offset, length in locations:
+        try:
+            _, body = read_record(archive_dir, segment, offset, length)
+            row = adapter.parse_article(body.decode('utf-8'), url, category_name)
+        except Exception as e:
+            print(f"Lỗi khi parse lại {url}: {e}")
+            continue
+        if row is not None:
+            rows.append(row)
+    return site, rows
+
+
+# 🛠 Hàm chạy các site adapter trên HTML đã lưu, ghi kết quả ra reparsed_<file CSV của trang>
+def reparse_archive(sites=None, workers=None, archive_dir=HTML_ARCHIVE_DIR, chunk_size=REPARSE_CHUNK_SIZE):
+    """Không gửi request nào; các nhóm bản ghi được parse song song trên nhiều tiến trình."""
+    archive = HtmlArchive(archive_dir)
+    try:
+        locations = archive.locations(sites)
+    finally:
+        archive.close()
+
+    chunks = []
+    by_site = {}
+    for url, site, category_name, segment, offset, length in locations:
+        if site not in SITE_ADAPTERS:
+            continue
+        by_site.setdefault(site, []).append((url, category_name, segment, offset, length))
+    for site, site_locations in by_site.items():
+        for i in range(0, len(site_locations), chunk_size):
+            chunks.append((site, site_locations[i:i + chunk_size]))
+    print(f"Parse lại {len(locations)} bản ghi ({len(chunks)} nhóm) từ {archive_dir}")
+
+    outputs = {}
+    counts = {}
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(_reparse_chunk, archive_dir, site, chunk) for site, chunk in chunks]
+            for future in as_completed(futures):
+                try:
+                    site, rows = future.result()
+                except Exception as e:
+                    print(f"Lỗi khi parse lại một nhóm bản ghi: {e}")
+                    continue
+                output = outputs.get(site)
+                if output is None:
+                    output = OutputSink(site, f"reparsed_{SITE_ADAPTERS[site].csv_file}", formats=['csv'])
+                    outputs[site] = output
+                for row in rows:
+                    output.write(row)
+                counts[site] = counts.get(site, 0) + len(rows)
+    finally:
+        for output in outputs.values():
+            output.close()
+
+    for site, count in counts.items():
+        print(f"[{site}] Đã ghi {count} bài vào reparsed_{SITE_ADAPTERS[site].csv_file}")
+    return counts
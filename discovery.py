@@ -0,0 +1,255 @@
+import re
+from datetime import datetime
+from email.utils import parsedate_to_datetime
+from xml.etree import ElementTree
+
+from html_parser import parse_html
+from http_fetcher import fetch_html, fetch_bytes
+
+# Số trang tối đa duyệt cho một danh mục (chặn vòng lặp vô hạn nếu endpoint lặp lại dữ liệu)
+MAX_LISTING_PAGES = 50
+
+# Các mẫu chứa zone id của danh mục trong HTML Tuổi Trẻ
+_TUOITRE_ZONE_PATTERNS = [
+    re.compile(r'id="hdZoneId"[^>]*value="(\d+)"'),
+    re.compile(r'data-zone-?id="(\d+)"', re.IGNORECASE),
+    re.compile(r'zoneId\s*[:=]\s*["\']?(\d+)', re.IGNORECASE),
+]
+
+
+# 🛠 Hàm lấy zone id của danh mục Tuổi Trẻ từ HTML trang danh mục
+def extract_tuoitre_zone_id(html):
+    for pattern in _TUOITRE_ZONE_PATTERNS:
+        match = pattern.search(html)
+        if match:
+            return match.group(1)
+    return None
+
+
+# Hậu tố thời gian trong URL bài Tuổi Trẻ: "...-20241123023045123.htm" (YYYYMMDDHHMMSS + ms)
+_TUOITRE_HREF_TIME = re.compile(r'-(\d{8})(\d{6})?\d*\.htm')
+
+# 🛠 Hàm gắn timezone cho datetime (pytz cần localize, tzinfo thường thì replace)
+def localize(naive, tz):
+    return tz.localize(naive) if hasattr(tz, 'localize') else naive.replace(tzinfo=tz)
+
+
+# Vị trí thời gian của một bài trong danh sách so với khung giờ crawl
+LISTING_NEWER = 'newer'
+LISTING_IN_WINDOW = 'in'
+LISTING_OLDER = 'older'
+
+
+# 🛠 Hàm so sánh thời gian đọc được từ danh sách với khung giờ [time_start, time_end]
+def classify_listing_time(item_time, time_start, time_end):
+    """
+    item_time là datetime (có timezone) hoặc date (khi danh sách chỉ hiện ngày).
+    Trả về LISTING_NEWER / LISTING_IN_WINDOW / LISTING_OLDER, hoặc None nếu không rõ.
+    Với date chỉ loại được các ngày nằm hẳn ngoài khung giờ.
+    """
+    if item_time is None:
+        return None
+    if isinstance(item_time, datetime):
+        if item_time < time_start:
+            return LISTING_OLDER
+        if item_time > time_end:
+            return LISTING_NEWER
+        return LISTING_IN_WINDOW
+    if item_time < time_start.date():
+        return LISTING_OLDER
+    if item_time > time_end.date():
+        return LISTING_NEWER
+    return LISTING_IN_WINDOW
+
+
+# 🛠 Hàm đọc thời gian xuất bản từ hậu tố URL bài Tuổi Trẻ
+def parse_tuoitre_href_time(href, tz):
+    """Trả về datetime nếu URL có đủ giờ phút giây, date nếu chỉ có ngày, None nếu không đọc được."""
+    match = _TUOITRE_HREF_TIME.search(href)
+    if not match:
+        return None
+    date_part, time_part = match.groups()
+    try:
+        if time_part:
+            return localize(datetime.strptime(date_part + time_part, "%Y%m%d%H%M%S"), tz)
+        return datetime.strptime(date_part, "%Y%m%d").date()
+    except ValueError:
+        return None
+
+
+# 🛠 Hàm tạo URL endpoint timeline ("xem thêm") của Tuổi Trẻ
+def tuoitre_timeline_url(zone_id, page):
+    return f"https://tuoitre.vn/timeline/{zone_id}/trang-{page}.htm"
+
+
+# 🛠 Hàm tạo URL trang phân trang của danh mục ZNews
+def znews_page_url(category_url, page):
+    """'https://znews.vn/xa-hoi.html', 2 -> 'https://znews.vn/xa-hoi/trang2.html'"""
+    if page <= 1:
+        return category_url
+    base = category_url[:-len('.html')] if category_url.endswith('.html') else category_url.rstrip('/')
+    return f"{base}/trang{page}.html"
+
+
+# 🛠 Hàm duyệt lần lượt các trang danh sách bằng HTTP thuần
+def iter_listing_pages(page_url, item_selector, max_pages=MAX_LISTING_PAGES, href_of=None):
+    """
+    page_url(page) -> URL của trang thứ page (bắt đầu từ 1).
+    Mỗi lần chỉ parse đoạn HTML của trang mới và trả về (page, items) với các
+    item chưa gặp ở trang trước. Dừng khi trang rỗng hoặc không còn item mới.
+    """
+    seen = set()
+    for page in range(1, max_pages + 1):
+        # Các trang sâu thường không đổi giữa hai lần chạy: hỏi lại server bằng ETag/Last-Modified
+        html = fetch_html(page_url(page), cache=True)
+        items = parse_html(html).select(item_selector)
+
+        new_items = []
+        for item in items:
+            key = href_of(item) if href_of else item.get('href')
+            if key in seen:
+                continue
+            seen.add(key)
+            new_items.append(item)
+
+        if not new_items:
+            return
+        yield page, new_items
+
+
+# ============================================
+# KHÁM PHÁ BÀI MỚI QUA RSS / SITEMAP
+# ============================================
+# Mỗi nguồn là (tên danh mục, URL feed). Tên danh mục None nghĩa là lấy danh mục từ trang bài viết.
+TUOITRE_FEEDS = [
+    ('Thời sự', 'https://tuoitre.vn/rss/thoi-su.rss'),
+    ('Thế giới', 'https://tuoitre.vn/rss/the-gioi.rss'),
+    ('Pháp luật', 'https://tuoitre.vn/rss/phap-luat.rss'),
+    ('Kinh doanh', 'https://tuoitre.vn/rss/kinh-doanh.rss'),
+    ('Công nghệ', 'https://tuoitre.vn/rss/nhip-song-so.rss'),
+    ('Xe', 'https://tuoitre.vn/rss/xe.rss'),
+    ('Du lịch', 'https://tuoitre.vn/rss/du-lich.rss'),
+    ('Nhịp sống trẻ', 'https://tuoitre.vn/rss/nhip-song-tre.rss'),
+    ('Văn hóa', 'https://tuoitre.vn/rss/van-hoa.rss'),
+    ('Giải trí', 'https://tuoitre.vn/rss/giai-tri.rss'),
+    ('Thể thao', 'https://tuoitre.vn/rss/the-thao.rss'),
+    ('Giáo dục', 'https://tuoitre.vn/rss/giao-duc.rss'),
+    ('Khoa học', 'https://tuoitre.vn/rss/khoa-hoc.rss'),
+    ('Sức khỏe', 'https://tuoitre.vn/rss/suc-khoe.rss'),
+    ('Bạn đọc làm báo', 'https://tuoitre.vn/rss/ban-doc-lam-bao.rss'),
+]
+
+VNEXPRESS_FEEDS = [
+    ('Thời sự', 'https://vnexpress.net/rss/thoi-su.rss'),
+    ('Thế giới', 'https://vnexpress.net/rss/the-gioi.rss'),
+    ('Kinh doanh', 'https://vnexpress.net/rss/kinh-doanh.rss'),
+    ('Bất động sản', 'https://vnexpress.net/rss/bat-dong-san.rss'),
+    ('Khoa học', 'https://vnexpress.net/rss/khoa-hoc.rss'),
+    ('Giải trí', 'https://vnexpress.net/rss/giai-tri.rss'),
+    ('Thể thao', 'https://vnexpress.net/rss/the-thao.rss'),
+    ('Pháp luật', 'https://vnexpress.net/rss/phap-luat.rss'),
+    ('Giáo dục', 'https://vnexpress.net/rss/giao-duc.rss'),
+    ('Sức khỏe', 'https://vnexpress.net/rss/suc-khoe.rss'),
+    ('Đời sống', 'https://vnexpress.net/rss/gia-dinh.rss'),
+    ('Du lịch', 'https://vnexpress.net/rss/du-lich.rss'),
+    ('Số hóa', 'https://vnexpress.net/rss/so-hoa.rss'),
+    ('Xe', 'https://vnexpress.net/rss/oto-xe-may.rss'),
+    ('Ý kiến', 'https://vnexpress.net/rss/y-kien.rss'),
+    ('Tâm sự', 'https://vnexpress.net/rss/tam-su.rss'),
+]
+
+# ZNews: news sitemap (publication_date), danh mục đọc từ trang bài viết
+ZNEWS_FEEDS = [
+    (None, 'https://znews.vn/sitemap/sitemap-news.xml'),
+]
+
+
+# 🛠 Hàm bỏ namespace khỏi tên thẻ XML: '{http://...}loc' -> 'loc'
+def _local_name(tag):
+    return tag.rsplit('}', 1)[-1]
+
+
+# 🛠 Hàm parse chuỗi thời gian trong RSS (RFC 822) hoặc sitemap (ISO 8601)
+def parse_feed_time(text, default_tz=None):
+    if not text:
+        return None
+    text = text.strip()
+    try:
+        parsed = parsedate_to_datetime(text)
+    except (TypeError, ValueError, IndexError):
+        try:
+            parsed = datetime.fromisoformat(text.replace('Z', '+00:00'))
+        except ValueError:
+            return None
+    if parsed.tzinfo is None and default_tz is not None:
+        parsed = localize(parsed, default_tz)
+    return parsed
+
+
+# 🛠 Hàm parse RSS / sitemap / sitemap index thành danh sách mục
+def parse_feed(content, default_tz=None):
+    """
+    Trả về (entries, child_sitemaps):
+    - entries: danh sách (url, thời gian xuất bản) từ <item> của RSS hoặc <url> của sitemap
+    - child_sitemaps: danh sách (url, lastmod) nếu đây là sitemap index
+    """
+    root = ElementTree.fromstring(content)
+    entries = []
+    child_sitemaps = []
+    for elem in root.iter():
+        name = _local_name(elem.tag)
+        if name not in ('item', 'url', 'sitemap'):
+            continue
+        fields = {}
+        for child in elem.iter():
+            child_name = _local_name(child.tag)
+            if child_name not in fields and child.text:
+                fields[child_name] = child.text.strip()
+        if name == 'item':
+            url = fields.get('link') or fields.get('guid')
+            published = parse_feed_time(fields.get('pubDate'), default_tz)
+        else:
+            url = fields.get('loc')
+            published = parse_feed_time(fields.get('publication_date') or fields.get('lastmod'), default_tz)
+        if not url:
+            continue
+        if name == 'sitemap':
+            child_sitemaps.append((url, published))
+        else:
+            entries.append((url, published))
+    return entries, child_sitemaps
+
+
+# 🛠 Hàm lấy các bài xuất bản trong khung giờ từ danh sách RSS / sitemap
+def discover_feed_articles(feeds, time_start, time_end, default_tz=None):
+    """
+    Trả về dict {tên danh mục: [URL, ...]} chỉ gồm các bài có thời gian xuất bản
+    nằm trong [time_start, time_end]. Một URL xuất hiện ở nhiều feed chỉ được giữ
+    ở danh mục đầu tiên. Feed lỗi được in ra và bỏ qua.
+    """
+    articles = {}
+    seen = set()
+    pending = list(feeds)
+    while pending:
+        category_name, feed_url = pending.pop(0)
+        try:
+            entries, child_sitemaps = parse_feed(fetch_bytes(feed_url, cache=True), default_tz)
+        except Exception as e:
+            print(f"Lỗi khi đọc feed {feed_url}: {e}")
+            continue
+
+        # Sitemap index: chỉ mở các sitemap con có thể chứa bài trong khung giờ
+        for child_url, lastmod in child_sitemaps:
+            if lastmod is None or lastmod >= time_start:
+                pending.append((category_name, child_url))
+
+        for url, published in entries:
+            if url in seen or published is None:
+                continue
+            if time_start <= published <= time_end:
+                seen.add(url)
+                articles.setdefault(category_name, []).append(url)
+
+    total = sum(len(urls) for urls in articles.values())
+    print(f"Tìm thấy {total} bài trong khung giờ từ {len(feeds)} feed")
+    return articles
@@ -0,0 +1,265 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException, WebDriverException
+from rate_limiter import get_host, get_limiter
+from metrics import inc, timer, observe
+
+# psutil là tùy chọn: không có thì bỏ qua kiểm tra bộ nhớ RSS
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+# Số driver mặc định, có thể chỉnh bằng biến môi trường CRAWL_DRIVERS
+DEFAULT_POOL_SIZE = int(os.getenv("CRAWL_DRIVERS", min(4, os.cpu_count() or 1)))
+# Tái tạo driver sau số trang này hoặc khi Chrome dùng quá số MB RSS này
+MAX_PAGES_PER_DRIVER = 200
+MAX_RSS_MB = 1500
+
+
+# Tài nguyên bị chặn qua DevTools: ta chỉ đọc text trong page_source nên ảnh,
+# video, font và script quảng cáo/thống kê bên thứ ba đều không cần thiết
+BLOCKED_URL_PATTERNS = [
+    "*.jpg", "*.jpeg", "*.png", "*.gif", "*.webp", "*.svg", "*.ico",
+    "*.mp4", "*.webm", "*.m3u8", "*.mp3",
+    "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot",
+    "*doubleclick.net*", "*googlesyndication.com*", "*googletagservices.com*",
+    "*google-analytics.com*", "*googletagmanager.com*", "*facebook.net*",
+    "*connect.facebook.com*", "*admicro.vn*", "*adtima*", "*eclick.vn*",
+    "*ants.vn*", "*vietad*", "*taboola.com*", "*outbrain.com*", "*hotjar.com*",
+]
+
+# Profile crawl mặc định: không chờ sự kiện "load", chặn tài nguyên không cần thiết.
+# CRAWL_PAGE_LOAD_STRATEGY=none để driver.get trả về ngay và chỉ dựa vào wait_for_element.
+CRAWL_PROFILE = {
+    "page_load_strategy": os.getenv("CRAWL_PAGE_LOAD_STRATEGY", "eager"),
+    "block_images": True,
+    "blocked_url_patterns": BLOCKED_URL_PATTERNS,
+}
+
+
+# 🛠 Hàm khởi tạo driver
+def init_driver(page_load_timeout=120, profile=CRAWL_PROFILE):
+    """Tạo Chrome headless; profile=None giữ hành vi cũ (chờ tải đầy đủ, không chặn gì)."""
+    options = Options()
+    options.add_argument("--headless")
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-dev-shm-usage")
+    options.add_argument("--disable-gpu")
+    options.add_argument("--disable-extensions")
+    options.add_argument("--ignore-certificate-errors")
+    options.add_argument("--disable-blink-features=AutomationControlled")
+    options.add_argument("--dns-prefetch-disable")
+    if profile:
+        options.page_load_strategy = profile.get("page_load_strategy", "normal")
+        if profile.get("block_images"):
+            options.add_argument("--blink-settings=imagesEnabled=false")
+            options.add_experimental_option("prefs", {
+                "profile.managed_default_content_settings.images": 2,
+                "profile.managed_default_content_settings.media_stream": 2,
+                "profile.managed_default_content_settings.notifications": 2,
+            })
+    driver = webdriver.Chrome(options=options)
+    driver.set_page_load_timeout(page_load_timeout)
+    if profile and profile.get("blocked_url_patterns"):
+        try:
+            driver.execute_cdp_cmd("Network.enable", {})
+            driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": profile["blocked_url_patterns"]})
+        except WebDriverException as e:
+            print(f"Không bật được chặn tài nguyên qua DevTools: {e}")
+    return driver
+
+# 🛠 Hàm chờ phần tử (với page load "eager"/"none" đây là điểm dừng thực sự của mỗi lần tải trang)
+def wait_for_element(driver, by, value, timeout=10, poll_frequency=0.2):
+    with timer('driver_wait_seconds', kind='element'):
+        try:
+            return WebDriverWait(driver, timeout, poll_frequency=poll_frequency).until(
+                EC.presence_of_element_located((by, value))
+            )
+        except TimeoutException:
+            inc('driver_wait_timeouts_total', kind='element')
+            return None
+
+
+# 🛠 Hàm chờ trang dài ra sau khi cuộn (nội dung "xem thêm" đã tải), trả về chiều cao mới
+def wait_for_page_growth(driver, last_height, timeout=5, poll_frequency=0.2):
+    def _grown(d):
+        height = d.execute_script("return document.body.scrollHeight")
+        return height if height > last_height else False
+    with timer('driver_wait_seconds', kind='scroll'):
+        try:
+            return WebDriverWait(driver, timeout, poll_frequency=poll_frequency).until(_grown)
+        except TimeoutException:
+            inc('driver_wait_timeouts_total', kind='scroll')
+            return last_height
+
+
+# 🛠 Hàm tính RSS (MB) của chromedriver và toàn bộ tiến trình Chrome con
+def driver_rss_mb(driver):
+    if psutil is None:
+        return 0
+    try:
+        root = psutil.Process(driver.service.process.pid)
+        processes = [root] + root.children(recursive=True)
+        total = 0
+        for proc in processes:
+            try:
+                total += proc.memory_info().rss
+            except psutil.Error:
+                continue
+        return total / (1024 * 1024)
+    except (psutil.Error, AttributeError):
+        return 0
+
+
+class PooledDriver:
+    """Một Chrome driver trong pool, kèm số trang đã tải để quyết định khi nào tái tạo."""
+
+    def __init__(self, page_load_timeout, profile=CRAWL_PROFILE):
+        self.page_load_timeout = page_load_timeout
+        self.driver = init_driver(page_load_timeout, profile)
+        self.pages = 0
+        self.created_at = time.time()
+
+    def get(self, url):
+        """Tải trang qua Chrome, chờ lượt theo rate_limiter của host giống như request HTTP."""
+        limiter = get_limiter(url)
+        limiter.acquire()
+        self.pages += 1
+        start = time.monotonic()
+        try:
+            self.driver.get(url)
+        except TimeoutException:
+            limiter.record_failure("page load timeout")
+            inc('driver_timeouts_total', host=get_host(url))
+            raise
+        latency = time.monotonic() - start
+        observe('driver_get_seconds', latency, host=get_host(url))
+        limiter.record_success(latency)
+
+    def is_healthy(self):
+        try:
+            self.driver.execute_script("return 1")
+            return True
+        except WebDriverException:
+            return False
+
+    def needs_recycle(self, max_pages, max_rss_mb):
+        if self.pages >= max_pages:
+            return True
+        return max_rss_mb and driver_rss_mb(self.driver) > max_rss_mb
+
+    def quit(self):
+        try:
+            self.driver.quit()
+        except Exception as e:
+            print(f"Lỗi khi đóng driver: {e}")
+
+
+class DriverPool:
+    """
+    Pool gồm N Chrome headless được khởi động sẵn.
+    Driver được kiểm tra sức khỏe khi mượn/trả và chỉ được tạo lại khi hỏng,
+    đã tải quá nhiều trang hoặc dùng quá nhiều bộ nhớ.
+    """
+
+    def __init__(self, size=DEFAULT_POOL_SIZE, page_load_timeout=120,
+                 max_pages=MAX_PAGES_PER_DRIVER, max_rss_mb=MAX_RSS_MB, profile=CRAWL_PROFILE):
+        self.size = max(1, size)
+        self.page_load_timeout = page_load_timeout
+        self.profile = profile
+        self.max_pages = max_pages
+        self.max_rss_mb = max_rss_mb
+        self._idle = queue.Queue()
+        self._lock = threading.Lock()
+        self._all = []
+
+        # Khởi động song song để không phải chờ N lần thời gian mở Chrome
+        with ThreadPoolExecutor(max_workers=self.size) as executor:
+            futures = [executor.submit(PooledDriver, page_load_timeout, profile) for _ in range(self.size)]
+            for future in futures:
+                try:
+                    self._register(future.result())
+                except Exception as e:
+                    print(f"Không khởi tạo được driver: {e}")
+        if not self._all:
+            raise RuntimeError("Không khởi tạo được driver nào cho pool")
+        print(f"Đã khởi tạo pool {len(self._all)} driver")
+
+    def _register(self, pooled):
+        with self._lock:
+            self._all.append(pooled)
+        self._idle.put(pooled)
+
+    def _replace(self, pooled, reason):
+        print(f"Tái tạo driver ({reason}, {pooled.pages} trang)")
+        inc('driver_recycles_total', reason=reason)
+        with self._lock:
+            if pooled in self._all:
+                self._all.remove(pooled)
+        pooled.quit()
+        fresh = PooledDriver(self.page_load_timeout, self.profile)
+        with self._lock:
+            self._all.append(fresh)
+        return fresh
+
+    @contextmanager
+    def acquire(self):
+        """Mượn một driver; tự trả lại pool (hoặc thay thế nếu hỏng) khi kết thúc."""
+        pooled = self._idle.get()
+        try:
+            if not pooled.is_healthy():
+                pooled = self._replace(pooled, "không phản hồi")
+            elif pooled.needs_recycle(self.max_pages, self.max_rss_mb):
+                pooled = self._replace(pooled, "đạt giới hạn tài nguyên")
+        except Exception:
+            self._idle.put(pooled)
+            raise
+
+        try:
+            yield pooled
+        except Exception:
+            # Chỉ bỏ driver khi nó thực sự hỏng, lỗi trang đơn lẻ thì giữ lại
+            if not pooled.is_healthy():
+                try:
+                    pooled = self._replace(pooled, "lỗi nghiêm trọng")
+                except Exception as e:
+                    print(f"Không tạo lại được driver: {e}")
+            raise
+        finally:
+            self._idle.put(pooled)
+
+    def close(self):
+        with self._lock:
+            drivers, self._all = self._all, []
+        for pooled in drivers:
+            pooled.quit()
+
+
+# 🛠 Hàm chạy song song các công việc, mỗi công việc mượn một driver từ pool
+def run_parallel(pool, items, worker):
+    """
+    Gọi worker(pooled_driver, item) cho từng item trên tối đa pool.size luồng.
+    Trả về (item, kết quả) theo thứ tự hoàn thành; item lỗi được in ra và bỏ qua.
+    """
+    def _task(item):
+        with pool.acquire() as pooled:
+            return worker(pooled, item)
+
+    with ThreadPoolExecutor(max_workers=pool.size) as executor:
+        futures = {executor.submit(_task, item): item for item in items}
+        for future in as_completed(futures):
+            item = futures[future]
+            try:
+                yield item, future.result()
+            except Exception as e:
+                print(f"Lỗi khi xử lý {item}: {e}")
@@ -0,0 +1,167 @@
+import os
+import gzip
+import sqlite3
+import threading
+from datetime import datetime, timezone
+
+# zstandard là tùy chọn: không có thì nén từng bản ghi bằng gzip (giống WARC.gz)
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Thư mục lưu HTML gốc của mọi bài đã tải; HTML_ARCHIVE=0 để tắt
+HTML_ARCHIVE_DIR = os.getenv('HTML_ARCHIVE_DIR', 'html_archive')
+HTML_ARCHIVE_ENABLED = os.getenv('HTML_ARCHIVE', '1') != '0'
+# Segment đạt kích thước này (byte, sau nén) thì mở segment mới
+MAX_SEGMENT_BYTES = 256 * 1024 * 1024
+INDEX_FILE = 'index.db'
+
+
+# 🛠 Hàm nén một bản ghi; mỗi bản ghi là một frame độc lập để đọc được từ offset bất kỳ
+def _compress(data, codec):
+    if codec == 'zst':
+        return zstandard.ZstdCompressor(level=3).compress(data)
+    return gzip.compress(data, compresslevel=6)
+
+
+def _decompress(data, codec):
+    if codec == 'zst':
+        if zstandard is None:
+            raise RuntimeError("Cần cài zstandard để đọc segment .zst")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
+
+
+# 🛠 Hàm lấy codec từ tên file segment
+def _codec_of(segment):
+    return 'zst' if segment.endswith('.zst') else 'gz'
+
+
+# 🛠 Hàm tạo bản ghi kiểu WARC: các dòng header, một dòng trống rồi tới nội dung
+def _build_record(url, body, headers):
+    lines = [
+        "WARC/1.0",
+        "WARC-Type: response",
+        f"WARC-Target-URI: {url}",
+        f"WARC-Date: {datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')}",
+        "Content-Type: text/html; charset=utf-8",
+        f"Content-Length: {len(body)}",
+    ]
+    lines += [f"{key}: {value}" for key, value in headers.items() if value is not None]
+    return "\r\n".join(lines).encode('utf-8') + b"\r\n\r\n" + body
+
+
+# 🛠 Hàm tách bản ghi thành (header dạng dict, nội dung bytes)
+def _parse_record(data):
+    head, _, body = data.partition(b"\r\n\r\n")
+    headers = {}
+    for line in head.decode('utf-8').split("\r\n")[1:]:
+        key, _, value = line.partition(": ")
+        headers[key] = value
+    return headers, body
+
+
+# 🛠 Hàm đọc một bản ghi từ segment theo offset (dùng được trong tiến trình con)
+def read_record(archive_dir, segment, offset, length):
+    with open(os.path.join(archive_dir, segment), 'rb') as f:
+        f.seek(offset)
+        data = f.read(length)
+    return _parse_record(_decompress(data, _codec_of(segment)))
+
+
+class HtmlArchive:
+    """
+    Lưu HTML gốc của các bài đã tải vào các segment chỉ ghi nối (append-only), mỗi bản ghi
+    nén riêng bằng zstd (hoặc gzip). index.db ánh xạ URL -> (segment, offset, độ dài)
+    để đọc lại đúng bản ghi mà không phải giải nén cả segment.
+    """
+
+    def __init__(self, archive_dir=HTML_ARCHIVE_DIR):
+        self.archive_dir = archive_dir
+        os.makedirs(archive_dir, exist_ok=True)
+        self.codec = 'zst' if zstandard is not None else 'gz'
+        self.written = 0
+        self._lock = threading.Lock()
+        self._segment = None
+        self._file = None
+        self._conn = sqlite3.connect(os.path.join(archive_dir, INDEX_FILE), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        # Một URL chỉ giữ bản tải gần nhất
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS records (
+                url TEXT PRIMARY KEY,
+                segment TEXT,
+                offset INTEGER,
+                length INTEGER,
+                site TEXT,
+                category TEXT,
+                fetched_at TEXT
+            ) WITHOUT ROWID
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS records_site ON records (site, segment, offset)")
+        self._conn.commit()
+
+    # 🛠 Hàm mở segment mới (tên theo thời gian + pid để nhiều tiến trình không ghi chung file)
+    def _open_segment(self):
+        if self._file:
+            self._file.close()
+        stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+        self._segment = f"segment-{stamp}-{os.getpid()}.warc.{self.codec}"
+        self._file = open(os.path.join(self.archive_dir, self._segment), 'ab')
+
+    # 🛠 Hàm ghi HTML của một bài vào archive
+    def write(self, url, html, site=None, category=None):
+        body = html.encode('utf-8') if isinstance(html, str) else html
+        record = _compress(_build_record(url, body, {'X-Site': site, 'X-Category': category}), self.codec)
+        with self._lock:
+            if self._file is None or self._file.tell() + len(record) > MAX_SEGMENT_BYTES:
+                self._open_segment()
+            offset = self._file.tell()
+            self._file.write(record)
+            self._file.flush()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO records (url, segment, offset, length, site, category, fetched_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (url, self._segment, offset, len(record), site, category, datetime.now().isoformat(timespec='seconds')),
+            )
+            self._conn.commit()
+            self.written += 1
+
+    # 🛠 Hàm đọc HTML đã lưu của một URL, None nếu chưa có
+    def get(self, url):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT segment, offset, length FROM records WHERE url = ?", (url,)
+            ).fetchone()
+        if row is None:
+            return None
+        _, body = read_record(self.archive_dir, *row)
+        return body.decode('utf-8')
+
+    # 🛠 Hàm liệt kê vị trí các bản ghi (theo thứ tự trong segment để đọc tuần tự trên đĩa)
+    def locations(self, sites=None):
+        """Trả về danh sách (url, site, category, segment, offset, length)."""
+        query = "SELECT url, site, category, segment, offset, length FROM records"
+        params = ()
+        if sites:
+            query += f" WHERE site IN ({','.join('?' * len(sites))})"
+            params = tuple(sites)
+        query += " ORDER BY segment, offset"
+        with self._lock:
+            return self._conn.execute(query, params).fetchall()
+
+    def close(self):
+        with self._lock:
+            if self._file:
+                self._file.close()
+                self._file = None
+            self._conn.close()
+        if self.written:
+            print(f"Đã lưu {self.written} trang HTML vào {self.archive_dir}")
+
+
+# 🛠 Hàm mở archive dùng chung (None nếu đã tắt bằng HTML_ARCHIVE=0)
+def open_archive(archive_dir=HTML_ARCHIVE_DIR):
+    return HtmlArchive(archive_dir) if HTML_ARCHIVE_ENABLED else None
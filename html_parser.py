@@ -0,0 +1,106 @@
+import os
+from functools import lru_cache
+
+from bs4 import BeautifulSoup
+from metrics import timer
+
+# lxml + cssselect là tùy chọn: không có thì quay về BeautifulSoup('html.parser')
+try:
+    import lxml.html
+    from lxml import etree
+    from cssselect import GenericTranslator
+    HAS_LXML = True
+except ImportError:
+    HAS_LXML = False
+
+# Mặc định BeautifulSoup('html.parser'); HTML_PARSER=lxml để dùng lxml (nhanh hơn).
+# lxml tự đóng <p> khi gặp thẻ khối bên trong (<p>a<div>b</div>c</p>, <p> lồng <p>) nên lấy ít chữ hơn
+# html.parser trên HTML sai cấu trúc: chỉ đổi mặc định khi tests/test_html_parser.py cho thấy hai engine
+# cho cùng kết quả trên fixture thật
+HTML_PARSER = os.getenv('HTML_PARSER', 'bs4')
+
+_SKIP_TEXT_TAGS = {'script', 'style', 'template'}
+
+
+# 🛠 Hàm biên dịch selector CSS thành XPath một lần cho mỗi chuỗi selector
+@lru_cache(maxsize=256)
+def _compile_selector(selector):
+    # Chỉ tìm trong con cháu (không tính chính phần tử), giống Tag.select của BeautifulSoup;
+    # nhóm "a, b" được dịch thành "a | b" nên kết quả theo thứ tự tài liệu và không trùng lặp
+    return etree.XPath(GenericTranslator().css_to_xpath(selector, prefix='descendant::'))
+
+
+# 🛠 Hàm lấy text của phần tử lxml theo đúng cách BeautifulSoup.get_text
+def _collect_text(element, parts):
+    if element.tag in _SKIP_TEXT_TAGS:
+        return
+    if element.text:
+        parts.append(element.text)
+    for child in element:
+        # Comment / processing instruction có tag không phải str: bỏ nội dung, giữ phần tail
+        if isinstance(child.tag, str):
+            _collect_text(child, parts)
+        if child.tail:
+            parts.append(child.tail)
+
+
+class LxmlNode:
+    """Bọc phần tử lxml với các hàm mà crawler đang dùng trên Tag của BeautifulSoup."""
+
+    __slots__ = ('_element',)
+
+    def __init__(self, element):
+        self._element = element
+
+    @property
+    def name(self):
+        return self._element.tag
+
+    def select(self, selector):
+        return [LxmlNode(el) for el in _compile_selector(selector)(self._element)]
+
+    def select_one(self, selector):
+        matches = _compile_selector(selector)(self._element)
+        return LxmlNode(matches[0]) if matches else None
+
+    def find_all(self, name):
+        return [LxmlNode(el) for el in self._element.iterdescendants(name)]
+
+    def get_text(self, separator='', strip=False):
+        parts = []
+        _collect_text(self._element, parts)
+        if strip:
+            parts = [part.strip() for part in parts]
+            parts = [part for part in parts if part]
+        return separator.join(parts)
+
+    @property
+    def text(self):
+        return self.get_text()
+
+    def get(self, key, default=None):
+        return self._element.get(key, default)
+
+    def __getitem__(self, key):
+        value = self._element.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+
+# 🛠 Hàm parse HTML bằng engine nhanh nhất hiện có, dùng chung các selector CSS như BeautifulSoup
+def parse_html(html, parser=None):
+    """
+    Trả về đối tượng có select/select_one/find_all/get_text/get như BeautifulSoup.
+    Mặc định dùng BeautifulSoup; HTML_PARSER=lxml (hoặc parser='lxml') dùng lxml khi đã cài.
+    """
+    parser = parser or HTML_PARSER
+    if parser == 'lxml' and HAS_LXML:
+        try:
+            with timer('html_parse_seconds', parser='lxml'):
+                return LxmlNode(lxml.html.document_fromstring(html))
+        except (etree.ParserError, ValueError) as e:
+            # Chuỗi rỗng hoặc chuỗi có khai báo encoding XML: để BeautifulSoup xử lý
+            print(f"lxml không parse được trang, dùng BeautifulSoup: {e}")
+    with timer('html_parse_seconds', parser='bs4'):
+        return BeautifulSoup(html, 'html.parser')
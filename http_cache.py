@@ -0,0 +1,124 @@
+import os
+import time
+import zlib
+import sqlite3
+import threading
+
+# File cache dùng chung cho mọi crawler; HTTP_CACHE=0 để tắt hẳn
+HTTP_CACHE_FILE = os.getenv('HTTP_CACHE_DB', 'http_cache.db')
+HTTP_CACHE_ENABLED = os.getenv('HTTP_CACHE', '1') != '0'
+# Menu trang chủ / trang danh mục gần như không đổi giữa các khung giờ: dùng lại không cần hỏi server
+MENU_TTL = int(os.getenv('HTTP_CACHE_MENU_TTL', 6 * 3600))
+# Mục không được dùng tới sau số ngày này bị xóa khi đóng cache
+MAX_ENTRY_AGE_DAYS = 7
+
+
+class CachedResponse:
+    """Một phản hồi lưu trong cache: nội dung (đã giải nén) và các header để hỏi lại server."""
+
+    __slots__ = ('url', 'content', 'encoding', 'etag', 'last_modified', 'fetched_at')
+
+    def __init__(self, url, content, encoding, etag, last_modified, fetched_at):
+        self.url = url
+        self.content = content
+        self.encoding = encoding
+        self.etag = etag
+        self.last_modified = last_modified
+        self.fetched_at = fetched_at
+
+    def age(self):
+        return time.time() - self.fetched_at
+
+    # 🛠 Hàm tạo header GET có điều kiện (If-None-Match / If-Modified-Since)
+    def conditional_headers(self):
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+
+class HttpCache:
+    """
+    Cache HTTP trên đĩa theo URL, lưu trong SQLite: ETag, Last-Modified và nội dung nén zlib.
+    http_fetcher dùng nó để gửi GET có điều kiện và dùng lại nội dung khi server trả 304.
+    """
+
+    def __init__(self, db_file=HTTP_CACHE_FILE):
+        self.db_file = db_file
+        self.hits = 0           # Dùng lại trong TTL, không gửi request
+        self.revalidated = 0    # Server trả 304
+        self.stored = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_file, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                url TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                encoding TEXT,
+                fetched_at REAL,
+                body BLOB
+            ) WITHOUT ROWID
+        """)
+        self._conn.commit()
+
+    def get(self, url):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT etag, last_modified, encoding, fetched_at, body FROM responses WHERE url = ?", (url,)
+            ).fetchone()
+        if row is None:
+            return None
+        etag, last_modified, encoding, fetched_at, body = row
+        try:
+            content = zlib.decompress(body)
+        except zlib.error as e:
+            print(f"Mục cache hỏng cho {url}, bỏ qua: {e}")
+            return None
+        return CachedResponse(url, content, encoding, etag, last_modified, fetched_at)
+
+    def put(self, url, content, encoding, etag, last_modified):
+        body = zlib.compress(content, 6)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (url, etag, last_modified, encoding, fetched_at, body) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (url, etag, last_modified, encoding, time.time(), body),
+            )
+            self._conn.commit()
+            self.stored += 1
+
+    # 🛠 Hàm đánh dấu mục cache vẫn còn mới (sau khi server trả 304)
+    def touch(self, url):
+        with self._lock:
+            self._conn.execute("UPDATE responses SET fetched_at = ? WHERE url = ?", (time.time(), url))
+            self._conn.commit()
+            self.revalidated += 1
+
+    def record_hit(self):
+        with self._lock:
+            self.hits += 1
+
+    # 🛠 Hàm liệt kê các URL đang có trong cache (dùng khi ghi fixture cho benchmark)
+    def urls(self):
+        with self._lock:
+            return [row[0] for row in self._conn.execute("SELECT url FROM responses")]
+
+    # 🛠 Hàm xóa các mục lâu không dùng để file cache không phình mãi
+    def prune(self, max_age_days=MAX_ENTRY_AGE_DAYS):
+        cutoff = time.time() - max_age_days * 86400
+        with self._lock:
+            removed = self._conn.execute("DELETE FROM responses WHERE fetched_at < ?", (cutoff,)).rowcount
+            self._conn.commit()
+        return removed
+
+    def close(self):
+        removed = self.prune()
+        print(f"HTTP cache: {self.hits} lần dùng lại trong TTL, {self.revalidated} lần 304, "
+              f"{self.stored} trang mới lưu, xóa {removed} mục cũ")
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,163 @@
+import time
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from rate_limiter import get_host, get_limiter, OVERLOAD_STATUSES, parse_retry_after
+from http_cache import HttpCache, HTTP_CACHE_ENABLED
+from metrics import inc, observe
+
+# brotli là tùy chọn: urllib3 chỉ giải nén "br" khi đã cài brotli/brotlicffi
+try:
+    import brotli  # noqa: F401
+    ACCEPT_ENCODING = "gzip, deflate, br"
+except ImportError:
+    try:
+        import brotlicffi  # noqa: F401
+        ACCEPT_ENCODING = "gzip, deflate, br"
+    except ImportError:
+        ACCEPT_ENCODING = "gzip, deflate"
+
+DEFAULT_HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 "
+        "(KHTML, like Gecko) Chrome/124.0 Safari/537.36"
+    ),
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "vi-VN,vi;q=0.9,en;q=0.8",
+    "Accept-Encoding": ACCEPT_ENCODING,
+    "Connection": "keep-alive",
+}
+
+# Timeout (connect, read) tính bằng giây cho mỗi request
+DEFAULT_TIMEOUT = (5, 30)
+
+_session = None
+_session_lock = threading.Lock()
+_cache = None
+_cache_lock = threading.Lock()
+
+
+# 🛠 Hàm khởi tạo session HTTP dùng chung (pool kết nối + keep-alive)
+def get_session(pool_maxsize=32):
+    """
+    Trả về requests.Session dùng chung cho cả tiến trình.
+    Kết nối tới cùng một host được giữ lại (keep-alive) và tái sử dụng giữa các bài viết.
+    """
+    global _session
+    session = _session
+    if session is not None:
+        return session
+    with _session_lock:
+        # Kiểm tra lại trong khóa: nhiều luồng cùng gọi lần đầu chỉ tạo một session
+        if _session is not None:
+            return _session
+        # Chỉ thử lại lỗi kết nối; 429/5xx được trả về để rate_limiter giảm tốc
+        retry = Retry(
+            total=2,
+            read=0,
+            status=0,
+            backoff_factor=0.5,
+            allowed_methods=["GET", "HEAD"],
+        )
+        adapter = HTTPAdapter(pool_connections=8, pool_maxsize=pool_maxsize, max_retries=retry)
+        session = requests.Session()
+        session.headers.update(DEFAULT_HEADERS)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        _session = session
+        return session
+
+
+# 🛠 Hàm lấy cache HTTP trên đĩa dùng chung (None nếu đã tắt bằng HTTP_CACHE=0)
+def get_cache():
+    global _cache
+    if not HTTP_CACHE_ENABLED:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = HttpCache()
+        return _cache
+
+
+# 🛠 Hàm gửi GET qua bộ giới hạn tốc độ của host (và cache nếu được yêu cầu), trả về (nội dung, encoding)
+def _get(url, timeout, throttle, cache=False, max_age=0):
+    http_cache = get_cache() if cache or max_age else None
+    cached = http_cache.get(url) if http_cache else None
+    host = get_host(url)
+    if cached is not None and max_age and cached.age() < max_age:
+        http_cache.record_hit()
+        inc('http_cache_total', host=host, result='hit')
+        return cached.content, cached.encoding
+
+    limiter = get_limiter(url)
+    if throttle:
+        limiter.acquire()
+    start = time.monotonic()
+    try:
+        response = get_session().get(url, timeout=timeout, headers=cached.conditional_headers() if cached else None)
+    except (requests.Timeout, requests.ConnectionError) as e:
+        limiter.record_failure(type(e).__name__)
+        inc('http_errors_total', host=host, reason=type(e).__name__)
+        raise
+    latency = time.monotonic() - start
+    observe('http_request_seconds', latency, host=host)
+    inc('http_requests_total', host=host, status=response.status_code)
+    if response.status_code in OVERLOAD_STATUSES:
+        limiter.record_failure(f"HTTP {response.status_code}", parse_retry_after(response.headers.get("Retry-After")))
+    else:
+        limiter.record_success(latency)
+
+    # Không đổi từ lần tải trước: dùng lại nội dung đã lưu
+    if response.status_code == 304 and cached is not None:
+        http_cache.touch(url)
+        inc('http_cache_total', host=host, result='revalidated')
+        return cached.content, cached.encoding
+
+    response.raise_for_status()
+    etag = response.headers.get("ETag")
+    last_modified = response.headers.get("Last-Modified")
+    if http_cache and (max_age or etag or last_modified):
+        http_cache.put(url, response.content, response.encoding, etag, last_modified)
+    return response.content, response.encoding
+
+
+# 🛠 Hàm giải mã HTML theo encoding của phản hồi
+def _decode(content, encoding):
+    # Một số trang không khai báo charset trong header -> requests mặc định ISO-8859-1
+    if not encoding or encoding.lower() == "iso-8859-1":
+        encoding = "utf-8"
+    try:
+        return str(content, encoding, errors="replace")
+    except LookupError:
+        return str(content, "utf-8", errors="replace")
+
+
+# 🛠 Hàm tải HTML của một trang bằng HTTP thuần
+def fetch_html(url, timeout=DEFAULT_TIMEOUT, throttle=True, cache=False, max_age=0):
+    """
+    Tải trang bằng HTTP (không qua Chrome) và trả về HTML dạng str.
+    Ném requests.Timeout khi quá thời gian, requests.HTTPError khi mã trạng thái lỗi.
+    throttle=False khi bên gọi đã tự chờ lượt qua rate_limiter (vd. async_fetcher).
+    cache=True: gửi GET có điều kiện và dùng lại bản trong http_cache khi server trả 304;
+    max_age > 0: dùng luôn bản trong cache nếu chưa quá max_age giây (menu, trang danh mục).
+    """
+    return _decode(*_get(url, timeout, throttle, cache, max_age))
+
+
+# 🛠 Hàm tải nội dung thô (bytes), dùng cho RSS/sitemap XML tự khai báo encoding
+def fetch_bytes(url, timeout=DEFAULT_TIMEOUT, throttle=True, cache=False, max_age=0):
+    return _get(url, timeout, throttle, cache, max_age)[0]
+
+
+# 🛠 Hàm đóng session (và cache HTTP) khi kết thúc crawl
+def close_session():
+    global _session, _cache
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+            _session = None
+    with _cache_lock:
+        if _cache is not None:
+            _cache.close()
+            _cache = None
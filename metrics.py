@@ -0,0 +1,226 @@
+import os
+import json
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# File JSONL nhận số liệu của mỗi lần chạy (mỗi chuỗi số liệu một dòng); CRAWL_METRICS=0 để tắt ghi file
+METRICS_ENABLED = os.getenv('CRAWL_METRICS', '1') != '0'
+METRICS_FILE = os.getenv('CRAWL_METRICS_FILE', 'crawl_metrics.jsonl')
+# Ghi thêm file text kiểu Prometheus (vd. cho textfile collector của node_exporter)
+METRICS_PROM_FILE = os.getenv('CRAWL_METRICS_PROM')
+# Mở endpoint /metrics kiểu Prometheus trong lúc chạy (vd. CRAWL_METRICS_PORT=9108)
+METRICS_PORT = int(os.getenv('CRAWL_METRICS_PORT', 0))
+
+# Ngưỡng (giây) của histogram thời gian: từ parse một trang (ms) tới tải trang qua Chrome (phút)
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+
+def _label_key(labels):
+    return tuple(sorted((key, str(value)) for key, value in labels.items() if value is not None))
+
+
+def _format_labels(label_key, extra=()):
+    pairs = list(label_key) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"') for _, value in pairs)
+    return '{' + ','.join(f'{key}="{value}"' for (key, _), value in zip(pairs, escaped)) + '}'
+
+
+class Histogram:
+    """Histogram cộng dồn theo ngưỡng cố định, kèm tổng, số lần và giá trị lớn nhất."""
+
+    __slots__ = ('buckets', 'counts', 'count', 'sum', 'max')
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Ô cuối là +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    # 🛠 Hàm ước lượng phân vị (lấy cận trên của ô chứa phân vị đó)
+    def quantile(self, q):
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, bucket_count in zip(self.buckets, self.counts):
+            seen += bucket_count
+            if seen >= rank:
+                return round(min(bound, self.max), 6)
+        return round(self.max, 6)
+
+
+class MetricsRegistry:
+    """
+    Bộ đếm (counter) và histogram thời gian của một lần chạy crawler, dùng chung cho mọi luồng.
+    Mỗi chuỗi số liệu xác định bởi tên + nhãn (site, host, stage...).
+    """
+
+    def __init__(self):
+        self.started_at = datetime.now()
+        self._counters = {}
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name, value=1, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(value)
+
+    # 🛠 Hàm đo thời gian một khối lệnh vào histogram name (vẫn ghi khi khối lệnh ném lỗi)
+    @contextmanager
+    def timer(self, name, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def counter_value(self, name, **labels):
+        with self._lock:
+            return self._counters.get((name, _label_key(labels)), 0)
+
+    # 🛠 Hàm chụp toàn bộ số liệu thành danh sách dict (mỗi chuỗi số liệu một phần tử)
+    def snapshot(self):
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted(
+                (key, (h.buckets, list(h.counts), h.count, h.sum, h.max, h.quantile(0.5), h.quantile(0.95)))
+                for key, h in self._histograms.items()
+            )
+        entries = [
+            {'type': 'counter', 'name': name, 'labels': dict(labels), 'value': value}
+            for (name, labels), value in counters
+        ]
+        for (name, labels), (buckets, counts, count, total, maximum, p50, p95) in histograms:
+            entries.append({
+                'type': 'histogram', 'name': name, 'labels': dict(labels),
+                'count': count, 'sum': round(total, 6), 'max': round(maximum, 6), 'p50': p50, 'p95': p95,
+                'buckets': {str(bound): bucket_count for bound, bucket_count in zip(list(buckets) + ['+Inf'], counts)},
+            })
+        return entries
+
+    # 🛠 Hàm xuất số liệu theo định dạng text của Prometheus
+    def prometheus_text(self):
+        lines = []
+        typed = set()
+        for entry in self.snapshot():
+            name = f"crawler_{entry['name']}"
+            labels = _label_key(entry['labels'])
+            if name not in typed:
+                lines.append(f"# TYPE {name} {entry['type']}")
+                typed.add(name)
+            if entry['type'] == 'counter':
+                lines.append(f"{name}{_format_labels(labels)} {entry['value']}")
+                continue
+            cumulative = 0
+            for bound, bucket_count in entry['buckets'].items():
+                cumulative += bucket_count
+                lines.append(f"{name}_bucket{_format_labels(labels, [('le', bound)])} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {entry['sum']}")
+            lines.append(f"{name}_count{_format_labels(labels)} {entry['count']}")
+        return "\n".join(lines) + "\n"
+
+    # 🛠 Hàm ghi nối số liệu của lần chạy vào file JSONL (mọi dòng cùng run để lọc theo lần chạy)
+    def write_jsonl(self, path):
+        run = self.started_at.isoformat(timespec='seconds')
+        duration = round((datetime.now() - self.started_at).total_seconds(), 3)
+        with open(path, 'a', encoding='utf-8') as f:
+            for entry in self.snapshot():
+                f.write(json.dumps({'run': run, 'duration': duration, **entry}, ensure_ascii=False) + "\n")
+
+    def write_prometheus(self, path):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(self.prometheus_text())
+        os.replace(tmp_path, path)
+
+    # 🛠 Hàm in tổng thời gian theo từng histogram (lớn nhất trước) để biết thời gian đi đâu
+    def print_summary(self, limit=20):
+        histograms = [entry for entry in self.snapshot() if entry['type'] == 'histogram']
+        histograms.sort(key=lambda entry: entry['sum'], reverse=True)
+        print("Thời gian theo giai đoạn (tổng | số lần | p50 | p95 | max):")
+        for entry in histograms[:limit]:
+            labels = ','.join(f"{key}={value}" for key, value in entry['labels'].items())
+            print(f"  {entry['name']}{{{labels}}}: {entry['sum']:.1f}s | {entry['count']} | "
+                  f"{entry['p50']:.3f}s | {entry['p95']:.3f}s | {entry['max']:.3f}s")
+
+
+REGISTRY = MetricsRegistry()
+_server = None
+
+
+# Các hàm tắt dùng registry chung của tiến trình
+def inc(name, value=1, **labels):
+    REGISTRY.inc(name, value, **labels)
+
+
+def observe(name, value, **labels):
+    REGISTRY.observe(name, value, **labels)
+
+
+def timer(name, **labels):
+    return REGISTRY.timer(name, **labels)
+
+
+# 🛠 Hàm mở endpoint /metrics (nếu đặt CRAWL_METRICS_PORT), gọi một lần khi bắt đầu crawl
+def start_metrics_server(port=METRICS_PORT):
+    global _server
+    if not port or _server is not None:
+        return None
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.rstrip('/') != '/metrics':
+                self.send_error(404)
+                return
+            body = REGISTRY.prometheus_text().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    _server = ThreadingHTTPServer(('0.0.0.0', port), Handler)
+    _server.daemon_threads = True
+    threading.Thread(target=_server.serve_forever, daemon=True).start()
+    print(f"Số liệu crawler: http://localhost:{port}/metrics")
+    return _server
+
+
+# 🛠 Hàm ghi số liệu cuối lần chạy ra JSONL / file Prometheus và in bảng tổng hợp
+def write_metrics():
+    global _server
+    REGISTRY.print_summary()
+    if METRICS_ENABLED:
+        REGISTRY.write_jsonl(METRICS_FILE)
+        print(f"Đã ghi số liệu vào {METRICS_FILE}")
+    if METRICS_PROM_FILE:
+        REGISTRY.write_prometheus(METRICS_PROM_FILE)
+    if _server is not None:
+        _server.shutdown()
+        _server.server_close()
+        _server = None
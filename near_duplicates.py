@@ -0,0 +1,191 @@
+import os
+import re
+import hashlib
+import sqlite3
+import threading
+from datetime import datetime
+import numpy as np
+
+# Chỉ mục MinHash của mọi bài đã nhập, dùng chung cho mọi trang báo
+NEAR_DUP_DB = os.getenv('NEAR_DUP_DB', 'near_duplicates.db')
+# 'drop': bỏ bài trùng trước khi lưu DB / NER / KG; 'flag': vẫn lưu, chỉ ghi nhận trong chỉ mục
+NEAR_DUP_MODE = os.getenv('NEAR_DUP_MODE', 'drop')
+# Hai bài có độ tương đồng Jaccard (ước lượng trên tập shingle) từ ngưỡng này là cùng một bài
+JACCARD_THRESHOLD = float(os.getenv('NEAR_DUP_THRESHOLD', 0.7))
+# Chữ ký 128 hàm hash, chia 32 dải x 4 hàng: cặp bài Jaccard 0.7 gần như chắc chắn trùng ít nhất một dải,
+# cặp bài Jaccard < 0.3 hiếm khi thành ứng viên
+NUM_PERM = 128
+LSH_BANDS = 32
+BAND_ROWS = NUM_PERM // LSH_BANDS
+# Bài quá ngắn (video, ảnh, chưa parse được nội dung) không được so trùng: nội dung kiểu
+# "Xem video" giống nhau giữa nhiều bài khác nhau
+MIN_TOKENS = 30
+SHINGLE_SIZE = 3
+
+_WORD = re.compile(r'\w+')
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+# Hệ số cố định của NUM_PERM hàm hash a*x + b (cố định để chữ ký so được giữa các lần chạy)
+_rng = np.random.RandomState(20240501)
+_PERM_A = _rng.randint(1, (1 << 61) - 1, size=NUM_PERM, dtype=np.uint64)
+_PERM_B = _rng.randint(0, (1 << 61) - 1, size=NUM_PERM, dtype=np.uint64)
+
+
+# 🛠 Hàm tách nội dung thành các từ đã chuẩn hóa (chữ thường, bỏ dấu câu)
+def normalize_tokens(text):
+    return _WORD.findall(text.lower()) if isinstance(text, str) else []
+
+
+# 🛠 Hàm hash nội dung đã chuẩn hóa (bắt các bài trùng y hệt, kể cả khác khoảng trắng / dấu câu)
+def content_hash(tokens):
+    return hashlib.sha1(' '.join(tokens).encode('utf-8')).hexdigest()
+
+
+# 🛠 Hàm tính chữ ký MinHash (NUM_PERM số uint32) trên tập shingle SHINGLE_SIZE từ liên tiếp
+def minhash(tokens, shingle_size=SHINGLE_SIZE):
+    if len(tokens) < shingle_size:
+        return None
+    shingles = {' '.join(tokens[i:i + shingle_size]) for i in range(len(tokens) - shingle_size + 1)}
+    hashes = np.array(
+        [int.from_bytes(hashlib.blake2b(s.encode('utf-8'), digest_size=4).digest(), 'big') for s in shingles],
+        dtype=np.uint64,
+    )
+    # Ma trận (số shingle x NUM_PERM): mỗi cột là một hoán vị, lấy giá trị nhỏ nhất theo cột
+    permuted = ((hashes[:, None] * _PERM_A + _PERM_B) % _MERSENNE_PRIME) & _MAX_HASH
+    return permuted.min(axis=0).astype(np.uint32)
+
+
+def jaccard_estimate(signature, other):
+    return float(np.mean(signature == other))
+
+
+# 🛠 Hàm tạo khóa cho từng dải của chữ ký (số nguyên có dấu 64 bit để lưu SQLite)
+def _band_keys(signature):
+    return [
+        (band, int.from_bytes(hashlib.blake2b(signature[band * BAND_ROWS:(band + 1) * BAND_ROWS].tobytes(),
+                                             digest_size=8).digest(), 'big', signed=True))
+        for band in range(LSH_BANDS)
+    ]
+
+
+class DuplicateIndex:
+    """
+    Chỉ mục bài đã nhập (mọi trang báo) để phát hiện bài trùng trước khi lưu DB:
+    trùng y hệt theo hash nội dung, gần trùng theo MinHash + LSH (bảng khóa theo dải của chữ ký).
+    Mỗi URL được ghi kèm bài gốc nó trùng (duplicate_of). Thay đổi chỉ được giữ khi
+    gọi commit() (sau khi lưu DB thành công), rollback() để bỏ.
+    """
+
+    def __init__(self, db_file=NEAR_DUP_DB, threshold=JACCARD_THRESHOLD):
+        self.db_file = db_file
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_file, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS documents (
+                url TEXT PRIMARY KEY,
+                source TEXT,
+                content_hash TEXT,
+                signature BLOB,
+                duplicate_of TEXT,
+                similarity REAL,
+                added_at TEXT
+            ) WITHOUT ROWID
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS documents_hash ON documents (content_hash)")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS bands (
+                band INTEGER,
+                value INTEGER,
+                url TEXT,
+                PRIMARY KEY (band, value, url)
+            ) WITHOUT ROWID
+        """)
+        self._conn.commit()
+
+    # 🛠 Hàm tìm bài gốc mà nội dung trùng với, trả về (URL gốc, độ tương đồng) hoặc (None, None)
+    def _find_original(self, digest, signature):
+        row = self._conn.execute(
+            "SELECT COALESCE(duplicate_of, url) FROM documents WHERE content_hash = ? LIMIT 1", (digest,)
+        ).fetchone()
+        if row:
+            return row[0], 1.0
+
+        candidates = set()
+        for band, key in _band_keys(signature):
+            candidates.update(url for (url,) in self._conn.execute(
+                "SELECT url FROM bands WHERE band = ? AND value = ?", (band, key)
+            ))
+        best = (None, None)
+        for url in candidates:
+            blob, = self._conn.execute("SELECT signature FROM documents WHERE url = ?", (url,)).fetchone()
+            similarity = jaccard_estimate(signature, np.frombuffer(blob, dtype=np.uint32))
+            if similarity >= self.threshold and (best[1] is None or similarity > best[1]):
+                best = (url, round(similarity, 3))
+        return best
+
+    # 🛠 Hàm ghi nhận một bài, trả về (URL bài gốc nếu là bài trùng, độ tương đồng)
+    def add(self, url, source, text):
+        with self._lock:
+            row = self._conn.execute("SELECT duplicate_of, similarity FROM documents WHERE url = ?", (url,)).fetchone()
+            if row:
+                return row  # Đã nhập ở lần trước: giữ nguyên kết luận cũ
+
+            tokens = normalize_tokens(text)
+            digest = signature = None
+            original = similarity = None
+            if len(tokens) >= MIN_TOKENS:
+                digest = content_hash(tokens)
+                signature = minhash(tokens)
+                original, similarity = self._find_original(digest, signature)
+
+            self._conn.execute(
+                "INSERT INTO documents (url, source, content_hash, signature, duplicate_of, similarity, added_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (url, source, digest, None if signature is None else signature.tobytes(),
+                 original, similarity, datetime.now().isoformat(timespec='seconds')),
+            )
+            # Chỉ bài gốc được đưa vào bảng dải, bài trùng trỏ thẳng về bài gốc
+            if signature is not None and original is None:
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO bands (band, value, url) VALUES (?, ?, ?)",
+                    [(band, key, url) for band, key in _band_keys(signature)],
+                )
+            return original, similarity
+
+    # 🛠 Hàm tách DataFrame (cột URL, Source, Content) thành (bài không trùng, bài trùng kèm cột DuplicateOf)
+    def filter_frame(self, df, text_column='Content'):
+        duplicate_of = []
+        for url, source, text in zip(df['URL'], df['Source'], df[text_column]):
+            original, _ = self.add(url, source, text)
+            duplicate_of.append(original)
+        is_duplicate = np.array([original is not None for original in duplicate_of], dtype=bool)
+        duplicates = df[is_duplicate].assign(DuplicateOf=[o for o in duplicate_of if o is not None])
+        return df[~is_duplicate], duplicates
+
+    def commit(self):
+        with self._lock:
+            self._conn.commit()
+
+    def rollback(self):
+        with self._lock:
+            self._conn.rollback()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+# 🛠 Hàm lọc bài trùng của một lần nhập (theo NEAR_DUP_MODE), trả về DataFrame cần lưu
+def drop_near_duplicates(df, index, label=''):
+    unique, duplicates = index.filter_frame(df)
+    if duplicates.empty:
+        return df
+    for url, original in zip(duplicates['URL'], duplicates['DuplicateOf']):
+        print(f"Bài trùng {url} -> {original}")
+    if NEAR_DUP_MODE == 'flag':
+        print(f"{label}: {len(duplicates)} bài trùng nội dung (chỉ ghi nhận, vẫn lưu)")
+        return df
+    print(f"{label}: bỏ {len(duplicates)} bài trùng nội dung, còn {len(unique)} bài")
+    return unique
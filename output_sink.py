@@ -0,0 +1,276 @@
+import os
+import csv
+import json
+import glob
+import itertools
+import shutil
+import socket
+import threading
+import time
+from datetime import datetime
+from metrics import inc, timer
+
+# Định dạng ghi kết quả, có thể ghi nhiều định dạng cùng lúc: CRAWL_OUTPUT=csv,parquet
+# - csv: file dataset_paper_<trang>.csv như trước (giữ nguyên schema)
+# - jsonl / parquet: thư mục phân vùng <OUTPUT_DIR>/source=<trang>/date=<ngày crawl>/part-*.<đuôi>
+OUTPUT_FORMATS = [fmt.strip() for fmt in os.getenv('CRAWL_OUTPUT', 'csv').split(',') if fmt.strip()]
+OUTPUT_DIR = os.getenv('CRAWL_OUTPUT_DIR', 'dataset')
+# Ghi xuống đĩa khi đủ số dòng này hoặc khi dòng cũ nhất trong bộ đệm đã chờ quá số giây này
+BATCH_SIZE = 200
+FLUSH_INTERVAL = 30
+
+CSV_HEADER = ["Source", "URL", "Category", "Keyword", "Time", "Title", "Content"]
+
+# pyarrow là tùy chọn: thiếu thì ghi jsonl thay cho parquet
+try:
+    import pyarrow  # noqa: F401
+    HAS_PARQUET = True
+except ImportError:
+    HAS_PARQUET = False
+
+# Số thứ tự part dùng chung cả tiến trình để hai bộ ghi không bao giờ trùng tên file
+_part_seq = itertools.count(1)
+
+
+# 🛠 Hàm ghi file tạm rồi rename để người đọc không bao giờ thấy file ghi dở
+def _atomic_write(path, write):
+    tmp_path = f"{path}.tmp"
+    write(tmp_path)
+    os.replace(tmp_path, path)
+
+
+# 🛠 Hàm đọc lại các dòng hoàn chỉnh từ file CSV tạm của lần chạy trước bị ngắt
+def _recover_csv_rows(tmp_path):
+    rows = []
+    try:
+        with open(tmp_path, mode='r', encoding='utf-8-sig', newline='') as f:
+            reader = csv.reader(f)
+            next(reader, None)  # Bỏ qua header
+            for row in reader:
+                # Dòng cuối có thể bị ghi dở khi crash
+                if len(row) == len(CSV_HEADER):
+                    rows.append(row)
+    except (OSError, csv.Error) as e:
+        print(f"Không đọc được {tmp_path}: {e}")
+    return rows
+
+
+class CsvFileWriter:
+    """
+    Ghi theo schema CSV hiện tại. Các dòng của lần chạy được ghi nối vào <file>.tmp (fsync mỗi batch).
+    Khi đóng: ghi mới (append=False) thì rename file tạm thành file thật; ghi nối thì chỉ chép các dòng
+    trong file tạm vào cuối file thật (không chép lại cả file cũ mỗi lần chạy). Kích thước file thật
+    trước khi nối được ghi vào <file>.commit: crash giữa lúc nối thì lần chạy sau cắt file thật về kích
+    thước đó rồi nối lại, nên file thật không có dòng ghi dở hay dòng bị nối hai lần.
+    Nếu lần chạy trước bị ngắt, các dòng trong file tạm được giữ lại cho lần chạy này.
+    """
+
+    def __init__(self, csv_file, append=False):
+        self.csv_file = csv_file
+        self.tmp_path = f"{csv_file}.tmp"
+        self.commit_path = f"{csv_file}.commit"
+        if os.path.exists(self.commit_path):
+            self._undo_partial_append()
+        self.append = append and os.path.exists(csv_file) and os.path.getsize(csv_file) > 0
+
+        recovered = _recover_csv_rows(self.tmp_path) if os.path.exists(self.tmp_path) else []
+        if recovered:
+            print(f"Khôi phục {len(recovered)} dòng từ {self.tmp_path} của lần chạy bị ngắt")
+        with open(self.tmp_path, mode='w', encoding='utf-8-sig', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(CSV_HEADER)
+            writer.writerows(recovered)
+        self._file = open(self.tmp_path, mode='a', encoding='utf-8-sig', newline='')
+        self._writer = csv.writer(self._file)
+
+    # 🛠 Hàm cắt bỏ phần nối dở của lần chạy trước (file tạm còn thì các dòng của nó sẽ được nối lại)
+    def _undo_partial_append(self):
+        with open(self.commit_path, encoding='utf-8') as f:
+            size = int(f.read().strip() or 0)
+        if os.path.exists(self.tmp_path) and os.path.exists(self.csv_file) and os.path.getsize(self.csv_file) > size:
+            print(f"Lần chạy trước dừng giữa lúc nối vào {self.csv_file}, cắt về {size} byte rồi nối lại")
+            os.truncate(self.csv_file, size)
+        os.remove(self.commit_path)
+
+    def write_batch(self, rows):
+        self._writer.writerows(rows)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        self._file.close()
+        if not self.append:
+            os.replace(self.tmp_path, self.csv_file)
+            return
+
+        with open(self.commit_path, 'w', encoding='utf-8') as f:
+            f.write(str(os.path.getsize(self.csv_file)))
+            f.flush()
+            os.fsync(f.fileno())
+        with open(self.tmp_path, 'rb') as staged, open(self.csv_file, 'ab') as target:
+            staged.readline()  # Bỏ qua header (kèm BOM) của file tạm
+            shutil.copyfileobj(staged, target)
+            target.flush()
+            os.fsync(target.fileno())
+        os.remove(self.tmp_path)
+        os.remove(self.commit_path)
+
+
+class PartitionedWriter:
+    """Mỗi batch là một file part mới (jsonl hoặc parquet) trong thư mục source=<trang>/date=<ngày>."""
+
+    def __init__(self, site, fmt, root=OUTPUT_DIR):
+        self.site = site
+        self.fmt = fmt
+        self.root = root
+
+    def write_batch(self, rows):
+        now = datetime.now()
+        partition = os.path.join(self.root, f"source={self.site}", f"date={now.strftime('%Y-%m-%d')}")
+        os.makedirs(partition, exist_ok=True)
+        seq = next(_part_seq)
+        # Tên máy + pid: nhiều worker (chế độ phân tán) ghi chung một thư mục mà không trùng file
+        path = os.path.join(partition, f"part-{now.strftime('%Y%m%dT%H%M%S')}-{socket.gethostname()}-{os.getpid()}-{seq:05d}.{self.fmt}")
+
+        if self.fmt == 'parquet':
+            import pandas as pd
+            frame = pd.DataFrame(rows, columns=CSV_HEADER)
+            _atomic_write(path, lambda tmp_path: frame.to_parquet(tmp_path, index=False))
+        else:
+            def _write_jsonl(tmp_path):
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    for row in rows:
+                        f.write(json.dumps(dict(zip(CSV_HEADER, row)), ensure_ascii=False) + "\n")
+            _atomic_write(path, _write_jsonl)
+
+    def close(self):
+        pass
+
+
+class OutputSink:
+    """
+    Bộ đệm kết quả của một trang báo: gom dòng thành batch rồi ghi ra mọi định dạng đã chọn.
+    Ghi khi đủ BATCH_SIZE dòng, khi quá FLUSH_INTERVAL giây (luồng nền) hoặc khi đóng.
+    Sau mỗi lần ghi xong, các hàm đăng ký qua on_flush nhận danh sách dòng vừa ghi
+    (crawler dùng để đánh dấu URL đã crawl chỉ khi dòng đã nằm trên đĩa).
+    """
+
+    def __init__(self, site, csv_file, append=False, formats=None,
+                 batch_size=BATCH_SIZE, flush_interval=FLUSH_INTERVAL):
+        formats = formats or OUTPUT_FORMATS
+        self.site = site
+        self.writers = []
+        if 'csv' in formats:
+            self.writers.append(CsvFileWriter(csv_file, append))
+        partitioned = partitioned_format(formats)
+        if partitioned:
+            self.writers.append(PartitionedWriter(site, partitioned))
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.rows_written = 0
+        self._buffer = []
+        self._oldest = None
+        self._listeners = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._timer = threading.Thread(target=self._flush_periodically, daemon=True)
+        self._timer.start()
+
+    def on_flush(self, listener):
+        with self._lock:
+            self._listeners.append(listener)
+
+    def remove_listener(self, listener):
+        with self._lock:
+            self._listeners.remove(listener)
+
+    def write(self, row):
+        with self._lock:
+            if not self._buffer:
+                self._oldest = time.monotonic()
+            self._buffer.append(row)
+            if len(self._buffer) >= self.batch_size:
+                self._flush_locked()
+
+    def _flush_locked(self):
+        if not self._buffer:
+            return
+        rows, self._buffer = self._buffer, []
+        with timer('output_flush_seconds', site=self.site):
+            for writer in self.writers:
+                writer.write_batch(rows)
+        self.rows_written += len(rows)
+        inc('output_rows_total', len(rows), site=self.site)
+        for listener in self._listeners:
+            listener(rows)
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_periodically(self):
+        while not self._stop.wait(1):
+            with self._lock:
+                if self._buffer and time.monotonic() - self._oldest >= self.flush_interval:
+                    try:
+                        self._flush_locked()
+                    except Exception as e:
+                        print(f"Lỗi khi ghi batch kết quả: {e}")
+
+    def close(self):
+        self._stop.set()
+        self._timer.join()
+        with self._lock:
+            self._flush_locked()
+            for writer in self.writers:
+                writer.close()
+
+
+# ============================================
+# ĐỌC LẠI DỮ LIỆU PHÂN VÙNG (SummaryPaper, ConnectAndSave)
+# ============================================
+# 🛠 Hàm lấy định dạng phân vùng đang dùng (parquet ưu tiên hơn jsonl), None nếu chỉ ghi CSV
+def partitioned_format(formats=None):
+    formats = formats or OUTPUT_FORMATS
+    if 'parquet' in formats:
+        if HAS_PARQUET:
+            return 'parquet'
+        print("Chưa cài pyarrow, ghi jsonl thay cho parquet.")
+        return 'jsonl'
+    return 'jsonl' if 'jsonl' in formats else None
+
+
+def _consumed_file(consumer, root):
+    return os.path.join(root, f"_consumed_{consumer}.txt")
+
+
+# 🛠 Hàm đọc các file part của một trang mà consumer chưa xử lý, trả về (DataFrame, danh sách part)
+def read_new_partitions(site, consumer, root=OUTPUT_DIR):
+    import pandas as pd
+
+    consumed = set()
+    if os.path.exists(_consumed_file(consumer, root)):
+        with open(_consumed_file(consumer, root), encoding='utf-8') as f:
+            consumed = set(line.strip() for line in f)
+
+    parts = sorted(
+        path for path in glob.glob(os.path.join(root, f"source={site}", "date=*", "part-*"))
+        if not path.endswith('.tmp') and os.path.relpath(path, root) not in consumed
+    )
+    frames = []
+    for path in parts:
+        if path.endswith('.parquet'):
+            frames.append(pd.read_parquet(path))
+        else:
+            frames.append(pd.read_json(path, lines=True, dtype=False))
+    df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=CSV_HEADER)
+    return df, parts
+
+
+# 🛠 Hàm ghi nhận consumer đã xử lý xong các part (chỉ gọi sau khi lưu thành công)
+def mark_partitions_consumed(consumer, parts, root=OUTPUT_DIR):
+    if not parts:
+        return
+    with open(_consumed_file(consumer, root), 'a', encoding='utf-8') as f:
+        for path in parts:
+            f.write(os.path.relpath(path, root) + "\n")
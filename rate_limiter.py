@@ -0,0 +1,173 @@
+import os
+import time
+import threading
+from datetime import datetime
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+from metrics import inc, observe
+
+# Tốc độ ban đầu (request/giây) cho từng host; bộ điều khiển tự tăng/giảm quanh giá trị này
+HOST_RATES = {
+    'tuoitre.vn': 4.0,
+    'znews.vn': 3.0,
+    'vnexpress.net': 3.0,
+    'vietnamnet.vn': 3.0,
+}
+DEFAULT_RATE = float(os.getenv('CRAWL_RATE', 2.0))
+MIN_RATE = 0.2
+MAX_RATE = float(os.getenv('CRAWL_MAX_RATE', 20.0))
+# Số request được phép dồn cùng lúc khi host đang rảnh
+BURST = 4
+
+# AIMD: mỗi phản hồi tốt cộng thêm ADDITIVE_STEP req/s, mỗi tín hiệu quá tải nhân tốc độ với BACKOFF_FACTOR
+ADDITIVE_STEP = 0.1
+BACKOFF_FACTOR = 0.5
+# Chỉ giảm tốc tối đa một lần mỗi khoảng này, tránh một loạt lỗi cùng lúc kéo tốc độ về sàn
+BACKOFF_INTERVAL = 2.0
+# Độ trễ được coi là đang tăng khi vượt quá LATENCY_RATIO lần mức nền (và tối thiểu LATENCY_FLOOR giây)
+LATENCY_RATIO = 2.0
+LATENCY_FLOOR = 1.0
+LATENCY_EWMA_ALPHA = 0.2
+# Retry-After lớn hơn mức này bị cắt bớt để không treo cả lần chạy
+MAX_RETRY_AFTER = 60
+
+# Mã trạng thái cho thấy server đang quá tải
+OVERLOAD_STATUSES = {429, 500, 502, 503, 504}
+
+
+# 🛠 Hàm lấy host (bỏ tiền tố www.) từ URL
+def get_host(url):
+    host = urlparse(url).netloc.lower()
+    return host[4:] if host.startswith('www.') else host
+
+
+# 🛠 Hàm đọc header Retry-After (số giây hoặc ngày giờ HTTP), trả về số giây cần chờ
+def parse_retry_after(value):
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return min(int(value), MAX_RETRY_AFTER)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError, IndexError):
+        return None
+    delay = (retry_at - datetime.now(retry_at.tzinfo)).total_seconds()
+    return min(max(delay, 0), MAX_RETRY_AFTER)
+
+
+class HostRateLimiter:
+    """
+    Token bucket cho một host với tốc độ điều chỉnh theo AIMD:
+    phản hồi nhanh và thành công thì tăng dần tốc độ, gặp 429/5xx, timeout
+    hoặc độ trễ tăng vọt thì giảm một nửa. Dùng chung cho mọi luồng trong tiến trình.
+    """
+
+    def __init__(self, host, rate=DEFAULT_RATE, min_rate=MIN_RATE, max_rate=MAX_RATE, burst=BURST):
+        self.host = host
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.latency = None          # EWMA độ trễ của mọi phản hồi thành công (giây)
+        self.blocked_until = 0.0     # Thời điểm được gửi tiếp sau Retry-After
+        self.requests = 0
+        self.backoffs = 0
+        self.waited = 0.0
+        self._updated_at = time.monotonic()
+        self._last_backoff = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    # 🛠 Hàm giữ chỗ một request, trả về số giây phải chờ trước khi gửi
+    def reserve(self):
+        """Không tự ngủ nên dùng được cả từ code đồng bộ (acquire) lẫn asyncio (await asyncio.sleep)."""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.tokens -= 1
+            wait = max(0.0, -self.tokens / self.rate, self.blocked_until - now)
+            self.requests += 1
+            self.waited += wait
+        observe('rate_limit_wait_seconds', wait, host=self.host)
+        return wait
+
+    # 🛠 Hàm chờ tới lượt gửi request (code đồng bộ)
+    def acquire(self):
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    # 🛠 Hàm ghi nhận một phản hồi tốt cùng độ trễ của nó
+    def record_success(self, latency):
+        with self._lock:
+            spike = self.latency is not None and latency > max(LATENCY_FLOOR, self.latency * LATENCY_RATIO)
+            # Mức nền luôn được cập nhật, kể cả khi tăng vọt: host chậm hẳn đi thì mức nền đuổi kịp
+            # và các phản hồi sau không còn bị coi là tăng vọt (tránh giảm tốc mãi về MIN_RATE)
+            self.latency = latency if self.latency is None else (
+                LATENCY_EWMA_ALPHA * latency + (1 - LATENCY_EWMA_ALPHA) * self.latency
+            )
+            if spike:
+                self._backoff(f"độ trễ tăng lên {latency:.1f}s")
+            else:
+                self.rate = min(self.max_rate, self.rate + ADDITIVE_STEP)
+
+    # 🛠 Hàm ghi nhận tín hiệu quá tải (429/5xx, timeout, lỗi kết nối)
+    def record_failure(self, reason, retry_after=None):
+        with self._lock:
+            if retry_after:
+                self.blocked_until = max(self.blocked_until, time.monotonic() + retry_after)
+            self._backoff(reason)
+
+    def _backoff(self, reason):
+        now = time.monotonic()
+        if now - self._last_backoff < BACKOFF_INTERVAL:
+            return
+        self._last_backoff = now
+        self.backoffs += 1
+        inc('rate_limit_backoffs_total', host=self.host)
+        self.rate = max(self.min_rate, self.rate * BACKOFF_FACTOR)
+        # Bỏ các token đã tích lũy để giảm tốc có hiệu lực ngay
+        self.tokens = min(self.tokens, 0.0)
+        print(f"Giảm tốc độ {self.host} còn {self.rate:.2f} req/s ({reason})")
+
+    def stats(self):
+        with self._lock:
+            return {
+                'host': self.host,
+                'rate': round(self.rate, 2),
+                'latency': round(self.latency, 3) if self.latency is not None else None,
+                'requests': self.requests,
+                'backoffs': self.backoffs,
+                'waited': round(self.waited, 1),
+            }
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+# 🛠 Hàm lấy bộ giới hạn tốc độ dùng chung của host chứa URL
+def get_limiter(url):
+    host = get_host(url)
+    with _limiters_lock:
+        limiter = _limiters.get(host)
+        if limiter is None:
+            limiter = HostRateLimiter(host, HOST_RATES.get(host, DEFAULT_RATE))
+            _limiters[host] = limiter
+        return limiter
+
+
+# 🛠 Hàm in trạng thái tốc độ của các host đã truy cập (cuối lần chạy)
+def print_rate_stats():
+    with _limiters_lock:
+        limiters = list(_limiters.values())
+    for limiter in limiters:
+        s = limiter.stats()
+        print(f"{s['host']}: {s['requests']} request, tốc độ cuối {s['rate']} req/s, "
+              f"độ trễ TB {s['latency']}s, giảm tốc {s['backoffs']} lần, tổng thời gian chờ {s['waited']}s")
@@ -0,0 +1,248 @@
+import os
+import json
+import time
+import random
+import hashlib
+import threading
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+from requests.adapters import HTTPAdapter
+from requests.utils import requote_uri
+from http_fetcher import get_session
+from http_cache import HttpCache, HTTP_CACHE_FILE
+from html_archive import HtmlArchive, read_record, HTML_ARCHIVE_DIR
+from rate_limiter import get_host
+
+# Thư mục mặc định chứa fixture ghi lại từ một lần crawl thật
+FIXTURE_DIR = os.getenv('BENCH_FIXTURE_DIR', 'bench_fixtures')
+MANIFEST_FILE = 'manifest.json'
+
+HTML_CONTENT_TYPE = 'text/html; charset=utf-8'
+XML_CONTENT_TYPE = 'application/xml; charset=utf-8'
+
+
+# 🛠 Hàm tạo khóa tra fixture từ URL: host + path + query (bỏ scheme, mã hóa % như requests gửi đi)
+def fixture_key(url):
+    parts = urlsplit(requote_uri(url))
+    key = f"{parts.netloc.lower()}{parts.path or '/'}"
+    return f"{key}?{parts.query}" if parts.query else key
+
+
+# 🛠 Hàm đoán Content-Type của một trang đã lưu
+def guess_content_type(url, body):
+    if url.endswith(('.rss', '.xml')) or body.lstrip()[:5] == b'<?xml':
+        return XML_CONTENT_TYPE
+    return HTML_CONTENT_TYPE
+
+
+class FixtureSet:
+    """
+    Tập trang dùng để phát lại: khóa fixture_key(url) -> (nội dung bytes, Content-Type).
+    now là thời điểm crawl mà các trang thuộc về (benchmark lấy khung giờ theo nó);
+    expected là số bài trong khung giờ của từng trang báo (chỉ biết với fixture tự sinh).
+    """
+
+    def __init__(self, now, pages=None, expected=None):
+        self.now = now
+        self.pages = pages or {}
+        self.expected = expected or {}
+
+    def add(self, url, body, content_type=None):
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        self.pages[fixture_key(url)] = (body, content_type or guess_content_type(url, body))
+
+    def get(self, key):
+        return self.pages.get(key)
+
+    def __len__(self):
+        return len(self.pages)
+
+    # 🛠 Hàm lưu fixture ra thư mục: manifest.json + mỗi trang một file
+    def save(self, fixture_dir):
+        os.makedirs(os.path.join(fixture_dir, 'pages'), exist_ok=True)
+        manifest = {'now': self.now.isoformat(), 'expected': self.expected, 'pages': {}}
+        for key, (body, content_type) in self.pages.items():
+            file_name = os.path.join('pages', hashlib.sha1(key.encode('utf-8')).hexdigest())
+            with open(os.path.join(fixture_dir, file_name), 'wb') as f:
+                f.write(body)
+            manifest['pages'][key] = {'file': file_name, 'content_type': content_type}
+        with open(os.path.join(fixture_dir, MANIFEST_FILE), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=1)
+
+    @classmethod
+    def load(cls, fixture_dir):
+        with open(os.path.join(fixture_dir, MANIFEST_FILE), encoding='utf-8') as f:
+            manifest = json.load(f)
+        pages = {}
+        for key, entry in manifest['pages'].items():
+            with open(os.path.join(fixture_dir, entry['file']), 'rb') as f:
+                pages[key] = (f.read(), entry['content_type'])
+        return cls(datetime.fromisoformat(manifest['now']), pages, manifest.get('expected'))
+
+
+# 🛠 Hàm ghi fixture từ dữ liệu của lần crawl thật: HTML bài trong archive + menu/danh sách/feed trong http_cache
+def record_fixtures(fixture_dir, adapters, now, archive_dir=HTML_ARCHIVE_DIR, cache_file=HTTP_CACHE_FILE):
+    """now: thời điểm của lần crawl đã ghi (benchmark sẽ crawl lại đúng khung giờ đó)."""
+    fixtures = FixtureSet(now)
+    hosts = {get_host(adapter.base_url) for adapter in adapters}
+
+    archive = HtmlArchive(archive_dir)
+    try:
+        locations = archive.locations([adapter.name for adapter in adapters])
+    finally:
+        archive.close()
+    for url, _, _, segment, offset, length in locations:
+        _, body = read_record(archive_dir, segment, offset, length)
+        fixtures.add(url, body, HTML_CONTENT_TYPE)
+
+    if os.path.exists(cache_file):
+        cache = HttpCache(cache_file)
+        try:
+            for url in cache.urls():
+                if get_host(url) not in hosts:
+                    continue
+                cached = cache.get(url)
+                if cached is not None:
+                    fixtures.add(url, cached.content)
+        finally:
+            cache.close()
+
+    fixtures.save(fixture_dir)
+    print(f"Đã ghi {len(fixtures)} trang vào {fixture_dir} ({len(locations)} bài từ archive)")
+    return fixtures
+
+
+class ReplayServer:
+    """
+    Server HTTP cục bộ đóng vai các trang báo: trả trang trong FixtureSet theo đường dẫn
+    /<host>/<path>?<query>, có thể thêm độ trễ (latency ± jitter giây) và lỗi 503
+    ngẫu nhiên (tỉ lệ error_rate) để thử bộ giới hạn tốc độ và đường thử lại.
+    Trang có ETag nên GET có điều kiện của http_fetcher nhận được 304 như với server thật.
+    """
+
+    def __init__(self, fixtures, latency=0.0, jitter=0.0, error_rate=0.0, seed=None):
+        self.fixtures = fixtures
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.served = 0
+        self.not_modified = 0
+        self.errors = 0
+        self.not_found = 0
+        self.bytes_sent = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer(('127.0.0.1', 0), self._make_handler())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def address(self):
+        host, port = self._httpd.server_address[:2]
+        return f"{host}:{port}"
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'  # Giữ kết nối (keep-alive) như server thật
+
+            def do_GET(self):
+                server._handle(self)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    # 🛠 Hàm chọn độ trễ và có trả lỗi hay không cho một request
+    def _draw(self):
+        with self._lock:
+            delay = max(0.0, self.latency + self._random.uniform(-self.jitter, self.jitter))
+            fail = self._random.random() < self.error_rate
+        return delay, fail
+
+    def _count(self, field, size=0):
+        with self._lock:
+            setattr(self, field, getattr(self, field) + 1)
+            self.bytes_sent += size
+
+    def _handle(self, request):
+        delay, fail = self._draw()
+        if delay:
+            time.sleep(delay)
+
+        page = self.fixtures.get(request.path[1:])
+        if fail:
+            self._count('errors')
+            self._reply(request, 503, b'Service Unavailable', 'text/plain')
+            return
+        if page is None:
+            self._count('not_found')
+            self._reply(request, 404, b'Not Found', 'text/plain')
+            return
+
+        body, content_type = page
+        etag = f'"{hashlib.md5(body).hexdigest()}"'
+        if request.headers.get('If-None-Match') == etag:
+            self._count('not_modified')
+            self._reply(request, 304, b'', content_type, etag)
+            return
+        self._count('served', len(body))
+        self._reply(request, 200, body, content_type, etag)
+
+    @staticmethod
+    def _reply(request, status, body, content_type, etag=None):
+        request.send_response(status)
+        request.send_header('Content-Type', content_type)
+        if etag:
+            request.send_header('ETag', etag)
+        if status != 304:
+            request.send_header('Content-Length', str(len(body)))
+        request.end_headers()
+        if status != 304:
+            request.wfile.write(body)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'served': self.served,
+                'not_modified': self.not_modified,
+                'errors': self.errors,
+                'not_found': self.not_found,
+                'bytes': self.bytes_sent,
+            }
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def close(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+class ReplayAdapter(HTTPAdapter):
+    """Transport adapter của requests: chuyển mọi request tới ReplayServer, giữ host gốc trong đường dẫn."""
+
+    def __init__(self, address, **kwargs):
+        self.address = address
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        parts = urlsplit(request.url)
+        if parts.netloc != self.address:
+            request.url = f"http://{self.address}/{fixture_key(request.url)}"
+        return super().send(request, **kwargs)
+
+
+# 🛠 Hàm cho session HTTP dùng chung gửi mọi request tới server phát lại thay vì Internet
+def install_replay(address, pool_maxsize=32):
+    session = get_session(pool_maxsize)
+    adapter = ReplayAdapter(address, pool_connections=8, pool_maxsize=pool_maxsize)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
@@ -0,0 +1,192 @@
+import csv
+import hashlib
+import math
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+# File dùng chung cho tất cả crawler
+SEEN_DB_FILE = os.getenv('SEEN_URLS_DB', 'seen_urls.db')
+BLOOM_CAPACITY = 1_000_000
+BLOOM_ERROR_RATE = 0.01
+
+
+class BloomFilter:
+    """Bloom filter kích thước cố định, lưu thẳng mảng bit ra file (không cần quét URL khi nạp)."""
+
+    def __init__(self, capacity=BLOOM_CAPACITY, error_rate=BLOOM_ERROR_RATE, bits=None):
+        self.size = int(-capacity * math.log(error_rate) / (math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        expected = (self.size + 7) // 8
+        if bits is not None and len(bits) != expected:
+            raise ValueError(f"Kích thước bloom filter không khớp ({len(bits)} != {expected} byte)")
+        self.bits = bits if bits is not None else bytearray(expected)
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hash_count)]
+
+    def add(self, key):
+        for pos in self._positions(key):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, key):
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+    def save(self, path, item_count):
+        """Ghi số URL đã có (8 byte đầu) + mảng bit; ghi ra file tạm rồi rename cho an toàn."""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(item_count.to_bytes(8, 'little'))
+            f.write(self.bits)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path, capacity=BLOOM_CAPACITY, error_rate=BLOOM_ERROR_RATE):
+        """Trả về (bloom, số URL lúc lưu)."""
+        with open(path, 'rb') as f:
+            item_count = int.from_bytes(f.read(8), 'little')
+            return cls(capacity, error_rate, bytearray(f.read())), item_count
+
+
+# 🛠 Hàm đọc URL bài báo (cột thứ 2) từ file CSV kết quả của crawler; chưa có file thì trả về danh sách rỗng
+def read_csv_urls(csv_file):
+    urls = []
+    try:
+        with open(csv_file, mode='r', encoding='utf-8-sig') as file:
+            reader = csv.reader(file)
+            next(reader, None)  # Bỏ qua header
+            for row in reader:
+                if len(row) >= 2:
+                    urls.append(row[1])
+    except FileNotFoundError:
+        pass
+    return urls
+
+
+class SeenUrlStore:
+    """
+    Kho URL đã crawl dùng chung cho mọi crawler, lưu trong SQLite (khóa chính là URL).
+    Dùng như một set: `url in store`, `store.add(url)`. Bloom filter phía trước trả lời
+    nhanh các URL chắc chắn chưa gặp mà không cần chạm vào SQLite.
+    """
+
+    def __init__(self, db_file=SEEN_DB_FILE, use_bloom=True):
+        self.db_file = db_file
+        self.bloom_file = f"{db_file}.bloom"
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_file, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS seen_urls (
+                url TEXT PRIMARY KEY,
+                source TEXT,
+                first_seen TEXT
+            ) WITHOUT ROWID
+        """)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS imported_files (
+                path TEXT PRIMARY KEY,
+                imported_at TEXT
+            )
+        """)
+        # Đếm số URL tăng dần khi thêm, để không phải COUNT(*) toàn bảng
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value INTEGER
+            )
+        """)
+        self._conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('url_count', 0)")
+        self._conn.commit()
+
+        self.bloom = None
+        if use_bloom:
+            self.bloom = self._load_bloom()
+
+    def _count(self):
+        return self._conn.execute("SELECT value FROM meta WHERE key = 'url_count'").fetchone()[0]
+
+    def _load_bloom(self):
+        if os.path.exists(self.bloom_file):
+            try:
+                bloom, item_count = BloomFilter.load(self.bloom_file)
+                if item_count == self._count():
+                    return bloom
+                print("Bloom filter cũ hơn kho URL (lần chạy trước bị ngắt?), dựng lại.")
+            except (OSError, ValueError) as e:
+                print(f"Không đọc được bloom filter {self.bloom_file}: {e}")
+        # Chưa có hoặc không khớp file bloom: dựng lại một lần từ SQLite
+        bloom = BloomFilter()
+        for (url,) in self._conn.execute("SELECT url FROM seen_urls"):
+            bloom.add(url)
+        return bloom
+
+    def _insert(self, urls, source):
+        now = datetime.now().isoformat(timespec='seconds')
+        with self._lock:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO seen_urls (url, source, first_seen) VALUES (?, ?, ?)",
+                [(url, source, now) for url in urls],
+            )
+            inserted = self._conn.total_changes - before
+            self._conn.execute("UPDATE meta SET value = value + ? WHERE key = 'url_count'", (inserted,))
+            self._conn.commit()
+        if self.bloom is not None:
+            for url in urls:
+                self.bloom.add(url)
+
+    def __contains__(self, url):
+        if self.bloom is not None and url not in self.bloom:
+            return False
+        with self._lock:
+            row = self._conn.execute("SELECT 1 FROM seen_urls WHERE url = ?", (url,)).fetchone()
+        return row is not None
+
+    def add(self, url, source=None):
+        self._insert([url], source)
+
+    def add_many(self, urls, source=None):
+        self._insert(list(urls), source)
+
+    def __len__(self):
+        with self._lock:
+            return self._count()
+
+    # 🛠 Nhập URL từ file CSV cũ (chỉ một lần cho mỗi file) để giữ lịch sử khi chuyển sang kho mới
+    def seed_from_csv(self, csv_file, source=None):
+        path = os.path.abspath(csv_file)
+        with self._lock:
+            done = self._conn.execute("SELECT 1 FROM imported_files WHERE path = ?", (path,)).fetchone()
+        if done:
+            return 0
+
+        urls = read_csv_urls(csv_file)
+        self.add_many(urls, source)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO imported_files (path, imported_at) VALUES (?, ?)",
+                (path, datetime.now().isoformat(timespec='seconds')),
+            )
+            self._conn.commit()
+        print(f"Đã nhập {len(urls)} URL từ {csv_file} vào kho URL đã crawl")
+        return len(urls)
+
+    def close(self):
+        with self._lock:
+            if self.bloom is not None:
+                self.bloom.save(self.bloom_file, self._count())
+            self._conn.close()
+
+
+# 🛠 Hàm mở kho URL đã crawl dùng chung, nhập lịch sử từ CSV của crawler nếu chưa nhập
+def open_seen_store(csv_file=None, source=None, db_file=SEEN_DB_FILE):
+    store = SeenUrlStore(db_file)
+    if csv_file:
+        store.seed_from_csv(csv_file, source)
+    return store
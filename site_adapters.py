@@ -0,0 +1,432 @@
+from datetime import datetime
+from html_parser import parse_html
+import requests
+from selenium.webdriver.common.by import By
+from http_fetcher import fetch_html
+from http_cache import MENU_TTL
+from driver_pool import wait_for_element, wait_for_page_growth
+from vn_time import vn_timezone, parse_vn_time
+from rate_limiter import get_limiter
+from discovery import (
+    extract_tuoitre_zone_id, tuoitre_timeline_url, znews_page_url, iter_listing_pages,
+    parse_tuoitre_href_time, classify_listing_time, LISTING_IN_WINDOW, LISTING_OLDER,
+    TUOITRE_FEEDS, VNEXPRESS_FEEDS, ZNEWS_FEEDS,
+)
+
+
+class SiteAdapter:
+    """
+    Mô tả một trang báo cho crawler_engine: selector, cách đọc thời gian và cách tìm bài.
+    Lớp con chỉ khai báo những gì khác nhau giữa các trang; phần tải trang, lọc khung giờ,
+    ghi CSV và chạy song song nằm ở crawler_engine.
+    """
+
+    name = None                 # Khóa dùng trên dòng lệnh (CrawlPaperAll.py tuoitre znews ...)
+    source = None               # Giá trị cột Source trong CSV
+    base_url = None
+    csv_file = None
+    append_output = False       # True: ghi nối vào CSV cũ, False: ghi lại file mỗi lần chạy
+    feeds = []                  # (danh mục, URL RSS / sitemap), xem discovery.py
+    page_load_timeout = 120
+
+    # Trang danh sách bài của một danh mục
+    listing_item_selector = None
+    listing_ready_selector = None
+    stop_at_first_older = True  # False: chỉ dừng khi cả trang đều cũ hơn khung giờ
+    keep_unknown_time = False   # True: giữ bài không đọc được thời gian trên danh sách (lọc lại ở trang bài)
+    scroll_timeout = 5          # Số giây tối đa chờ nội dung mới sau mỗi lần cuộn
+
+    # Menu danh mục ở trang chủ
+    menu_ready_selector = None
+    excluded_categories = ()
+
+    # 🛠 Hàm đọc thời gian trong trang bài viết (now dùng cho các dạng tương đối như "2 giờ trước")
+    def parse_time(self, time_text, now):
+        parsed = parse_vn_time(time_text, now)
+        if parsed is None:
+            print(f"Không parse được thời gian: {time_text}")
+        return parsed
+
+    # 🛠 Hàm trích xuất dòng CSV từ HTML bài viết (None nếu bài không dùng được)
+    def parse_article(self, html, article_url, category_name):
+        raise NotImplementedError
+
+    # 🛠 Hàm lấy danh sách (tên, URL) danh mục từ HTML trang chủ
+    def menu_categories(self, soup):
+        raise NotImplementedError
+
+    # 🛠 Hàm lấy URL tuyệt đối của bài từ một item trong danh sách
+    def item_href(self, item):
+        href = item.get('href')
+        if href and not href.startswith('http'):
+            href = f"{self.base_url}{href}"
+        return href
+
+    # 🛠 Hàm đọc thời gian xuất bản của item trên danh sách (datetime, date hoặc None)
+    def listing_time(self, item):
+        return None
+
+    # 🛠 Hàm trả về page_url(page) để duyệt danh sách bằng HTTP, None nếu trang không hỗ trợ
+    def listing_page_url(self, category_url):
+        return None
+
+    # 🛠 Hàm mở trang chủ và trả về HTML đã parse để đọc menu
+    def open_menu(self, pooled):
+        pooled.get(self.base_url)
+        if self.menu_ready_selector:
+            wait_for_element(pooled.driver, By.CSS_SELECTOR, self.menu_ready_selector, timeout=10)
+        return parse_html(pooled.driver.page_source)
+
+    # 🛠 Hàm bỏ các danh mục bị loại trừ
+    def _filter_categories(self, categories):
+        kept = []
+        for category_name, category_url in categories:
+            if category_name in self.excluded_categories:
+                print(f"Bỏ qua danh mục: {category_name}")
+                continue
+            kept.append((category_name, category_url))
+        return kept
+
+    # 🛠 Hàm đọc menu từ trang chủ tải bằng HTTP (dùng lại bản cache trong MENU_TTL); rỗng nếu menu cần JavaScript
+    def list_categories_http(self):
+        try:
+            soup = parse_html(fetch_html(self.base_url, max_age=MENU_TTL))
+        except requests.RequestException as e:
+            print(f"Không tải được trang chủ {self.base_url} qua HTTP: {e}")
+            return []
+        return self._filter_categories(self.menu_categories(soup))
+
+    # 🛠 Hàm đọc menu trong Chrome (khi HTML tĩnh không có menu)
+    def list_categories(self, pooled):
+        return self._filter_categories(self.menu_categories(self.open_menu(pooled)))
+
+    # 🛠 Hàm lọc các bài trong khung giờ từ danh sách item, trả về True khi nên dừng duyệt
+    def collect_listing(self, items, found, category_name, window):
+        older_items = 0
+        for item in items:
+            article_url = None
+            try:
+                article_url = self.item_href(item)
+                if not article_url:
+                    continue
+                position = classify_listing_time(self.listing_time(item), window.start, window.end)
+            except Exception as e:
+                print(f"Lỗi khi xử lý bài {article_url}: {e}")
+                continue
+
+            if position == LISTING_IN_WINDOW or (position is None and self.keep_unknown_time):
+                found.add(article_url)
+            elif position == LISTING_OLDER:
+                if self.stop_at_first_older:
+                    print(f"Dừng duyệt {category_name}, phát hiện bài cũ hơn khung giờ.")
+                    return True
+                older_items += 1
+
+        # Cả trang đã cũ hơn khung giờ -> các trang sau còn cũ hơn
+        if items and older_items == len(items):
+            print(f"Dừng duyệt {category_name}, cả trang đã cũ hơn khung giờ.")
+            return True
+        return False
+
+    # 🛠 Hàm tìm bài qua các trang danh sách bằng HTTP; trả về None nếu không dùng được
+    def discover_category_http(self, category, window):
+        category_name, category_url = category
+        page_url = self.listing_page_url(category_url)
+        if page_url is None:
+            return None
+
+        found = set()
+        pages = 0
+        for page, items in iter_listing_pages(page_url, self.listing_item_selector, href_of=self.item_href):
+            pages += 1
+            if self.collect_listing(items, found, category_name, window):
+                break
+        return found if pages else None
+
+    # 🛠 Hàm tìm bài bằng cách cuộn trang trong Chrome (dự phòng)
+    def discover_category_browser(self, pooled, category, window):
+        category_name, category_url = category
+        pooled.get(category_url)
+        driver = pooled.driver
+        wait_for_element(driver, By.CSS_SELECTOR, self.listing_ready_selector, timeout=10)
+
+        found = set()
+        last_height = driver.execute_script("return document.body.scrollHeight")
+
+        while True:
+            items = parse_html(driver.page_source).select(self.listing_item_selector)
+            if self.collect_listing(items, found, category_name, window):
+                break
+
+            # Mỗi lần cuộn kéo thêm một trang bài từ server nên cũng chờ lượt như một request
+            get_limiter(category_url).acquire()
+            driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+            new_height = wait_for_page_growth(driver, last_height, timeout=self.scroll_timeout)
+            if new_height == last_height:
+                print(f"Dừng cuộn trang trong {category_name}, không còn nội dung mới.")
+                break
+            last_height = new_height
+        return found
+
+    # 🛠 Hàm tìm các bài trong khung giờ của một danh mục
+    def discover_category(self, acquire_driver, category, window):
+        """acquire_driver() mượn một driver từ pool; chỉ được gọi khi HTTP không dùng được."""
+        category_name = category[0]
+        print(f"Đang xử lý danh mục: {category_name}")
+
+        found = None
+        try:
+            found = self.discover_category_http(category, window)
+        except requests.RequestException as e:
+            print(f"Lỗi khi tải trang danh sách của {category_name} qua HTTP: {e}")
+        if found is None:
+            with acquire_driver() as pooled:
+                found = self.discover_category_browser(pooled, category, window)
+
+        print(f"Tìm thấy {len(found)} bài trong {category_name}")
+        return found
+
+
+class TuoiTreAdapter(SiteAdapter):
+    name = 'tuoitre'
+    source = 'Tuoi tre'
+    base_url = 'https://tuoitre.vn'
+    csv_file = 'dataset_paper_tuoitre.csv'
+    feeds = TUOITRE_FEEDS
+    page_load_timeout = 120
+
+    listing_item_selector = 'div.box-category-item > a'
+    listing_ready_selector = 'div.box-category-item'
+
+    def parse_article(self, html, article_url, category_name):
+        soup = parse_html(html)
+        time_elem = soup.select_one('div.detail-time > div')
+        time_paper = time_elem.get_text(strip=True) if time_elem else "N/A"
+
+        title_elem = soup.select_one('h1.detail-title')
+        title_paper = title_elem.get_text(strip=True) if title_elem else "Không có tiêu đề"
+
+        content_elems = soup.select('div.detail-content p')
+        content_paper = " ".join([p.get_text(strip=True) for p in content_elems if p])
+
+        keyword_elems = soup.select('div.detail-tab > a')
+        keyword_paper = ",".join([a.get_text(strip=True) for a in keyword_elems if a])
+
+        return [self.source, article_url, category_name, keyword_paper, time_paper, title_paper, content_paper]
+
+    def menu_categories(self, soup):
+        return [(cat.get_text(strip=True), f"{self.base_url}{cat['href']}") for cat in soup.select('ul.menu-nav > li > a')]
+
+    # Thời gian xuất bản nằm sẵn trong hậu tố URL
+    def listing_time(self, item):
+        return parse_tuoitre_href_time(item['href'], vn_timezone)
+
+    # Endpoint timeline ("xem thêm") theo zone id của danh mục
+    def listing_page_url(self, category_url):
+        # Zone id của danh mục không đổi nên trang danh mục được dùng lại từ cache trong MENU_TTL
+        zone_id = extract_tuoitre_zone_id(fetch_html(category_url, max_age=MENU_TTL))
+        if not zone_id:
+            print(f"Không tìm thấy zone id của {category_url}, chuyển sang cuộn trang.")
+            return None
+        return lambda page: tuoitre_timeline_url(zone_id, page)
+
+
+class ZNewsAdapter(SiteAdapter):
+    name = 'znews'
+    source = 'ZNews'
+    base_url = 'https://znews.vn'
+    csv_file = 'dataset_paper_znews.csv'
+    feeds = ZNEWS_FEEDS
+    page_load_timeout = 180
+
+    listing_item_selector = 'div.article-list > article.article-item'
+    listing_ready_selector = 'div.article-list'
+
+    menu_ready_selector = 'div.page-wrapper'
+    excluded_categories = (
+        'Xuất bản',
+        'Tác giả',
+        'Thế giới sách',
+        'Cuốn sách tôi đọc',
+        'Nghiên cứu xuất bản',
+    )
+
+    # Danh mục được đọc từ trang bài viết (sitemap không có danh mục)
+    def parse_article(self, html, article_url, category_name):
+        soup = parse_html(html)
+
+        category_name_elem = soup.select_one('header.the-article-header > p.the-article-category > a')
+        category_name = category_name_elem.get_text(strip=True) if category_name_elem else "N/A"
+
+        time_elem = soup.select_one('header.the-article-header > ul.the-article-meta > li.the-article-publish')
+        time_paper = time_elem.get_text(strip=True) if time_elem else "N/A"
+
+        title_elem = soup.select_one('header.the-article-header > h1.the-article-title')
+        title_paper = title_elem.get_text(strip=True) if title_elem else "Không có tiêu đề"
+
+        content_elems = soup.select('div.the-article-body p')
+        content_paper = " ".join([p.get_text(strip=True) for p in content_elems if p])
+
+        return [self.source, article_url, category_name, 'Null', time_paper, title_paper, content_paper]
+
+    # Menu đầy đủ chỉ hiện sau khi bấm nút "More"
+    def open_menu(self, pooled):
+        pooled.get(self.base_url)
+        driver = pooled.driver
+        wait_for_element(driver, By.CSS_SELECTOR, self.menu_ready_selector, timeout=10)
+        try:
+            more_button = wait_for_element(driver, By.CSS_SELECTOR, 'li.more')
+            if more_button:
+                more_button.click()
+                wait_for_element(driver, By.CSS_SELECTOR, 'ul.normal-category', timeout=5)
+            else:
+                print("Không tìm thấy nút 'More'")
+        except Exception as e:
+            print(f"Lỗi khi click nút 'More': {e}")
+        return parse_html(driver.page_source)
+
+    def menu_categories(self, soup):
+        return [(cate.get_text(strip=True), f"{cate['href']}")
+                for cate in soup.select('div.page-wrapper > ul.normal-category > li > a')]
+
+    def item_href(self, item):
+        link = item.select_one('p.article-thumbnail > a')
+        return link['href'] if link else None
+
+    def listing_time(self, item):
+        date_elem = item.select_one('span.article-publish > span.date')
+        if not date_elem:
+            return None
+        date_text = date_elem.get_text(strip=True)
+        time_elem = item.select_one('span.article-publish > span.time')
+        if time_elem:
+            parsed = parse_vn_time(f"{time_elem.get_text(strip=True)} {date_text}")
+            if parsed:
+                return parsed
+        return datetime.strptime(date_text, "%d/%m/%Y").date()
+
+    def listing_page_url(self, category_url):
+        return lambda page: znews_page_url(category_url, page)
+
+
+class VNExpressAdapter(SiteAdapter):
+    name = 'vnexpress'
+    source = 'VN Express'
+    base_url = 'https://vnexpress.net'
+    csv_file = 'dataset_paper_vnexpress.csv'
+    append_output = True
+    feeds = VNEXPRESS_FEEDS
+    page_load_timeout = 180
+
+    listing_item_selector = 'div.list-news-subfolder > article.item-news, article.item-news'
+    listing_ready_selector = listing_item_selector
+    # Bài ghim đầu trang có thể cũ hơn khung giờ nên chỉ dừng khi cả trang đã cũ
+    stop_at_first_older = False
+    keep_unknown_time = True
+
+    menu_ready_selector = 'ul.parent > li'
+
+    def parse_article(self, html, article_url, category_name):
+        soup_detail_article = parse_html(html)
+
+        keyword_elems = soup_detail_article.select('.item-tag')
+
+        time_article = soup_detail_article.select_one('div.sidebar-1 > div.header-content > span.date, span.date')
+        title_article = soup_detail_article.select_one('div.sidebar-1 > h1.title-detail, h1.title-detail')
+        para_head_article = soup_detail_article.select_one('div.sidebar-1 > p.description, p.description')
+        para_main_article = soup_detail_article.select('div.sidebar-1 > article.fck_detail > p.Normal, article.fck_detail > p.Normal, p.Normal')
+
+        time_text = time_article.get_text(strip=True) if time_article else 'N/A'
+        title_text = title_article.get_text(strip=True) if title_article else 'N/A'
+        para_head_text = para_head_article.get_text(strip=True) if para_head_article else ''
+        para_main_text = " ".join([p.get_text(strip=True) for p in para_main_article]) if para_main_article else ''
+        keyword_paper = ",".join([a.get_text(strip=True) for a in keyword_elems])
+
+        full_content = f"{para_head_text} {para_main_text}".strip()
+
+        if not full_content:
+            print(f"Không tìm thấy nội dung cho bài viết: {article_url}")
+            return None
+
+        return [self.source, article_url, category_name, keyword_paper, time_text, title_text, full_content]
+
+    # Danh sách (tên, URL) của các danh mục con trong menu
+    def menu_categories(self, soup):
+        categories = []
+        for li in soup.select('ul.parent > li'):
+            for ul_tag in li.select('ul.sub'):
+                for sub_li in ul_tag.find_all('li'):
+                    a_tag = sub_li.select_one('a')
+                    if not a_tag:
+                        continue
+
+                    href_a_sub_li = a_tag.get("href", "")
+                    if not href_a_sub_li:
+                        continue
+
+                    name_category = a_tag.get_text(strip=True)
+                    if not href_a_sub_li.startswith('http'):
+                        href_a_sub_li = self.base_url + href_a_sub_li
+                    categories.append((name_category, href_a_sub_li))
+        return categories
+
+    def item_href(self, item):
+        href_article = item.select_one('h2.title-news > a, h3.title-news > a, a.title-news')
+        return super().item_href(href_article) if href_article else None
+
+    # Thuộc tính data-publishtime (Unix time)
+    def listing_time(self, item):
+        publish_time = item.get('data-publishtime')
+        if not publish_time or not str(publish_time).isdigit():
+            return None
+        return datetime.fromtimestamp(int(publish_time), vn_timezone)
+
+    # VNExpress phân trang bằng hậu tố -p{n}, số trang đọc từ thanh phân trang
+    def discover_category_browser(self, pooled, category, window):
+        name_category, href_a_sub_li = category
+        driver = pooled.driver
+        print(f"Đang truy cập danh mục: {name_category} ({href_a_sub_li})")
+        pooled.get(href_a_sub_li)
+        wait_for_element(driver, By.CSS_SELECTOR, self.listing_ready_selector, timeout=10)
+
+        soup_paper = parse_html(driver.page_source)
+
+        # Tìm phân trang
+        pagination_links = soup_paper.select('div.button-page a')
+        page_numbers = [int(link.text) for link in pagination_links if link.text.isdigit()]
+        last_page = max(page_numbers) if page_numbers else 1
+
+        print(f"Tìm thấy {last_page} trang cho danh mục: {name_category}")
+
+        found = set()
+        for page in range(1, last_page + 1):
+            page_url = f'{href_a_sub_li}-p{page}' if page > 1 else href_a_sub_li
+            try:
+                print(f"Đang xử lý trang {page}/{last_page}: {page_url}")
+
+                if page > 1:
+                    pooled.get(page_url)
+                    wait_for_element(driver, By.CSS_SELECTOR, self.listing_ready_selector, timeout=10)
+                    soup_paper = parse_html(driver.page_source)
+
+                data_paper = soup_paper.select(self.listing_item_selector)
+                if not data_paper:
+                    print(f"Không tìm thấy bài viết nào trong trang {page}")
+                    continue
+
+                # Khoảng nghỉ giữa các trang do rate_limiter quyết định trong pooled.get
+                if self.collect_listing(data_paper, found, name_category, window):
+                    break
+
+            except Exception as e:
+                print(f"Lỗi khi tải trang {page_url}: {e}")
+                continue
+
+        return found
+
+
+# Các trang báo có thể chạy, theo khóa trên dòng lệnh
+SITE_ADAPTERS = {
+    adapter.name: adapter
+    for adapter in (TuoiTreAdapter, ZNewsAdapter, VNExpressAdapter)
+}
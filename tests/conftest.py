@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Các module của repo nằm ở thư mục gốc (không đóng gói)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
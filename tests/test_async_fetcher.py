@@ -0,0 +1,71 @@
+import threading
+import time
+import types
+
+import pytest
+
+import async_fetcher
+from async_fetcher import fetch_all
+
+
+class FakeSite:
+    """Thay fetch_html: đếm số lần tải và số request đồng thời lớn nhất của mỗi host."""
+
+    def __init__(self, delay=0.01):
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.calls = []
+        self.active = {}
+        self.max_active = {}
+
+    def fetch_html(self, url, throttle=True):
+        host = async_fetcher.get_host(url)
+        with self.lock:
+            self.calls.append(url)
+            self.active[host] = self.active.get(host, 0) + 1
+            self.max_active[host] = max(self.max_active.get(host, 0), self.active[host])
+        time.sleep(self.delay)
+        with self.lock:
+            self.active[host] -= 1
+        return f'<html>{url}</html>'
+
+
+@pytest.fixture
+def site(monkeypatch):
+    site = FakeSite()
+    monkeypatch.setattr(async_fetcher, 'fetch_html', site.fetch_html)
+    monkeypatch.setattr(async_fetcher, 'get_limiter', lambda url: types.SimpleNamespace(reserve=lambda: 0))
+    return site
+
+
+def urls(host, count):
+    return [f'https://{host}/bai-{i}.html' for i in range(count)]
+
+
+def test_fetches_every_url_within_host_limits(site):
+    wanted = urls('tuoitre.vn', 40) + urls('znews.vn', 40)
+    results = dict(fetch_all(wanted, host_concurrency={'tuoitre.vn': 3, 'znews.vn': 2}))
+    assert results == {url: f'<html>{url}</html>' for url in wanted}
+    assert site.max_active == {'tuoitre.vn': 3, 'znews.vn': 2}
+
+
+def test_early_stop_cancels_fetching_and_joins_thread(site):
+    before = set(threading.enumerate())
+    items = fetch_all(urls('tuoitre.vn', 2000))
+    next(items)
+    items.close()
+
+    assert set(threading.enumerate()) <= before
+    calls = len(site.calls)
+    assert calls < 2000
+    time.sleep(0.1)
+    assert len(site.calls) == calls
+
+
+def test_slow_consumer_bounds_work_in_flight(site):
+    items = fetch_all(urls('tuoitre.vn', 2000), host_concurrency={'tuoitre.vn': 4})
+    next(items)
+    time.sleep(0.5)
+    # Kết quả chờ trong các queue có giới hạn, không tải trước toàn bộ danh sách
+    assert len(site.calls) < 4 * async_fetcher.FETCH_QUEUE_SIZE
+    items.close()
@@ -0,0 +1,116 @@
+import hashlib
+import random
+from datetime import date, datetime
+
+import pandas as pd
+
+import ConnectAndSave
+import topic_models
+from ConnectAndSave import analyze_category_keyword, period_params, run_topic_analysis
+from topic_models import TopicModel
+
+
+def test_empty_keywords_are_not_counted():
+    df = pd.DataFrame({
+        'Topic': [0, 0, 0, 0],
+        'category': ['Kinh tế', 'Kinh tế', '', 'Kinh tế'],
+        'keyword': ['', ' , ', 'giá xăng,', 'Giá xăng,xuất khẩu'],
+    })
+    info = analyze_category_keyword(df)[0]
+    assert info['top_category'] == 'Kinh tế'
+    assert info['top_keywords'] == ['giá xăng', 'xuất khẩu']
+    assert '' not in info['top_keywords']
+
+
+def test_topic_without_keywords_or_category():
+    df = pd.DataFrame({'Topic': [1, 1], 'category': ['', None], 'keyword': ['', None]})
+    assert analyze_category_keyword(df)[1] == {'top_category': 'Unknown', 'top_keywords': []}
+
+
+class FakeConnection:
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class FakePaperTable:
+    """Bảng paper trong bộ nhớ thay cho các hàm đọc / ghi Postgres của run_topic_analysis."""
+
+    def __init__(self, monkeypatch, tmp_path):
+        rng = random.Random(0)
+        words = [f'tu{i}' for i in range(40)]
+        self.rows = {
+            paper_id: (datetime(2025, 1, 1 + paper_id % 28, 8), ' '.join(rng.choices(words, k=30)))
+            for paper_id in range(1, 31)
+        }
+        self.cache = {}
+        self.written = []
+        self.fits = []
+        monkeypatch.setattr(topic_models, 'TOPIC_MODEL_DIR', str(tmp_path))
+        monkeypatch.setattr(ConnectAndSave.psycopg2, 'connect', lambda **kwargs: FakeConnection())
+        monkeypatch.setattr(ConnectAndSave, 'period_fingerprint', self.period_fingerprint)
+        monkeypatch.setattr(ConnectAndSave, 'cached_fingerprints',
+                            lambda connection, keys: {key: self.cache[key] for key in keys if key in self.cache})
+        monkeypatch.setattr(ConnectAndSave, 'load_topic_window', self.load_topic_window)
+        monkeypatch.setattr(ConnectAndSave, 'write_topic_results', self.write_topic_results)
+        for method in ('fit', 'partial_fit'):
+            original = getattr(TopicModel, method)
+            monkeypatch.setattr(TopicModel, method, self.spy(method, original))
+
+    def spy(self, method, original):
+        def wrapper(model, X, *args):
+            self.fits.append((method, X.shape[0]))
+            return original(model, X, *args)
+        return wrapper
+
+    def in_period(self, period, max_id=None):
+        start, end = (datetime.strptime(value, '%Y-%m-%d %H:%M:%S') for value in period_params(period))
+        return sorted(paper_id for paper_id, (time, _) in self.rows.items()
+                      if start <= time <= end and (max_id is None or paper_id <= max_id))
+
+    def period_fingerprint(self, connection, period, max_id=None):
+        ids = self.in_period(period, max_id)
+        digest = hashlib.md5(''.join(self.rows[paper_id][1] for paper_id in ids).encode()).hexdigest()
+        return len(ids), f"{len(ids)}:{max(ids, default=0)}:{digest}"
+
+    def load_topic_window(self, connection, start, end, after_id=0):
+        df = pd.DataFrame(
+            [(paper_id, time, tokens) for paper_id, (time, tokens) in sorted(self.rows.items())
+             if start <= time.date() <= end and paper_id > after_id],
+            columns=['id', 'time', 'tokens'],
+        )
+        return df.sort_values('time', kind='stable').reset_index(drop=True)
+
+    def write_topic_results(self, connection, period, model, paper_ids, doc_topics, fingerprint):
+        self.written.append(sorted(int(paper_id) for paper_id in paper_ids))
+        self.cache[period.cache_key] = fingerprint
+
+
+def test_topic_model_refits_when_learned_paper_changes(monkeypatch, tmp_path):
+    papers = FakePaperTable(monkeypatch, tmp_path)
+    day = date(2025, 1, 20)
+
+    run_topic_analysis(['month'], day)
+    assert papers.fits == [('fit', 30)]
+
+    # Chỉ thêm bài mới: gộp bằng partial_fit
+    papers.rows[31] = (datetime(2025, 1, 19, 8), papers.rows[1][1])
+    run_topic_analysis(['month'], day)
+    assert papers.fits[-1] == ('partial_fit', 1)
+    assert papers.written[-1] == [31]
+
+    # Bài đã học được upsert lại (cùng id, tokens khác) cùng lúc có bài mới: phải fit lại cả kỳ
+    papers.rows[5] = (papers.rows[5][0], papers.rows[6][1])
+    papers.rows[32] = (datetime(2025, 1, 19, 9), papers.rows[2][1])
+    run_topic_analysis(['month'], day)
+    assert papers.fits[-1] == ('fit', 32)
+    assert papers.written[-1] == list(range(1, 33))
+
+    # Không đổi gì thì bỏ qua
+    run_topic_analysis(['month'], day)
+    assert len(papers.fits) == 3
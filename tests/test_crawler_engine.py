@@ -0,0 +1,39 @@
+import crawler_engine
+from crawler_engine import CrawlEngine, CrawlJob, yesterday_window
+from crawl_frontier import FEED_PRIORITY, CATEGORY_PRIORITY
+
+
+class MenuAdapter:
+    """Trang báo giả: có cả feed lẫn menu danh mục."""
+
+    name = 'fake'
+    source = 'Fake'
+    feeds = [('Tin mới', 'https://example.vn/rss/tin-moi.rss')]
+
+    def list_categories_http(self):
+        return [('Thời sự', 'https://example.vn/thoi-su.htm')]
+
+    def discover_category(self, acquire_driver, category, window):
+        return [f'{category[1][:-len(".htm")]}/bai-1.html']
+
+
+def discover(monkeypatch, tmp_path, *args):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(crawler_engine, 'discover_feed_articles',
+                        lambda feeds, start, end, tz: {'Tin mới': ['https://example.vn/bai-feed.html']})
+    engine = CrawlEngine(pool_size=1, seen_store=set())
+    return list(engine.discover(CrawlJob(MenuAdapter(), yesterday_window(), *args)))
+
+
+# Mặc định giữ tên danh mục trên menu cho cột Category
+def test_default_discovery_uses_menu_categories(monkeypatch, tmp_path):
+    assert crawler_engine.DISCOVERY_MODE == 'categories'
+    assert discover(monkeypatch, tmp_path) == [
+        ('Thời sự', ['https://example.vn/thoi-su/bai-1.html'], CATEGORY_PRIORITY),
+    ]
+
+
+def test_feed_discovery_is_opt_in(monkeypatch, tmp_path):
+    assert discover(monkeypatch, tmp_path, 'feeds') == [
+        ('Tin mới', ['https://example.vn/bai-feed.html'], FEED_PRIORITY),
+    ]
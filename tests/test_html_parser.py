@@ -0,0 +1,85 @@
+import glob
+import os
+
+import pytest
+
+import html_parser
+from html_parser import parse_html, HAS_LXML
+from replay_server import FixtureSet, FIXTURE_DIR, fixture_key
+from site_adapters import SITE_ADAPTERS
+
+ARTICLE_DIR = os.path.join(os.path.dirname(__file__), 'fixtures', 'articles')
+URL = 'https://example.vn/bai-viet.html'
+
+needs_lxml = pytest.mark.skipif(not HAS_LXML, reason="chưa cài lxml/cssselect")
+
+
+# Tên file fixture: <trang báo>_<trường hợp>.html
+def article_fixtures(pattern='*'):
+    paths = sorted(glob.glob(os.path.join(ARTICLE_DIR, f'{pattern}.html')))
+    return [pytest.param(path, id=os.path.basename(path)[:-len('.html')]) for path in paths]
+
+
+def parse_row(path, engine, monkeypatch):
+    site = os.path.basename(path).split('_', 1)[0]
+    with open(path, encoding='utf-8') as f:
+        html = f.read()
+    monkeypatch.setattr(html_parser, 'HTML_PARSER', engine)
+    return SITE_ADAPTERS[site]().parse_article(html, URL, 'Danh mục')
+
+
+# Bài trong fixture ghi từ lần crawl thật (python BenchmarkCrawler.py --record), nếu có
+def recorded_articles():
+    if not os.path.exists(os.path.join(FIXTURE_DIR, 'manifest.json')):
+        return []
+    fixtures = FixtureSet.load(FIXTURE_DIR)
+    params = []
+    for site, adapter in SITE_ADAPTERS.items():
+        prefix = fixture_key(adapter.base_url)
+        for key, (body, content_type) in sorted(fixtures.pages.items()):
+            if key.startswith(prefix) and 'html' in content_type:
+                params.append(pytest.param(site, key, body, id=key))
+    return params
+
+
+def test_default_engine_is_bs4():
+    assert html_parser.HTML_PARSER == 'bs4'
+    assert type(parse_html('<p>x</p>')).__module__.startswith('bs4')
+
+
+@needs_lxml
+@pytest.mark.parametrize('path', article_fixtures('*_wellformed'))
+def test_engines_agree_on_wellformed_articles(path, monkeypatch):
+    assert parse_row(path, 'lxml', monkeypatch) == parse_row(path, 'bs4', monkeypatch)
+
+
+@pytest.mark.parametrize('path', [p for p in article_fixtures() if not p.id.endswith('_wellformed')])
+def test_default_engine_keeps_text_around_blocks_in_paragraphs(path, monkeypatch):
+    monkeypatch.delenv('HTML_PARSER', raising=False)
+    row = parse_row(path, html_parser.HTML_PARSER, monkeypatch)
+    content = row[6]
+    expected = {
+        'tuoitre_block_in_paragraph': ['thông xe', 'Cầu nhìn từ trên cao', 'sau hai năm thi công'],
+        'znews_nested_paragraph': ['kéo dài hơn hai giờ', 'khiến nhiều tuyến đường ngập sâu'],
+        'vnexpress_nested_normal': ['Sở Giáo dục thông báo', 'các trường ven biển nghỉ học'],
+    }[os.path.basename(path)[:-len('.html')]]
+    for text in expected:
+        assert text in content
+
+
+# lxml tự đóng <p> trước thẻ khối: chính là lý do lxml chưa thể là mặc định
+@needs_lxml
+@pytest.mark.parametrize('path', [p for p in article_fixtures() if not p.id.endswith('_wellformed')])
+def test_lxml_differs_on_malformed_paragraphs(path, monkeypatch):
+    assert parse_row(path, 'lxml', monkeypatch) != parse_row(path, 'bs4', monkeypatch)
+
+
+@needs_lxml
+@pytest.mark.parametrize('site, key, body', recorded_articles())
+def test_engines_agree_on_recorded_articles(site, key, body, monkeypatch):
+    html = body.decode('utf-8', errors='replace')
+    adapter = SITE_ADAPTERS[site]()
+    monkeypatch.setattr(html_parser, 'HTML_PARSER', 'lxml')
+    lxml_row = adapter.parse_article(html, key, 'Danh mục')
+    monkeypatch.setattr(html_parser, 'HTML_PARSER', 'bs4')
+    assert lxml_row == adapter.parse_article(html, key, 'Danh mục')
@@ -0,0 +1,35 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+import http_fetcher
+
+
+def test_get_session_creates_one_session_across_threads(monkeypatch):
+    created = []
+
+    class SlowSession(requests.Session):
+        # Tạo session chậm để các luồng cùng lọt vào nhánh khởi tạo nếu không có khóa
+        def __init__(self):
+            time.sleep(0.05)
+            super().__init__()
+            created.append(self)
+
+    monkeypatch.setattr(http_fetcher, '_session', None)
+    monkeypatch.setattr(http_fetcher.requests, 'Session', SlowSession)
+    barrier = threading.Barrier(16)
+
+    def call():
+        barrier.wait()
+        return http_fetcher.get_session()
+
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        sessions = list(executor.map(lambda _: call(), range(16)))
+    try:
+        assert len(created) == 1
+        assert all(session is created[0] for session in sessions)
+    finally:
+        http_fetcher.close_session()
+    assert http_fetcher._session is None
@@ -0,0 +1,120 @@
+import csv
+import time
+
+import pytest
+
+from crawler_engine import CrawlEngine
+from output_sink import OutputSink, CsvFileWriter, CSV_HEADER
+from seen_store import SeenUrlStore
+
+
+def row(i):
+    return ['Tuổi Trẻ', f'https://tuoitre.vn/bai-{i}.htm', 'Thời sự', 'a,b', '2025-01-01 08:00:00', f'Tiêu đề {i}',
+            f'Nội dung {i}, có dấu phẩy\nvà xuống dòng']
+
+
+def read_csv(path):
+    with open(path, encoding='utf-8-sig', newline='') as f:
+        return list(csv.reader(f))
+
+
+def write_csv(path, rows):
+    with open(path, 'w', encoding='utf-8-sig', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(CSV_HEADER)
+        writer.writerows(rows)
+
+
+@pytest.fixture
+def csv_file(tmp_path):
+    return str(tmp_path / 'dataset_paper_tuoitre.csv')
+
+
+def test_batch_flush_writes_full_batches_only(csv_file):
+    flushed = []
+    sink = OutputSink('tuoitre', csv_file, formats=['csv'], batch_size=3, flush_interval=3600)
+    sink.on_flush(flushed.append)
+    for i in range(4):
+        sink.write(row(i))
+    assert flushed == [[row(0), row(1), row(2)]]
+    assert read_csv(f'{csv_file}.tmp') == [CSV_HEADER, row(0), row(1), row(2)]
+
+    sink.close()
+    assert flushed[-1] == [row(3)]
+    assert read_csv(csv_file) == [CSV_HEADER] + [row(i) for i in range(4)]
+
+
+def test_interval_flush_writes_old_rows_in_background(csv_file):
+    flushed = []
+    sink = OutputSink('tuoitre', csv_file, formats=['csv'], batch_size=100, flush_interval=0)
+    sink.on_flush(flushed.append)
+    sink.write(row(0))
+    deadline = time.monotonic() + 5
+    while not flushed and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert flushed == [[row(0)]]
+    sink.close()
+    assert read_csv(csv_file) == [CSV_HEADER, row(0)]
+
+
+def test_crash_recovery_keeps_complete_rows_from_tmp(csv_file):
+    write_csv(f'{csv_file}.tmp', [row(0), row(1)])
+    with open(f'{csv_file}.tmp', 'a', encoding='utf-8') as f:
+        f.write('Tuổi Trẻ,https://tuoitre.vn/ghi-do')  # Dòng ghi dở lúc crash
+
+    sink = OutputSink('tuoitre', csv_file, formats=['csv'])
+    sink.write(row(2))
+    sink.close()
+    assert read_csv(csv_file) == [CSV_HEADER, row(0), row(1), row(2)]
+
+
+def test_append_stages_only_new_rows(csv_file):
+    write_csv(csv_file, [row(0), row(1)])
+    sink = OutputSink('tuoitre', csv_file, append=True, formats=['csv'], batch_size=1)
+    sink.write(row(2))
+    # File tạm chỉ chứa dòng mới, không chép lại các dòng cũ
+    assert read_csv(f'{csv_file}.tmp') == [CSV_HEADER, row(2)]
+    sink.close()
+    assert read_csv(csv_file) == [CSV_HEADER, row(0), row(1), row(2)]
+
+
+def test_append_interrupted_midway_is_redone_once(csv_file, monkeypatch):
+    write_csv(csv_file, [row(0)])
+    writer = CsvFileWriter(csv_file, append=True)
+    writer.write_batch([row(1), row(2)])
+
+    # Crash sau khi đã nối được một phần dòng vào file thật (file tạm và .commit còn nguyên)
+    def crash(staged, target):
+        target.write(staged.read(20))
+        raise KeyboardInterrupt
+    monkeypatch.setattr('output_sink.shutil.copyfileobj', crash)
+    with pytest.raises(KeyboardInterrupt):
+        writer.close()
+    monkeypatch.undo()
+
+    sink = OutputSink('tuoitre', csv_file, append=True, formats=['csv'])
+    sink.write(row(3))
+    sink.close()
+    assert read_csv(csv_file) == [CSV_HEADER, row(0), row(1), row(2), row(3)]
+
+
+class CsvAdapter:
+    name = 'tuoitre'
+    source = 'Tuổi Trẻ'
+    append_output = True
+
+    def __init__(self, csv_file):
+        self.csv_file = csv_file
+
+
+def test_seen_store_is_updated_only_after_flush(csv_file, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    store = SeenUrlStore(str(tmp_path / 'seen.db'))
+    engine = CrawlEngine(pool_size=1, seen_store=store, output_formats=['csv'])
+    output = engine.get_output(CsvAdapter(csv_file))
+    output.write(row(0))
+    assert row(0)[1] not in store
+    output.flush()
+    assert row(0)[1] in store
+    output.close()
+    store.close()
@@ -0,0 +1,139 @@
+import types
+
+import pytest
+
+import work_queue
+from work_queue import CrawlTask, SqliteWorkQueue, RedisWorkQueue, SharedSeenStore
+
+WINDOW = ('2025-01-01T00:00:00+07:00', '2025-01-01T02:59:59+07:00', '2025-01-01T01:00:00+07:00')
+
+
+class Clock:
+    """Đồng hồ giả cho work_queue: lease hết hạn bằng cách tua giờ thay vì sleep."""
+
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(work_queue, 'time', types.SimpleNamespace(time=clock.time))
+    return clock
+
+
+@pytest.fixture(params=['sqlite', 'redis'])
+def queue(request, tmp_path, monkeypatch, clock):
+    if request.param == 'sqlite':
+        queue = SqliteWorkQueue(str(tmp_path / 'queue.db'), lease_seconds=300, max_attempts=2)
+    else:
+        # Chạy đúng các script Lua của RedisWorkQueue trên fakeredis (cần lupa)
+        fakeredis = pytest.importorskip('fakeredis')
+        pytest.importorskip('lupa')
+        server = fakeredis.FakeServer()
+        monkeypatch.setattr(work_queue.redis.Redis, 'from_url',
+                            lambda url, **kwargs: fakeredis.FakeRedis(server=server, **kwargs))
+        queue = RedisWorkQueue('redis://localhost:6379/0', lease_seconds=300, max_attempts=2)
+    yield queue
+    queue.close()
+
+
+def tasks(*names, priority=1):
+    return [CrawlTask(f'https://example.vn/{name}.html', 'tuoitre', 'Thời sự', WINDOW, priority) for name in names]
+
+
+def urls(task_list):
+    return [task.url for task in task_list]
+
+
+def test_enqueue_skips_known_urls(queue):
+    assert queue.enqueue(tasks('a', 'b')) == 2
+    assert queue.enqueue(tasks('b', 'c')) == 1
+    assert urls(queue.claim('w1', 10)) == urls(tasks('a', 'b', 'c'))
+
+
+def test_claim_orders_by_priority_and_keeps_payload(queue):
+    queue.enqueue(tasks('category', priority=2))
+    queue.enqueue(tasks('feed', priority=1))
+    claimed = queue.claim('w1', 10)
+    assert urls(claimed) == urls(tasks('feed', 'category'))
+    assert claimed[0].category == 'Thời sự' and claimed[0].window == WINDOW and claimed[0].priority == 1
+
+
+def test_lease_owner_ack(queue):
+    queue.enqueue(tasks('a', 'b'))
+    claimed = urls(queue.claim('w1', 10))
+    assert queue.claim('w2', 10) == []
+    assert queue.owned('w1', claimed) == set(claimed)
+    assert queue.owned('w2', claimed) == set()
+
+    # Worker không giữ lease thì ack không có tác dụng
+    assert queue.ack('w2', [(url, 'written') for url in claimed]) == 0
+    assert queue.ack('w1', [(claimed[0], 'written'), (claimed[1], 'skipped')]) == 2
+    assert queue.owned('w1', claimed) == set()
+    assert queue.ack('w1', [(claimed[0], 'written')]) == 0
+    assert queue.stats()['done'] == 2
+    # Bài đã xong không được thêm lại
+    assert queue.enqueue(tasks('a')) == 0
+
+
+def test_expired_lease_is_reclaimed_by_another_worker(queue, clock):
+    queue.enqueue(tasks('a'))
+    [url] = urls(queue.claim('w1', 10))
+
+    # Gần hết lease: không đủ LEASE_MARGIN để ghi nữa
+    clock.now += 300 - work_queue.LEASE_MARGIN + 1
+    assert queue.owned('w1', [url]) == set()
+
+    clock.now += work_queue.LEASE_MARGIN
+    assert urls(queue.claim('w2', 10)) == [url]
+    # Worker cũ quay lại sau khi bài đã được giao lại: không ack, không trả bài được
+    assert queue.ack('w1', [(url, 'written')]) == 0
+    queue.release('w1', [url])
+    assert queue.owned('w2', [url]) == {url}
+    assert queue.ack('w2', [(url, 'written')]) == 1
+
+
+def test_release_requeues_in_original_order_then_dead(queue, clock):
+    queue.enqueue(tasks('a', 'b'))
+    claimed = urls(queue.claim('w1', 10))
+    queue.release('w1', [claimed[1]])
+    queue.release('w1', [claimed[0]])
+    assert urls(queue.claim('w2', 10)) == claimed
+
+    # Lần giao thứ hai (max_attempts=2) hết lease thì bài chuyển sang dead
+    clock.now += 301
+    assert queue.claim('w3', 10) == []
+    assert queue.stats()['dead'] == 2
+
+
+def test_prune_forgets_old_done_tasks(queue, clock):
+    queue.enqueue(tasks('a'))
+    [url] = urls(queue.claim('w1', 10))
+    queue.ack('w1', [(url, 'written')])
+    assert queue.prune() == 0
+    clock.now += work_queue.PRUNE_AFTER_DAYS * 86400 + 1
+    assert queue.prune() == 1
+    assert queue.enqueue(tasks('a')) == 1
+
+
+def test_shared_seen_store(queue, tmp_path, clock):
+    store = SharedSeenStore(queue)
+    url = tasks('a')[0].url
+    assert url not in store
+    store.add_many([url], 'Tuổi Trẻ')
+    assert url in store
+
+    # prune() chỉ xóa bài khỏi hàng đợi, kho URL đã ghi vẫn giữ
+    clock.now += work_queue.PRUNE_AFTER_DAYS * 86400 + 1
+    queue.prune()
+    assert url in SharedSeenStore(queue)
+
+    csv_file = tmp_path / 'dataset.csv'
+    csv_file.write_text('Title,URL\nBài b,https://example.vn/b.html\n', encoding='utf-8-sig')
+    assert store.seed_from_csv(str(csv_file)) == 1
+    assert 'https://example.vn/b.html' in store
+    assert store.seed_from_csv(str(csv_file)) == 0
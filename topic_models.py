@@ -0,0 +1,140 @@
+import os
+import joblib
+import numpy as np
+from scipy import sparse
+from sklearn.feature_extraction.text import CountVectorizer
+from sklearn.decomposition import LatentDirichletAllocation
+
+# Mô hình LDA của từng kỳ (tháng / tuần / quý / năm) được lưu lại để lần sau chỉ cập nhật bằng bài mới
+TOPIC_MODEL_DIR = os.getenv('TOPIC_MODEL_DIR', 'topic_models')
+MAX_FEATURES = 2000
+# Fit lại từ đầu khi lô bài mới có quá nhiều từ ngoài bộ từ vựng đã chốt (chủ đề mới nổi lên)...
+REFIT_OOV_RATIO = float(os.getenv('TOPIC_REFIT_OOV_RATIO', 0.3))
+# ...hoặc khi lô bài mới nhiều hơn số bài mô hình đã học (đầu kỳ, fit lại vẫn rẻ)
+REFIT_GROWTH = 1.0
+
+
+class DocumentTermMatrix:
+    """
+    Ma trận bài x từ (mọi từ, không giới hạn) của một lần đọc bài: vectorize một lần rồi dùng chung
+    cho mọi mô hình, mỗi mô hình lấy các dòng thuộc kỳ của mình và chiếu lên bộ từ vựng riêng.
+    """
+
+    def __init__(self, tokens):
+        vectorizer = CountVectorizer()
+        try:
+            self.X = vectorizer.fit_transform(tokens).tocsr()
+            self.terms = vectorizer.get_feature_names_out()
+            self.term_index = vectorizer.vocabulary_
+        except ValueError:  # Không có bài nào / không bài nào có từ
+            self.X = sparse.csr_matrix((len(tokens), 0))
+            self.terms = np.array([], dtype=object)
+            self.term_index = {}
+        # Tổng số từ của mỗi bài theo chính analyzer của CountVectorizer (tổng dòng của ma trận không giới hạn),
+        # cùng cách đếm với phần chiếu lên bộ từ vựng khi tính tỉ lệ từ ngoài bộ từ vựng
+        self.token_counts = np.asarray(self.X.sum(axis=1)).ravel()
+
+    # 🛠 Hàm chọn max_features từ xuất hiện nhiều nhất trong các dòng rows (như CountVectorizer(max_features))
+    def top_terms(self, rows, max_features=MAX_FEATURES):
+        counts = np.asarray(self.X[rows].sum(axis=0)).ravel()
+        top = np.argsort(-counts, kind='stable')[:max_features]
+        return sorted(self.terms[top[counts[top] > 0]].tolist())
+
+    # 🛠 Hàm lấy các dòng rows với cột theo thứ tự của vocabulary (từ không có trong ma trận thì cột toàn 0)
+    def project(self, rows, vocabulary):
+        pairs = [(self.term_index[term], column) for column, term in enumerate(vocabulary) if term in self.term_index]
+        mapping = sparse.csr_matrix(
+            (np.ones(len(pairs)), ([source for source, _ in pairs], [column for _, column in pairs])),
+            shape=(len(self.terms), len(vocabulary)),
+        )
+        return (self.X[rows] @ mapping).tocsr()
+
+
+class TopicModel:
+    """
+    LDA của một kỳ với bộ từ vựng cố định: lần đầu (hoặc khi cần) fit trên toàn bộ bài của kỳ,
+    các lần sau gộp bài mới vào bằng partial_fit (online variational Bayes) thay vì fit lại.
+    last_paper_id: id lớn nhất trong bảng paper đã được đưa vào mô hình.
+    seen_fingerprint: dấu vân tay các bài id <= last_paper_id của kỳ lúc học (ConnectAndSave.period_fingerprint),
+    khác đi nghĩa là bài đã học bị sửa / xóa và phải fit lại.
+    """
+
+    def __init__(self, key, num_topics):
+        self.key = key
+        self.num_topics = num_topics
+        self.vocabulary = None
+        self.lda = None
+        self.n_docs = 0
+        self.last_paper_id = 0
+        self.seen_fingerprint = None
+
+    @property
+    def path(self):
+        return os.path.join(TOPIC_MODEL_DIR, f"{self.key}.joblib")
+
+    # Mô hình đã lưu dùng tiếp được (cùng số chủ đề)
+    @property
+    def usable(self):
+        return self.lda is not None and self.lda.n_components == self.num_topics
+
+    @classmethod
+    def load(cls, key, num_topics):
+        model = cls(key, num_topics)
+        if os.path.exists(model.path):
+            try:
+                state = joblib.load(model.path)
+                model.vocabulary = state['vocabulary']
+                model.lda = state['lda']
+                model.n_docs = state['n_docs']
+                model.last_paper_id = state['last_paper_id']
+                # Mô hình lưu trước khi có trường này: không biết bài cũ có đổi không, sẽ fit lại một lần
+                model.seen_fingerprint = state.get('seen_fingerprint')
+            except Exception as e:
+                print(f"Không đọc được mô hình chủ đề {model.path}, sẽ fit lại: {e}")
+        return model
+
+    def save(self):
+        os.makedirs(TOPIC_MODEL_DIR, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        joblib.dump({
+            'vocabulary': self.vocabulary, 'lda': self.lda,
+            'n_docs': self.n_docs, 'last_paper_id': self.last_paper_id,
+            'seen_fingerprint': self.seen_fingerprint,
+        }, tmp_path)
+        os.replace(tmp_path, self.path)
+
+    # 🛠 Hàm quyết định có cần fit lại từ đầu với lô bài mới (các dòng new_rows của dtm) hay không
+    def needs_refit(self, dtm, new_rows):
+        if not self.usable:
+            return True
+        if len(new_rows) > REFIT_GROWTH * self.n_docs:
+            return True
+        total = dtm.token_counts[new_rows].sum()
+        known = dtm.project(new_rows, self.vocabulary).sum()
+        return total > 0 and 1 - known / total > REFIT_OOV_RATIO
+
+    # 🛠 Hàm fit lại từ đầu trên ma trận X của toàn bộ bài trong kỳ (cột theo vocabulary), trả về ma trận bài x chủ đề
+    def fit(self, X, vocabulary, last_paper_id):
+        self.vocabulary = vocabulary
+        self.lda = LatentDirichletAllocation(n_components=self.num_topics, random_state=42)
+        doc_topics = self.lda.fit_transform(X)
+        self.n_docs = X.shape[0]
+        self.last_paper_id = last_paper_id
+        return doc_topics
+
+    # 🛠 Hàm gộp lô bài mới (ma trận X theo self.vocabulary) vào mô hình đã có, trả về ma trận bài x chủ đề của lô đó
+    def partial_fit(self, X, last_paper_id):
+        self.n_docs += X.shape[0]
+        # Bước cập nhật online coi lô mới là một phần của toàn bộ n_docs bài của kỳ
+        self.lda.total_samples = self.n_docs
+        self.lda.partial_fit(X)
+        self.last_paper_id = last_paper_id
+        return self.lda.transform(X)
+
+    # 🛠 Hàm lấy top_n từ khóa của từng chủ đề: [(chỉ số chủ đề, [(từ, % trọng số), ...]), ...]
+    def top_words(self, top_n=10):
+        return [
+            (topic_idx, [(self.vocabulary[i], round(float(topic[i] * 100 / topic.sum()), 1))
+                         for i in topic.argsort()[:-top_n - 1:-1]])
+            for topic_idx, topic in enumerate(self.lda.components_)
+        ]
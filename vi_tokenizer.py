@@ -0,0 +1,104 @@
+import os
+import re
+import hashlib
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+import pandas as pd
+from pyvi import ViTokenizer
+
+# Cache kết quả tách từ theo hash nội dung bài: bài không đổi thì không tách từ lại (vd. khi nạp lại dữ liệu cũ)
+TOKEN_CACHE_DB = os.getenv('TOKEN_CACHE_DB', 'token_cache.db')
+# Số tiến trình tách từ (mặc định: số CPU) và số bài mỗi phần gửi cho một tiến trình
+TOKENIZE_WORKERS = int(os.getenv('TOKENIZE_WORKERS', os.cpu_count() or 1))
+TOKENIZE_CHUNK_SIZE = 200
+# Đổi khi đổi cách tách từ (pyvi, bước làm sạch) để bỏ các kết quả cũ trong cache
+TOKENIZER_VERSION = 'pyvi-1'
+
+_PUNCTUATION = re.compile(r'[^\w\s]')
+
+
+# 🛠 Hàm đọc danh sách stopword (đọc một lần cho mỗi file)
+@lru_cache(maxsize=None)
+def load_stopwords(path='vietnamese_stopwords.txt'):
+    try:
+        with open(path, mode='r', encoding='utf-8') as file:
+            return frozenset(line.strip() for line in file)
+    except FileNotFoundError:
+        print("Không tìm thấy file stopword.")
+        return frozenset()
+
+
+# 🛠 Hàm tách từ một phần các bài (chạy trong tiến trình con)
+def _tokenize_chunk(texts):
+    return [ViTokenizer.tokenize(_PUNCTUATION.sub('', text.lower())) for text in texts]
+
+
+def _text_key(text):
+    return hashlib.sha1(f"{TOKENIZER_VERSION}\n{text}".encode('utf-8')).hexdigest()
+
+
+class TokenCache:
+    """Cache SQLite: hash nội dung bài -> chuỗi đã tách từ (chưa bỏ stopword, để đổi stopword không phải tách lại)."""
+
+    def __init__(self, db_file=TOKEN_CACHE_DB):
+        self._conn = sqlite3.connect(db_file)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS tokens (key TEXT PRIMARY KEY, tokens TEXT) WITHOUT ROWID")
+        self._conn.commit()
+
+    def get_many(self, keys, batch_size=500):
+        found = {}
+        keys = list(keys)
+        for start in range(0, len(keys), batch_size):
+            batch = keys[start:start + batch_size]
+            found.update(self._conn.execute(
+                f"SELECT key, tokens FROM tokens WHERE key IN ({','.join('?' * len(batch))})", batch
+            ))
+        return found
+
+    def put_many(self, items):
+        self._conn.executemany("INSERT OR REPLACE INTO tokens (key, tokens) VALUES (?, ?)", items)
+        self._conn.commit()
+
+    def close(self):
+        self._conn.close()
+
+
+# 🛠 Hàm bỏ stopword trên cả cột (tách thành từng từ, lọc bằng isin rồi ghép lại theo dòng)
+def remove_stopwords(tokenized, stop_words):
+    words = tokenized.reset_index(drop=True).str.split().explode()
+    kept = words[~words.isin(stop_words)].dropna()
+    joined = kept.groupby(level=0).agg(' '.join).reindex(range(len(tokenized)), fill_value='')
+    return pd.Series(joined.to_numpy(), index=tokenized.index)
+
+
+# 🛠 Hàm tách từ cả cột văn bản: lấy từ cache nếu có, phần còn lại chia nhỏ chạy song song trên nhiều tiến trình
+def tokenize_series(texts, stopwords_file='vietnamese_stopwords.txt', workers=TOKENIZE_WORKERS,
+                    chunk_size=TOKENIZE_CHUNK_SIZE, cache_file=TOKEN_CACHE_DB):
+    if texts.empty:
+        return pd.Series([], index=texts.index, dtype=object)
+    texts = texts.fillna('').astype(str)
+    keys = texts.map(_text_key)
+    cache = TokenCache(cache_file)
+    try:
+        cached = cache.get_many(set(keys))
+        # Mỗi nội dung chưa có trong cache chỉ tách từ một lần (kể cả khi lặp lại trong cùng lần nạp)
+        missing = {key: text for key, text in zip(keys, texts) if key not in cached}
+        if missing:
+            print(f"Tách từ {len(missing)} bài ({len(cached)} bài lấy từ cache)...")
+            missing_keys = list(missing)
+            chunks = [[missing[key] for key in missing_keys[start:start + chunk_size]]
+                      for start in range(0, len(missing_keys), chunk_size)]
+            if workers > 1 and len(chunks) > 1:
+                with ProcessPoolExecutor(max_workers=min(workers, len(chunks))) as executor:
+                    results = [tokens for chunk in executor.map(_tokenize_chunk, chunks) for tokens in chunk]
+            else:
+                results = [tokens for chunk in chunks for tokens in _tokenize_chunk(chunk)]
+            computed = dict(zip(missing_keys, results))
+            cache.put_many(computed.items())
+            cached.update(computed)
+    finally:
+        cache.close()
+
+    return remove_stopwords(keys.map(cached), load_stopwords(stopwords_file))
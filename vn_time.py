@@ -0,0 +1,89 @@
+import re
+from datetime import datetime, timedelta
+from functools import lru_cache
+import numpy as np
+import pandas as pd
+import pytz
+
+vn_timezone = pytz.timezone('Asia/Ho_Chi_Minh')
+
+# Các dạng thời gian tuyệt đối đã gặp (ngày/tháng/năm giờ:phút), mỗi mẫu trả về các nhóm có tên:
+# - Tuổi Trẻ:  "23/11/2024 02:30 GMT+7", "Thứ bảy, 23/11/2024 02:30 GMT+7"
+# - VNExpress: "Thứ bảy, 23/11/2024, 02:30 (GMT+7)"
+# - ZNews:     "02:30 23/11/2024", "23/11/2024, 02:30"
+# - Đã chuẩn hóa (summary, DB): "2024-11-23 02:30:00"
+ABSOLUTE_PATTERNS = (
+    re.compile(r'(?P<day>\d{1,2})/(?P<month>\d{1,2})/(?P<year>\d{4}),?\s*(?P<hour>\d{1,2}):(?P<minute>\d{2})'),
+    re.compile(r'(?P<hour>\d{1,2}):(?P<minute>\d{2})\s+(?P<day>\d{1,2})/(?P<month>\d{1,2})/(?P<year>\d{4})'),
+    re.compile(r'(?P<year>\d{4})-(?P<month>\d{1,2})-(?P<day>\d{1,2})[ T](?P<hour>\d{1,2}):(?P<minute>\d{2})'),
+)
+# Các dạng tương đối của VNExpress (tính theo now): "2 giờ trước", "30 phút trước", "Hôm qua, 02:30"
+RELATIVE_PATTERN = re.compile(r'(\d+)\s*(giây|phút|giờ|ngày)\s*trước', re.IGNORECASE)
+DAY_PATTERN = re.compile(r'(hôm qua|hôm nay)\D*(\d{1,2}):(\d{2})', re.IGNORECASE)
+
+_UNITS = {'giây': 'seconds', 'phút': 'minutes', 'giờ': 'hours', 'ngày': 'days'}
+_PARTS = ['year', 'month', 'day', 'hour', 'minute']
+
+
+# 🛠 Hàm parse dạng tuyệt đối (có nhớ kết quả: cùng một chuỗi xuất hiện ở nhiều bài / nhiều bước)
+@lru_cache(maxsize=8192)
+def _parse_absolute(time_text):
+    for pattern in ABSOLUTE_PATTERNS:
+        match = pattern.search(time_text)
+        if match:
+            try:
+                # pytz phải localize: tzinfo=vn_timezone cho ra giờ địa phương cũ (+07:07)
+                return vn_timezone.localize(datetime(*(int(match.group(part)) for part in _PARTS)))
+            except ValueError:
+                return None
+    return None
+
+
+# 🛠 Hàm parse dạng tương đối theo now (datetime có timezone)
+def _parse_relative(time_text, now):
+    match = RELATIVE_PATTERN.search(time_text)
+    if match:
+        return now - timedelta(**{_UNITS[match.group(2).lower()]: int(match.group(1))})
+    match = DAY_PATTERN.search(time_text)
+    if match:
+        day = now - timedelta(days=1) if match.group(1).lower() == 'hôm qua' else now
+        return day.replace(hour=int(match.group(2)), minute=int(match.group(3)), second=0, microsecond=0)
+    return None
+
+
+# 🛠 Hàm parse một chuỗi thời gian của mọi trang báo, trả về datetime giờ Việt Nam (None nếu không đọc được)
+def parse_vn_time(time_text, now=None):
+    if not isinstance(time_text, str):
+        return None
+    time_text = time_text.strip()
+    parsed = _parse_absolute(time_text)
+    if parsed is None:
+        parsed = _parse_relative(time_text, now or datetime.now(vn_timezone))
+    return parsed
+
+
+# 🛠 Hàm parse cả cột thời gian (pandas Series), trả về datetime64 giờ Việt Nam không kèm timezone (NaT nếu không đọc được)
+def parse_vn_time_series(series, now=None):
+    # Nhiều bài cùng một chuỗi thời gian: chỉ parse mỗi chuỗi khác nhau một lần rồi trải lại theo mã
+    codes, uniques = pd.factorize(series.astype('string').str.strip())
+    text = pd.Series(uniques, dtype='string')
+    parsed = pd.Series(pd.NaT, index=text.index, dtype='datetime64[ns]')
+    for pattern in ABSOLUTE_PATTERNS:
+        missing = parsed.isna()
+        if not missing.any():
+            break
+        parts = text[missing].str.extract(pattern)[_PARTS].astype('float')
+        parsed[missing] = pd.to_datetime(parts, errors='coerce')
+
+    # Dạng tương đối ít gặp: parse từng chuỗi còn lại theo now
+    missing = parsed.isna()
+    if missing.any():
+        now = now or datetime.now(vn_timezone)
+        relative = [_parse_relative(value, now) for value in text[missing]]
+        parsed[missing] = pd.to_datetime(
+            [value.astimezone(vn_timezone).replace(tzinfo=None) if value else None for value in relative]
+        )
+
+    # Mã -1 (ô trống) lấy phần tử NaT thêm ở cuối
+    values = np.append(parsed.to_numpy(), np.datetime64('NaT', 'ns'))[codes]
+    return pd.Series(values, index=series.index, dtype='datetime64[ns]')
@@ -0,0 +1,465 @@
+import os
+import json
+import time
+import socket
+import sqlite3
+import threading
+from datetime import datetime
+from urllib.parse import urlparse
+
+from seen_store import read_csv_urls
+
+# redis là tùy chọn: chỉ cần khi hàng đợi dùng chung giữa nhiều máy (CRAWL_QUEUE=redis://...)
+try:
+    import redis
+except ImportError:
+    redis = None
+
+# Hàng đợi mặc định là file SQLite (nhiều tiến trình trên cùng máy / ổ dùng chung)
+CRAWL_QUEUE = os.getenv('CRAWL_QUEUE', 'sqlite:///crawl_queue.db')
+# Worker giữ bài trong khoảng này; quá hạn mà chưa ack (worker chết) thì bài được giao lại
+LEASE_SECONDS = 300
+# Bài được giao quá số lần này mà vẫn chưa xong thì chuyển sang trạng thái dead
+MAX_QUEUE_ATTEMPTS = 3
+# Worker chỉ ghi kết quả của bài khi lease còn ít nhất số giây này (đủ để flush và ack trước khi hết hạn),
+# để bài đã được giao lại cho worker khác không bị ghi hai lần
+LEASE_MARGIN = 60
+# Bài đã xong / dead được giữ trong hàng đợi số ngày này để không bị thêm lại, sau đó mới xóa
+# (kho URL đã ghi dùng chung thì giữ mãi, không bị xóa)
+PRUNE_AFTER_DAYS = 7
+
+
+class CrawlTask:
+    """Một bài cần crawl trong hàng đợi: URL, trang báo, danh mục và khung giờ (start, end, now dạng ISO)."""
+
+    __slots__ = ('url', 'site', 'category', 'window', 'priority')
+
+    def __init__(self, url, site, category, window, priority=1):
+        self.url = url
+        self.site = site
+        self.category = category
+        self.window = tuple(window)
+        self.priority = priority
+
+    def to_json(self):
+        return json.dumps({'url': self.url, 'site': self.site, 'category': self.category,
+                           'window': self.window, 'priority': self.priority}, ensure_ascii=False)
+
+    @classmethod
+    def from_json(cls, text):
+        data = json.loads(text)
+        return cls(data['url'], data['site'], data['category'], data['window'], data.get('priority', 1))
+
+
+class SqliteWorkQueue:
+    """
+    Hàng đợi bài viết trong một file SQLite, dùng được từ nhiều tiến trình (khóa bằng BEGIN IMMEDIATE).
+    Mỗi URL chỉ có một dòng nên bài đã vào hàng đợi (hoặc đã xong) không bị thêm lại.
+    Giao bài theo kiểu lease: bài đã giao mà quá hạn chưa ack được giao cho worker khác.
+    Worker chỉ ghi kết quả của các bài owned() (còn giữ lease, chưa xong) và ack/release
+    chỉ có tác dụng với bài mình đang giữ, nên bài được giao lại không bị ghi hai lần.
+    Bảng seen_urls là kho URL đã ghi dùng chung cho mọi worker (xem SharedSeenStore).
+    """
+
+    def __init__(self, db_file='crawl_queue.db', lease_seconds=LEASE_SECONDS, max_attempts=MAX_QUEUE_ATTEMPTS):
+        self.db_file = db_file
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_file, timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS tasks (
+                url TEXT PRIMARY KEY,
+                payload TEXT,
+                priority INTEGER,
+                state TEXT,             -- queued / leased / done / dead
+                attempts INTEGER DEFAULT 0,
+                owner TEXT,
+                lease_until REAL,
+                result TEXT,
+                enqueued_at REAL,
+                updated_at REAL
+            ) WITHOUT ROWID
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS tasks_ready ON tasks (state, priority, enqueued_at)")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS seen_urls (
+                url TEXT PRIMARY KEY,
+                source TEXT,
+                first_seen TEXT
+            ) WITHOUT ROWID
+        """)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS imported_files (path TEXT PRIMARY KEY, imported_at TEXT)")
+
+    # 🛠 Hàm chạy một transaction ghi (khóa file ngay từ đầu để các tiến trình không giẫm lên nhau)
+    def _write(self, func):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = func(self._conn)
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+            return result
+
+    # 🛠 Hàm thêm bài vào hàng đợi, trả về số bài mới thực sự được thêm
+    def enqueue(self, tasks):
+        now = time.time()
+        rows = [(task.url, task.to_json(), task.priority, now, now) for task in tasks]
+
+        def _insert(conn):
+            before = conn.total_changes
+            conn.executemany(
+                "INSERT OR IGNORE INTO tasks (url, payload, priority, state, enqueued_at, updated_at) "
+                "VALUES (?, ?, ?, 'queued', ?, ?)", rows,
+            )
+            return conn.total_changes - before
+        return self._write(_insert)
+
+    # 🛠 Hàm nhận tối đa limit bài cho worker; bài có lease hết hạn được giao lại trước
+    def claim(self, worker_id, limit):
+        now = time.time()
+
+        def _claim(conn):
+            conn.execute(
+                "UPDATE tasks SET state = CASE WHEN attempts >= ? THEN 'dead' ELSE 'queued' END, "
+                "owner = NULL, updated_at = ? WHERE state = 'leased' AND lease_until < ?",
+                (self.max_attempts, now, now),
+            )
+            rows = conn.execute(
+                "SELECT url, payload FROM tasks WHERE state = 'queued' ORDER BY priority, enqueued_at LIMIT ?",
+                (limit,),
+            ).fetchall()
+            conn.executemany(
+                "UPDATE tasks SET state = 'leased', owner = ?, lease_until = ?, attempts = attempts + 1, "
+                "updated_at = ? WHERE url = ?",
+                [(worker_id, now + self.lease_seconds, now, url) for url, _ in rows],
+            )
+            return [CrawlTask.from_json(payload) for _, payload in rows]
+        return self._write(_claim)
+
+    # 🛠 Hàm lấy các URL mà worker còn giữ lease ít nhất margin giây (bài đã xong / đã giao lại thì không có)
+    def owned(self, worker_id, urls, margin=LEASE_MARGIN):
+        urls = list(urls)
+        deadline = time.time() + margin
+        found = set()
+        with self._lock:
+            for start in range(0, len(urls), 500):
+                batch = urls[start:start + 500]
+                found.update(url for (url,) in self._conn.execute(
+                    f"SELECT url FROM tasks WHERE url IN ({','.join('?' * len(batch))}) "
+                    "AND state = 'leased' AND owner = ? AND lease_until > ?",
+                    batch + [worker_id, deadline],
+                ))
+        return found
+
+    # 🛠 Hàm báo đã xử lý xong các bài (result: written / skipped / seen ...), trả về số bài được ack
+    def ack(self, worker_id, results):
+        """results: danh sách (url, kết quả). Bài worker không còn giữ lease thì bỏ qua."""
+        now = time.time()
+
+        def _ack(conn):
+            before = conn.total_changes
+            conn.executemany(
+                "UPDATE tasks SET state = 'done', result = ?, owner = NULL, updated_at = ? "
+                "WHERE url = ? AND state = 'leased' AND owner = ?",
+                [(result, now, url, worker_id) for url, result in results],
+            )
+            return conn.total_changes - before
+        return self._write(_ack)
+
+    # 🛠 Hàm trả lại các bài chưa xử lý được để worker khác thử lại (hoặc dead nếu đã thử đủ số lần)
+    def release(self, worker_id, urls):
+        now = time.time()
+        self._write(lambda conn: conn.executemany(
+            "UPDATE tasks SET state = CASE WHEN attempts >= ? THEN 'dead' ELSE 'queued' END, "
+            "owner = NULL, updated_at = ? WHERE url = ? AND state = 'leased' AND owner = ?",
+            [(self.max_attempts, now, url, worker_id) for url in urls],
+        ))
+
+    # 🛠 Hàm đếm số bài theo trạng thái
+    def stats(self):
+        with self._lock:
+            return dict(self._conn.execute("SELECT state, COUNT(*) FROM tasks GROUP BY state").fetchall())
+
+    # 🛠 Hàm xóa các bài đã xong / dead từ lâu (khung giờ của chúng đã qua nên không được tìm thấy lại)
+    def prune(self, max_age_days=PRUNE_AFTER_DAYS):
+        cutoff = time.time() - max_age_days * 86400
+        return self._write(lambda conn: conn.execute(
+            "DELETE FROM tasks WHERE state IN ('done', 'dead') AND updated_at < ?", (cutoff,)
+        ).rowcount)
+
+    # 🛠 Hàm kiểm tra URL đã được worker nào đó ghi xuống đĩa chưa
+    def is_seen(self, url):
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM seen_urls WHERE url = ?", (url,)).fetchone() is not None
+
+    # 🛠 Hàm thêm URL đã ghi vào kho dùng chung; imported_file: đánh dấu file CSV đã nhập trong cùng transaction
+    def add_seen(self, urls, source=None, imported_file=None):
+        now = datetime.now().isoformat(timespec='seconds')
+        rows = [(url, source, now) for url in urls]
+
+        def _insert(conn):
+            before = conn.total_changes
+            conn.executemany("INSERT OR IGNORE INTO seen_urls (url, source, first_seen) VALUES (?, ?, ?)", rows)
+            added = conn.total_changes - before
+            if imported_file:
+                conn.execute("INSERT OR IGNORE INTO imported_files (path, imported_at) VALUES (?, ?)",
+                             (imported_file, now))
+            return added
+        return self._write(_insert)
+
+    # 🛠 Hàm kiểm tra file CSV đã được nhập vào kho URL dùng chung chưa
+    def is_imported(self, path):
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM imported_files WHERE path = ?", (path,)).fetchone() is not None
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+# KEYS chung của các script: queued, leased, attempts, dead, scores, owners, tasks, done, results
+# Trả một bài về queued với điểm ban đầu (giữ độ ưu tiên và thứ tự thêm), hoặc sang dead nếu đã thử đủ số lần
+_REDIS_REQUEUE = """
+local function requeue(url, max_attempts, now)
+    redis.call('HDEL', KEYS[6], url)
+    if tonumber(redis.call('HGET', KEYS[3], url) or '0') >= max_attempts then
+        redis.call('ZADD', KEYS[4], now, url)
+    else
+        redis.call('ZADD', KEYS[1], tonumber(redis.call('HGET', KEYS[5], url) or '0'), url)
+    end
+end
+"""
+
+# Lấy bài atomically: giao lại bài có lease hết hạn rồi chuyển tối đa ARGV[3] bài từ queued sang leased (owner ARGV[5])
+_REDIS_CLAIM = _REDIS_REQUEUE + """
+local expired = redis.call('ZRANGEBYSCORE', KEYS[2], '-inf', ARGV[1])
+for _, url in ipairs(expired) do
+    redis.call('ZREM', KEYS[2], url)
+    requeue(url, tonumber(ARGV[4]), ARGV[1])
+end
+local urls = redis.call('ZRANGE', KEYS[1], 0, tonumber(ARGV[3]) - 1)
+for _, url in ipairs(urls) do
+    redis.call('ZREM', KEYS[1], url)
+    redis.call('ZADD', KEYS[2], ARGV[2], url)
+    redis.call('HINCRBY', KEYS[3], url, 1)
+    redis.call('HSET', KEYS[6], url, ARGV[5])
+end
+return urls
+"""
+
+# Trả các bài worker ARGV[3] đang giữ về hàng đợi nếu còn lượt thử, ngược lại chuyển sang dead
+_REDIS_RELEASE = _REDIS_REQUEUE + """
+for i = 4, #ARGV do
+    local url = ARGV[i]
+    if redis.call('HGET', KEYS[6], url) == ARGV[3] and redis.call('ZREM', KEYS[2], url) == 1 then
+        requeue(url, tonumber(ARGV[1]), ARGV[2])
+    end
+end
+return 0
+"""
+
+# Ack các bài worker ARGV[2] đang giữ (ARGV[3..]: url, kết quả xen kẽ): chuyển sang done, trả về số bài được ack
+_REDIS_ACK = """
+local acked = 0
+for i = 3, #ARGV, 2 do
+    local url = ARGV[i]
+    if redis.call('HGET', KEYS[6], url) == ARGV[2] and redis.call('ZREM', KEYS[2], url) == 1 then
+        redis.call('HDEL', KEYS[6], url)
+        redis.call('HDEL', KEYS[7], url)
+        redis.call('HDEL', KEYS[3], url)
+        redis.call('HDEL', KEYS[5], url)
+        redis.call('ZADD', KEYS[8], ARGV[1], url)
+        redis.call('HINCRBY', KEYS[9], ARGV[i + 1], 1)
+        acked = acked + 1
+    end
+end
+return acked
+"""
+
+# Xóa các bài done / dead cũ hơn ARGV[1] khỏi known (KEYS[10]) để set không phình mãi
+_REDIS_PRUNE = """
+local removed = 0
+for _, key in ipairs({KEYS[8], KEYS[4]}) do
+    local urls = redis.call('ZRANGEBYSCORE', key, '-inf', ARGV[1])
+    for _, url in ipairs(urls) do
+        redis.call('SREM', KEYS[10], url)
+        redis.call('HDEL', KEYS[7], url)
+        redis.call('HDEL', KEYS[3], url)
+        redis.call('HDEL', KEYS[5], url)
+    end
+    redis.call('ZREMRANGEBYSCORE', key, '-inf', ARGV[1])
+    removed = removed + #urls
+end
+return removed
+"""
+
+
+class RedisWorkQueue:
+    """
+    Cùng giao diện với SqliteWorkQueue nhưng dùng Redis để nhiều máy chung một hàng đợi:
+      <prefix>:known    – set mọi URL từng vào hàng đợi (chống thêm trùng), xóa dần bằng prune()
+      <prefix>:tasks    – hash URL -> payload JSON
+      <prefix>:scores   – hash URL -> điểm lúc thêm (độ ưu tiên, thời gian), dùng khi trả bài về hàng đợi
+      <prefix>:queued   – sorted set theo điểm
+      <prefix>:leased   – sorted set theo thời điểm hết lease
+      <prefix>:owners   – hash URL -> worker đang giữ lease
+      <prefix>:attempts – hash URL -> số lần đã giao
+      <prefix>:done     – sorted set URL đã xong (dùng chung mọi máy), theo thời điểm ack
+      <prefix>:dead     – sorted set URL đã thử quá số lần, theo thời điểm chuyển sang dead
+      <prefix>:results  – hash kết quả -> số bài
+      <prefix>:seen     – set URL đã được ghi xuống đĩa (kho dùng chung, prune() không xóa)
+      <prefix>:imported – set file CSV (máy:đường dẫn) đã nhập vào seen
+    """
+
+    def __init__(self, url, prefix='crawl', lease_seconds=LEASE_SECONDS, max_attempts=MAX_QUEUE_ATTEMPTS):
+        if redis is None:
+            raise RuntimeError("Cần cài redis (pip install redis) để dùng CRAWL_QUEUE=redis://...")
+        self.client = redis.Redis.from_url(url, decode_responses=True)
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.keys = {name: f"{prefix}:{name}" for name in
+                     ('queued', 'leased', 'attempts', 'dead', 'scores', 'owners', 'tasks', 'done', 'results', 'known')}
+        # Mọi script nhận cùng danh sách khóa theo thứ tự trên (KEYS[1]..KEYS[10])
+        self._script_keys = list(self.keys.values())
+        self.keys['seen'] = f"{prefix}:seen"
+        self.keys['imported'] = f"{prefix}:imported"
+        self._claim = self.client.register_script(_REDIS_CLAIM)
+        self._release = self.client.register_script(_REDIS_RELEASE)
+        self._ack = self.client.register_script(_REDIS_ACK)
+        self._prune = self.client.register_script(_REDIS_PRUNE)
+
+    def enqueue(self, tasks):
+        tasks = list(tasks)
+        if not tasks:
+            return 0
+        pipe = self.client.pipeline()
+        for task in tasks:
+            pipe.sadd(self.keys['known'], task.url)
+        added = pipe.execute()
+
+        now = time.time()
+        pipe = self.client.pipeline()
+        for task, is_new in zip(tasks, added):
+            if is_new:
+                # Điểm = độ ưu tiên trước, thời gian thêm sau
+                score = task.priority * 1e10 + now
+                pipe.hset(self.keys['tasks'], task.url, task.to_json())
+                pipe.hset(self.keys['scores'], task.url, score)
+                pipe.zadd(self.keys['queued'], {task.url: score})
+        pipe.execute()
+        return sum(1 for is_new in added if is_new)
+
+    def claim(self, worker_id, limit):
+        now = time.time()
+        urls = self._claim(keys=self._script_keys,
+                           args=[now, now + self.lease_seconds, limit, self.max_attempts, worker_id])
+        if not urls:
+            return []
+        payloads = self.client.hmget(self.keys['tasks'], urls)
+        return [CrawlTask.from_json(payload) for payload in payloads if payload]
+
+    def owned(self, worker_id, urls, margin=LEASE_MARGIN):
+        urls = list(urls)
+        if not urls:
+            return set()
+        pipe = self.client.pipeline()
+        pipe.hmget(self.keys['owners'], urls)
+        for url in urls:
+            pipe.zscore(self.keys['leased'], url)
+        owners, *lease_until = pipe.execute()
+        deadline = time.time() + margin
+        return {url for url, owner, until in zip(urls, owners, lease_until)
+                if owner == worker_id and until is not None and until > deadline}
+
+    def ack(self, worker_id, results):
+        args = [item for url, result in results for item in (url, result)]
+        if not args:
+            return 0
+        return self._ack(keys=self._script_keys, args=[time.time(), worker_id] + args)
+
+    def release(self, worker_id, urls):
+        urls = list(urls)
+        if urls:
+            self._release(keys=self._script_keys, args=[self.max_attempts, time.time(), worker_id] + urls)
+
+    def stats(self):
+        pipe = self.client.pipeline()
+        pipe.zcard(self.keys['queued'])
+        pipe.zcard(self.keys['leased'])
+        pipe.zcard(self.keys['dead'])
+        pipe.hgetall(self.keys['results'])
+        queued, leased, dead, results = pipe.execute()
+        return {'queued': queued, 'leased': leased, 'dead': dead,
+                'done': sum(int(count) for count in results.values()), **{f"done_{k}": int(v) for k, v in results.items()}}
+
+    def prune(self, max_age_days=PRUNE_AFTER_DAYS):
+        return self._prune(keys=self._script_keys, args=[time.time() - max_age_days * 86400])
+
+    def is_seen(self, url):
+        return bool(self.client.sismember(self.keys['seen'], url))
+
+    def add_seen(self, urls, source=None, imported_file=None):
+        """source chỉ được lưu ở bản SQLite; Redis giữ set URL cho gọn."""
+        urls = list(urls)
+        pipe = self.client.pipeline()
+        if urls:
+            pipe.sadd(self.keys['seen'], *urls)
+        if imported_file:
+            pipe.sadd(self.keys['imported'], imported_file)
+        results = pipe.execute()
+        return results[0] if urls else 0
+
+    def is_imported(self, path):
+        return bool(self.client.sismember(self.keys['imported'], path))
+
+    def close(self):
+        self.client.close()
+
+
+class SharedSeenStore:
+    """
+    Kho URL đã crawl nằm trên backend của hàng đợi (SQLite dùng chung hoặc Redis), cùng giao diện
+    với SeenUrlStore để truyền vào CrawlEngine. Chế độ phân tán dùng kho này thay cho seen_urls.db
+    riêng của từng máy: bài một máy đã ghi thì máy khác không đưa lại vào hàng đợi, không ghi lại,
+    kể cả sau khi prune() đã xóa bài khỏi hàng đợi.
+    """
+
+    def __init__(self, work_queue):
+        self.work_queue = work_queue
+
+    def __contains__(self, url):
+        return self.work_queue.is_seen(url)
+
+    def add(self, url, source=None):
+        self.work_queue.add_seen([url], source)
+
+    def add_many(self, urls, source=None):
+        self.work_queue.add_seen(list(urls), source)
+
+    # 🛠 Nhập URL từ file CSV của máy này (mỗi file một lần, khóa theo tên máy + đường dẫn)
+    def seed_from_csv(self, csv_file, source=None):
+        path = f"{socket.gethostname()}:{os.path.abspath(csv_file)}"
+        if self.work_queue.is_imported(path):
+            return 0
+        urls = read_csv_urls(csv_file)
+        self.work_queue.add_seen(urls, source, imported_file=path)
+        print(f"Đã nhập {len(urls)} URL từ {csv_file} vào kho URL dùng chung của hàng đợi")
+        return len(urls)
+
+    def close(self):
+        """Hàng đợi do nơi mở nó đóng."""
+
+
+# 🛠 Hàm mở hàng đợi theo URL: sqlite:///đường/dẫn.db hoặc redis://host:6379/0
+def open_work_queue(queue_url=CRAWL_QUEUE):
+    parsed = urlparse(queue_url)
+    if parsed.scheme in ('redis', 'rediss'):
+        return RedisWorkQueue(queue_url)
+    if parsed.scheme == 'sqlite':
+        return SqliteWorkQueue(queue_url[len('sqlite:///'):] or 'crawl_queue.db')
+    raise ValueError(f"Không hỗ trợ hàng đợi: {queue_url} (dùng sqlite:///file.db hoặc redis://...)")